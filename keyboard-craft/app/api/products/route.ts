@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import path from 'path';
 import fs from 'fs';
+import { dbPath, findProducts, PRODUCT_COLUMNS, SPEC_COLUMNS, SpecColumn } from '../../../lib/database/queries';
 
 // Define the product interface to match the scraped data
 interface ScrapedProduct {
@@ -18,6 +19,82 @@ interface ScrapedProduct {
   updated_at: string;
 }
 
+// manifest.json, written next to the export by the scraper (scrapers/database/json_export.py)
+interface ManifestEntry {
+  file: string;
+  count: number;
+  bytes: number;
+  sha256: string;
+  // Categories only: byte range of their products in the export, null if not contiguous.
+  // '[' + slice + ']' parses for pretty/compact exports; for ndjson the slice is one product per line.
+  offset?: number | null;
+  length?: number | null;
+}
+
+interface Manifest {
+  version: number;
+  // An integer that goes up with every catalog change; deltas/ go from_version -> to_version
+  catalog_version: number;
+  export: ManifestEntry & { format: 'pretty' | 'compact' | 'ndjson' };
+  categories: Record<string, ManifestEntry>;
+  retailers: Record<string, ManifestEntry>;
+}
+
+const productsDir = path.join(process.cwd(), 'data', 'products');
+
+// Parsed files by content hash, so a new export is picked up as soon as the manifest points at it
+const parsedFiles = new Map<string, ScrapedProduct[]>();
+const PARSED_FILES_LIMIT = 16;
+
+function readManifest(): Manifest | null {
+  const manifestPath = path.join(productsDir, 'manifest.json');
+  if (!fs.existsSync(manifestPath)) {
+    return null;
+  }
+  try {
+    return JSON.parse(fs.readFileSync(manifestPath, 'utf8'));
+  } catch (error) {
+    console.error('⚠️ Unreadable manifest, loading the full export:', error);
+    return null;
+  }
+}
+
+function loadFile(entry: ManifestEntry, ndjson = false): ScrapedProduct[] {
+  const cached = parsedFiles.get(entry.sha256);
+  if (cached) {
+    return cached;
+  }
+
+  const data = fs.readFileSync(path.join(productsDir, entry.file), 'utf8');
+  const products: ScrapedProduct[] = ndjson
+    ? data.split('\n').filter(line => line).map(line => JSON.parse(line))
+    : JSON.parse(data);
+
+  if (parsedFiles.size >= PARSED_FILES_LIMIT) {
+    // Maps iterate in insertion order: drop the oldest
+    parsedFiles.delete(parsedFiles.keys().next().value as string);
+  }
+  parsedFiles.set(entry.sha256, products);
+  return products;
+}
+
+// Load the smallest shard holding every product the filters can match
+function loadFromManifest(manifest: Manifest, category: string | null, retailer: string | null): ScrapedProduct[] {
+  const shards = [
+    category ? manifest.categories[category] : undefined,
+    retailer ? manifest.retailers[retailer] : undefined,
+  ].filter((entry): entry is ManifestEntry => Boolean(entry));
+
+  if (shards.length) {
+    const smallest = shards.reduce((a, b) => (b.count < a.count ? b : a));
+    console.log(`📄 Loading ${smallest.count} products from shard:`, smallest.file);
+    return loadFile(smallest);
+  }
+
+  console.log('📄 Loading products from export:', manifest.export.file);
+  return loadFile(manifest.export, manifest.export.format === 'ndjson');
+}
+
 // Transform scraped product to our frontend format
 function transformProduct(scrapedProduct: ScrapedProduct) {
   return {
@@ -41,6 +118,12 @@ function transformProduct(scrapedProduct: ScrapedProduct) {
   };
 }
 
+// A price bound from the query string, null if absent or not a number
+function priceParam(searchParams: URLSearchParams, name: string): number | null {
+  const value = parseFloat(searchParams.get(name) || '');
+  return Number.isFinite(value) ? value : null;
+}
+
 export async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url);
@@ -48,11 +131,30 @@ export async function GET(request: NextRequest) {
     const search = searchParams.get('search');
     const retailer = searchParams.get('retailer');
 
-    // Try to read from JSON file first (latest scraped data)
-    const jsonPath = path.join(process.cwd(), 'data', 'products', 'latest-export.json');
+    // Spec filters, repeatable for any of several values: ?category=case&layout=65%25&max_price=200
+    const specs: Partial<Record<SpecColumn, string[]>> = {};
+    for (const column of SPEC_COLUMNS) {
+      const values = searchParams.getAll(column);
+      if (values.length) {
+        specs[column] = values;
+      }
+    }
+    const minPrice = priceParam(searchParams, 'min_price');
+    const maxPrice = priceParam(searchParams, 'max_price');
+    const filtersSpecs = Object.keys(specs).length > 0 || minPrice !== null || maxPrice !== null;
+
+    // Spec queries go to the database's spec indexes; otherwise try the sharded
+    // export first, then the JSON file (latest scraped data)
+    const manifest = readManifest();
+    const jsonPath = path.join(productsDir, 'latest-export.json');
     let products: ScrapedProduct[] = [];
 
-    if (fs.existsSync(jsonPath)) {
+    if (filtersSpecs && fs.existsSync(dbPath)) {
+      console.log('🗂️ Querying spec indexes:', JSON.stringify({ category, ...specs, minPrice, maxPrice }));
+      products = findProducts({ category, specs, minPrice, maxPrice });
+    } else if (manifest) {
+      products = loadFromManifest(manifest, category, retailer);
+    } else if (fs.existsSync(jsonPath)) {
       console.log('📄 Loading products from JSON file:', jsonPath);
       const jsonData = fs.readFileSync(jsonPath, 'utf8');
       products = JSON.parse(jsonData);
@@ -61,12 +163,11 @@ export async function GET(request: NextRequest) {
       console.log('📄 JSON file not found, falling back to database');
       try {
         const Database = require('better-sqlite3');
-        const dbPath = path.join(process.cwd(), 'data', 'keyboards.db');
         
         if (fs.existsSync(dbPath)) {
           const db = new Database(dbPath, { readonly: true });
           
-          let query = 'SELECT * FROM products WHERE 1=1';
+          let query = `SELECT ${PRODUCT_COLUMNS} FROM products WHERE 1=1`;
           const params: any[] = [];
 
           if (category) {
@@ -122,8 +223,19 @@ export async function GET(request: NextRequest) {
       filteredProducts = filteredProducts.filter(p => p.retailer === retailer);
     }
 
-    // Sort by price
-    filteredProducts.sort((a, b) => a.price - b.price);
+    // Already applied when the products came from the database
+    for (const [column, values] of Object.entries(specs)) {
+      filteredProducts = filteredProducts.filter(p => values.includes(String(p.specs[column])));
+    }
+    if (minPrice !== null) {
+      filteredProducts = filteredProducts.filter(p => p.price >= minPrice);
+    }
+    if (maxPrice !== null) {
+      filteredProducts = filteredProducts.filter(p => p.price <= maxPrice);
+    }
+
+    // Sort by price (a copy, the loaded products are cached)
+    filteredProducts = [...filteredProducts].sort((a, b) => a.price - b.price);
 
     // Transform to frontend format
     const transformedProducts = filteredProducts.map(transformProduct);
@@ -0,0 +1,32 @@
+import { NextRequest, NextResponse } from 'next/server';
+import fs from 'fs';
+import { dbPath, searchProducts } from '../../../lib/database/queries';
+
+const MAX_LIMIT = 100;
+
+// GET /api/search?q=gateron%20yel&category=switches&limit=20&offset=0
+export async function GET(request: NextRequest) {
+  try {
+    const { searchParams } = new URL(request.url);
+    const query = searchParams.get('q') || '';
+    const category = searchParams.get('category');
+    const limit = Math.min(Math.max(parseInt(searchParams.get('limit') || '20', 10) || 20, 1), MAX_LIMIT);
+    const offset = Math.max(parseInt(searchParams.get('offset') || '0', 10) || 0, 0);
+
+    if (!fs.existsSync(dbPath)) {
+      console.log('📄 Database not found, nothing to search');
+      return NextResponse.json([]);
+    }
+
+    const products = searchProducts(query, { category, limit, offset });
+    console.log(`🔍 ${products.length} results for "${query}" in ${category || 'all'}`);
+
+    return NextResponse.json(products);
+  } catch (error) {
+    console.error('❌ Search Error:', error);
+    return NextResponse.json(
+      { error: 'Search failed', details: error.message },
+      { status: 500 }
+    );
+  }
+}
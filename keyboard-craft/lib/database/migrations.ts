@@ -24,13 +24,15 @@ export function setupDatabase() {
     )
   `);
   
-  // Create price history table
+  // Create price history table (one row per interval at an unchanged price and availability)
   db.exec(`
     CREATE TABLE IF NOT EXISTS price_history (
       id INTEGER PRIMARY KEY AUTOINCREMENT,
       product_id TEXT,
       price REAL,
-      recorded_at TEXT DEFAULT CURRENT_TIMESTAMP,
+      first_seen TEXT DEFAULT CURRENT_TIMESTAMP,
+      last_seen TEXT,
+      availability INTEGER,
       FOREIGN KEY (product_id) REFERENCES products(id)
     )
   `);
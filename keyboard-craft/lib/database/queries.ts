@@ -0,0 +1,132 @@
+// Read-only queries against the database the scrapers write (data/keyboards.db)
+import Database from 'better-sqlite3';
+import path from 'path';
+
+export const dbPath = path.join(process.cwd(), 'data', 'keyboards.db');
+
+// Columns a product is read as; the generated spec columns (schema 6) are
+// left out, their values are already in specs
+export const PRODUCT_COLUMNS = 'id, name, category, price, currency, availability, image_url, product_url, retailer, ' +
+  'specs, created_at, updated_at, change_seq';
+
+// Spec keys promoted to indexed generated columns of products. Mirrors
+// SPEC_COLUMNS in scrapers/database/db_manager.py
+export const SPEC_COLUMNS = ['layout', 'switch_type', 'pins', 'facing', 'material'] as const;
+export type SpecColumn = typeof SPEC_COLUMNS[number];
+
+function parseSpecs(row: any) {
+  return { ...row, specs: row.specs ? JSON.parse(row.specs) : {} };
+}
+
+// bm25 weights of the products_fts columns: name, retailer, specs, and
+// category, which is only there to filter on
+const SEARCH_WEIGHTS = '10.0, 2.0, 1.0, 0.0';
+
+// FTS5 MATCH expression for what a user typed: every word must match, the
+// last one as a prefix. Mirrors DatabaseManager.search_expression in
+// scrapers/database/db_manager.py
+export function searchExpression(query: string, category?: string | null): string | null {
+  const words = query.toLowerCase().match(/[\p{L}\p{N}_]+/gu);
+  if (!words) {
+    return null;
+  }
+
+  // Quoted, so words like AND/OR/NEAR are searched for rather than parsed
+  const terms = words.map(word => `"${word}"`);
+  terms[terms.length - 1] += '*';
+
+  let expression = `{name retailer specs} : (${terms.join(' ')})`;
+  if (category) {
+    expression += ` AND category : "${category.replace(/"/g, '')}"`;
+  }
+  return expression;
+}
+
+export interface SearchOptions {
+  category?: string | null;
+  limit?: number;
+  offset?: number;
+}
+
+// Products matching `query` by name, retailer or spec values, best match first
+export function searchProducts(query: string, { category, limit = 20, offset = 0 }: SearchOptions = {}) {
+  const expression = searchExpression(query, category);
+  if (!expression) {
+    return [];
+  }
+
+  const db = new Database(dbPath, { readonly: true });
+  try {
+    // Ranked and cut to the page inside the index, only that page is joined to products
+    const rows = db.prepare(`
+      SELECT ${PRODUCT_COLUMNS} FROM (
+        SELECT rowid, bm25(products_fts, ${SEARCH_WEIGHTS}) AS score FROM products_fts
+        WHERE products_fts MATCH ?
+        ORDER BY score LIMIT ? OFFSET ?
+      ) AS hits
+      JOIN products ON products.rowid = hits.rowid
+      ORDER BY hits.score
+    `).all(expression, limit, offset) as any[];
+
+    return rows.map(row => ({ ...parseSpecs(row), availability: row.availability === 1 }));
+  } finally {
+    db.close();
+  }
+}
+
+export interface FindOptions {
+  category?: string | null;
+  specs?: Partial<Record<SpecColumn, string | number | Array<string | number>>>;
+  minPrice?: number | null;
+  maxPrice?: number | null;
+  limit?: number;
+  offset?: number;
+}
+
+// Products matching spec values and a price range, cheapest first, as they are
+// stored (the shape of the JSON export). With a category this is a range scan
+// of one of the (category, <spec>, price) indexes, e.g.
+// findProducts({ category: 'case', specs: { layout: '65%' }, maxPrice: 200 })
+export function findProducts({ category, specs = {}, minPrice, maxPrice, limit, offset = 0 }: FindOptions = {}) {
+  const conditions: string[] = [];
+  const params: any[] = [];
+
+  if (category) {
+    conditions.push('category = ?');
+    params.push(category);
+  }
+  for (const column of SPEC_COLUMNS) {
+    const value = specs[column];
+    if (value === undefined || value === null) {
+      continue;
+    }
+    const values = Array.isArray(value) ? value : [value];
+    conditions.push(`${column} IN (${values.map(() => '?').join(', ')})`);
+    params.push(...values);
+  }
+  if (minPrice !== undefined && minPrice !== null) {
+    conditions.push('price >= ?');
+    params.push(minPrice);
+  }
+  if (maxPrice !== undefined && maxPrice !== null) {
+    conditions.push('price <= ?');
+    params.push(maxPrice);
+  }
+
+  let query = `SELECT ${PRODUCT_COLUMNS} FROM products`;
+  if (conditions.length) {
+    query += ` WHERE ${conditions.join(' AND ')}`;
+  }
+  query += ' ORDER BY price ASC';
+  if (limit !== undefined) {
+    query += ' LIMIT ? OFFSET ?';
+    params.push(limit, offset);
+  }
+
+  const db = new Database(dbPath, { readonly: true });
+  try {
+    return (db.prepare(query).all(...params) as any[]).map(parseSpecs);
+  } finally {
+    db.close();
+  }
+}
@@ -1,15 +1,71 @@
 import requests
-from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
-import time
+import asyncio
+import logging
 import re
+import time
+import weakref
 from typing import Dict, List
 from urllib.parse import urljoin, urlparse
 
+from utils.html_parser import get_backend
+from utils.http_cache import HttpCache
+from utils.keywords import matcher, category_from_labels, title_is_skipped
+from utils.metrics import metrics
+from utils.price_parser import parse_price
+from utils.rate_limiter import RateLimiter, shared_limiter
+from utils.response_archive import ResponseArchive
+from utils import spec_rules
+from utils.spec_rules import spec_text
+from utils.strategy_cache import StrategyCache, url_key
+
+logger = logging.getLogger(__name__)
+
 class BaseScraper:
-    def __init__(self, base_url: str, retailer_name: str):
+    # asyncio semaphores are bound to an event loop, so keep one set per loop
+    _async_host_slots = weakref.WeakKeyDictionary()
+
+    # How many requests may be in flight against a single host in async mode
+    max_host_concurrency = 1
+
+    # Bump whenever extraction changes, so products cached for a 304 are re-parsed
+    cache_version = 2
+
+    # Upper bound on pages followed per collection URL
+    max_pages = 50
+
+    # When True, alternative URLs are only fetched for categories whose
+    # primary URL produced nothing; otherwise every URL is crawled up front
+    alternatives_are_fallbacks = False
+
+    # HTML parser backend ('bs4', 'lxml' or 'selectolax', see utils/html_parser.py)
+    parser_backend = 'bs4'
+    # Regex over class names of the elements worth materializing (the product
+    # grid). Only used by the bs4 backend; None parses the whole page.
+    parse_scope = None
+    # Regex over hrefs of pager links, kept by a scoped parse so pagination still works
+    pager_links = r'[?&]page=\d'
+
+    # Selector strategies tried by _parse_page, each a dict of CSS selectors
+    # (container, title, price, link, image); the container selector identifies it
+    selector_strategies: List[Dict] = []
+
+    def __init__(self, base_url: str, retailer_name: str, rate_limiter: RateLimiter = None,
+                 http_cache: HttpCache = None, archive: ResponseArchive = None, parser: str = None,
+                 strategy_cache: StrategyCache = None):
         self.base_url = base_url
         self.retailer_name = retailer_name
+        self.parser = get_backend(parser or self.parser_backend)
+        self.rate_limiter = rate_limiter or shared_limiter
+        self.http_cache = http_cache or HttpCache()
+        # Remembers which selector strategy worked last for each collection
+        self.strategy_cache = strategy_cache or StrategyCache()
+        self._debugged = set()
+        # When set, responses are recorded to (or replayed from) this archive
+        self.archive = archive
+        # Filled in by each retailer: category -> collection path
+        self.category_urls: Dict[str, str] = {}
+        self.alternative_urls: Dict[str, List[str]] = {}
         self.session = requests.Session()
         self.ua = UserAgent()
         self.session.headers.update({
@@ -22,223 +78,381 @@ class BaseScraper:
             'Cache-Control': 'max-age=0',
         })
     
-    def get_page(self, url: str, delay: float = 2.0, retries: int = 3):
-        """Get and parse a webpage with rate limiting and retries"""
+    def fetch(self, url: str, retries: int = 3, headers: Dict[str, str] = None):
+        """Fetch a URL with per-host rate limiting and retries.
+
+        Returns the response (200, or 304 for a conditional request) or None.
+        """
+        if self.archive and self.archive.replaying:
+            response = self.archive.response_for(url)
+            if response is None:
+                logger.warning("📼 Not in archive run %s: %s", self.archive.run_id, url)
+            elif response.status_code >= 400:
+                return None
+            return response
+
+        host = urlparse(url).netloc
+        retailer = self.retailer_name
         for attempt in range(retries):
-            print(f"🌐 Fetching: {url} (attempt {attempt + 1}/{retries})")
-            time.sleep(delay)  # Be respectful
+            logger.debug("🌐 Fetching: %s (attempt %d/%d)", url, attempt + 1, retries)
+            if attempt:
+                metrics.inc('fetch_retries', retailer=retailer)
+            waited = self.rate_limiter.acquire(host)  # Be respectful
+            metrics.observe('rate_limit_wait', waited, retailer=retailer)
             
             try:
                 # Rotate user agent for each request
                 self.session.headers['User-Agent'] = self.ua.random
                 
-                response = self.session.get(url, timeout=15)
+                with metrics.timer('fetch', retailer=retailer):
+                    response = self.session.get(url, timeout=15, headers=headers)
+                metrics.inc('responses', retailer=retailer, status=response.status_code)
+                metrics.inc('bytes_downloaded', len(response.content), retailer=retailer)
+
+                backoff = self.rate_limiter.record_response(host, response.status_code, response.headers)
+                if backoff is not None:
+                    logger.warning("🐢 %s is throttling us (%d), backing off %.1fs", host, response.status_code, backoff)
+                    continue
+
+                if response.status_code == 304:
+                    logger.debug("♻️ Not modified: %s", url)
+                    return response
+
                 response.raise_for_status()
                 
                 # Check if we got actual content
                 if len(response.content) < 1000:
-                    print(f"⚠️ Suspicious small response size: {len(response.content)} bytes")
-                
-                soup = BeautifulSoup(response.content, 'lxml')
-                
-                # Basic check for valid page
-                if not soup.find('body'):
-                    print(f"⚠️ No body tag found in response")
-                    continue
+                    logger.warning("⚠️ Suspicious small response size: %d bytes from %s", len(response.content), url)
+
+                if self.archive:
+                    self.archive.record(url, response)
                     
-                return soup
+                return response
                 
+            except requests.exceptions.HTTPError as e:
+                # Client errors won't go away by asking again
+                if 400 <= e.response.status_code < 500:
+                    logger.warning("❌ %d for %s, not retrying", e.response.status_code, url)
+                    return None
+                logger.warning("❌ Request error (attempt %d): %s", attempt + 1, e)
+                if attempt < retries - 1:
+                    self.rate_limiter.backoff(host)
+                    continue
+                logger.error("❌ Failed to fetch %s after %d attempts", url, retries)
+                return None
             except requests.exceptions.RequestException as e:
-                print(f"❌ Request error (attempt {attempt + 1}): {e}")
+                logger.warning("❌ Request error (attempt %d): %s", attempt + 1, e)
                 if attempt < retries - 1:
-                    time.sleep(delay * (attempt + 1))  # Exponential backoff
+                    self.rate_limiter.backoff(host)
                     continue
                 else:
-                    print(f"❌ Failed to fetch {url} after {retries} attempts")
+                    logger.error("❌ Failed to fetch %s after %d attempts", url, retries)
                     return None
             except Exception as e:
-                print(f"❌ Unexpected error: {e}")
+                logger.exception("❌ Unexpected error fetching %s: %s", url, e)
                 return None
         
+        logger.error("❌ Failed to fetch %s after %d attempts", url, retries)
         return None
-    
-    def parse_price(self, price_text: str) -> float:
-        """Extract price from text with better parsing and out-of-stock detection"""
-        if not price_text:
-            return 0.0
+
+    def parse_html(self, response, scoped: bool = False):
+        """Parse a fetched response into a document, or None if it is not a usable page"""
+        if response is None or response.status_code == 304:
+            return None
+
+        scope = self.parse_scope if scoped else None
+        with metrics.timer('parse', retailer=self.retailer_name, backend=self.parser.name):
+            doc = self.parser.parse(response.content, scope=scope, links=self.pager_links)
         
-        price_text_lower = price_text.lower().strip()
+        # Basic check for valid page (a scoped parse has no body to check)
+        if not scope and not doc.has_body():
+            logger.warning("⚠️ No body tag found in response from %s", response.url)
+            return None
         
-        # Check for out of stock indicators FIRST (before trying to parse numbers)
-        out_of_stock_indicators = [
-            'out of stock', 'sold out', 'unavailable', 'not available',
-            'discontinued', 'pre-order', 'coming soon', 'notify me',
-            'email when available', 'back in stock', 'temporarily unavailable'
-        ]
+        return doc
+
+    def get_page(self, url: str, retries: int = 3):
+        """Get and parse a webpage with rate limiting and retries"""
+        return self.parse_html(self.fetch(url, retries))
+
+    def next_page_url(self, soup, url: str, page: int):
+        """Find the URL of the page after `page`: rel="next" first, then a ?page=N+1 link"""
+        link = soup.select_one('link[rel="next"], a[rel="next"]')
+        if link and link.attr('href'):
+            return urljoin(url, link.attr('href'))
         
-        if any(indicator in price_text_lower for indicator in out_of_stock_indicators):
-            print(f"⚠️ Product appears to be out of stock: '{price_text}'")
-            return 0.0
+        next_page = re.compile(rf'[?&]page={page + 1}(&|$)')
+        for link in soup.select('a[href*="page="]'):
+            if next_page.search(link.attr('href')):
+                return urljoin(url, link.attr('href'))
+        return None
+
+    def scrape_page(self, url: str, category: str, parse, page: int = 1):
+        """Fetch `url` and run `parse(soup, url, category)` on it.
+
+        Returns (products, next_url). With an HTTP cache configured the request
+        is conditional, and on a 304 the result stored last time is returned
+        without re-parsing.
+        """
+        entry = None
+        if self.http_cache:
+            entry = self.http_cache.lookup(url, category, self.cache_version)
         
-        # Remove common currency symbols and clean text
-        clean_text = price_text.replace('$', '').replace('USD', '').replace('€', '').replace('£', '').replace(',', '').strip()
+        response = self.fetch(url, headers=HttpCache.conditional_headers(entry))
+        if response is not None and response.status_code == 304 and entry:
+            metrics.inc('cache_hits', retailer=self.retailer_name)
+            cached = entry['results'][category]
+            return cached['products'], cached['next_url']
         
-        # Skip if text contains non-price words
-        skip_words = ['sale', 'save', 'off', 'free', 'shipping', 'tax', 'msrp', 'retail']
-        if any(word in clean_text.lower() for word in skip_words):
-            # But still try to extract price if there's a clear number
-            pass
+        # Try the cheap scoped parse first, and the full page if it finds nothing
+        soup = self.parse_html(response, scoped=bool(self.parse_scope))
+        with metrics.timer('extract', retailer=self.retailer_name):
+            products = parse(soup, url, category)
+        if soup and soup.scoped and not products:
+            soup = self.parse_html(response)
+            with metrics.timer('extract', retailer=self.retailer_name):
+                products = parse(soup, url, category)
+        next_url = self.next_page_url(soup, url, page) if soup and products else None
+        metrics.inc('products_extracted', len(products), retailer=self.retailer_name)
         
-        # Look for price patterns - be more strict
-        price_patterns = [
-            r'from\s*[\$]?(\d+\.?\d*)',  # "From $X.XX"
-            r'[\$]?(\d{1,4}\.?\d{0,2})',  # Basic price $X.XX (1-4 digits max)
-            r'(\d{1,3},\d{3}\.?\d{0,2})',  # Comma separated like 1,234.56
-        ]
+        if self.http_cache and response is not None and response.status_code == 200:
+            self.http_cache.store(url, category, response.headers,
+                                  {'products': products, 'next_url': next_url}, self.cache_version)
+        return products, next_url
+
+    def scrape_pages(self, url: str, category: str, parse):
+        """Follow a collection's pagination, yielding each page's products as it arrives"""
+        page_url, page = url, 1
+        visited, seen = set(), set()
         
-        for pattern in price_patterns:
-            matches = re.findall(pattern, clean_text, re.IGNORECASE)
-            if matches:
-                try:
-                    # Get the first reasonable price found
-                    for match in matches:
-                        price_str = match.replace(',', '').replace(' ', '')
-                        price = float(price_str)
-                        
-                        # Sanity check: reject unreasonable prices
-                        if 0.01 <= price <= 10000:  # Between 1 cent and $10k
-                            return price
-                        elif price > 10000:
-                            print(f"⚠️ Rejected unreasonable price: ${price} from '{price_text}'")
-                            return 0.0
-                            
-                except ValueError:
-                    continue
+        while page_url and page_url not in visited and page <= self.max_pages:
+            visited.add(page_url)
+            products, next_url = self.scrape_page(page_url, category, parse, page)
+            
+            # Stop if the site ignores the page parameter and serves page 1 again
+            fresh = [p for p in products if (p['name'], p.get('product_url')) not in seen]
+            if not fresh:
+                break
+            seen.update((p['name'], p.get('product_url')) for p in fresh)
+            yield fresh
+            
+            page_url, page = next_url, page + 1
+
+    def _plan(self, categories: List[str], include_alternatives: bool) -> Dict[str, List[str]]:
+        plan = {}
+        for category in categories:
+            paths = [self.category_urls[category]]
+            if include_alternatives:
+                paths += self.alternative_urls.get(category, [])
+            for path in paths:
+                url_categories = plan.setdefault(urljoin(self.base_url, path), [])
+                if category not in url_categories:
+                    url_categories.append(category)
+        return plan
+
+    def crawl_plan(self, categories: List[str]) -> Dict[str, List[str]]:
+        """Unique URLs to fetch for `categories`, each with the categories that list it"""
+        return self._plan(categories, include_alternatives=not self.alternatives_are_fallbacks)
+
+    def route_product(self, product: Dict, url_categories: List[str], categories: List[str]):
+        """Pick the category a product belongs to, or None to drop it.
+
+        Unknown products go to the first category that listed the URL.
+        """
+        detected_category = self.categorize_product(product['name'], product.get('tags', []),
+                                                    product.get('product_url') or '')
+        if detected_category in categories:
+            return detected_category
+        if detected_category == 'unknown':
+            return url_categories[0]
+        return None
+
+    def _iter_url(self, url: str, category: str):
+        """Yield the products of one collection URL page by page"""
+        yield from self.scrape_pages(url, category, self._parse_page)
+
+    def _parse_page(self, soup, url: str, category: str) -> List[Dict]:
+        """Extract products from a fetched page with the first selector strategy that works.
+
+        Strategies are tried in the order the strategy cache learned for this
+        collection, so usually only the one that worked last time is run.
+        """
+        if not soup:
+            return []
+
+        for strategy in self.strategy_cache.order(self.retailer_name, url, self.selector_strategies):
+            logger.debug("🔍 Trying %s selector strategy: %s", self.retailer_name, strategy['container'])
+            containers = soup.select(strategy['container'])
+
+            products = []
+            if containers:
+                logger.debug("📦 Found %d product containers", len(containers))
+                products = self._extract_products(containers, strategy, category, url)
+            else:
+                logger.debug("⚠️ No containers found with selector: %s", strategy['container'])
+
+            self.strategy_cache.record(self.retailer_name, url, strategy['container'], hit=bool(products))
+            metrics.inc('strategy_hits' if products else 'strategy_misses',
+                        retailer=self.retailer_name, strategy=strategy['container'])
+            if products:
+                return products
+
+        if soup.scoped:
+            # A full parse is retried before giving up
+            return []
+
+        logger.warning("⚠️ No %s selector strategy found products on %s", self.retailer_name, url)
+        # Debug the page if all strategies failed, once per collection
+        if url_key(url) not in self._debugged:
+            self._debugged.add(url_key(url))
+            self.debug_page_structure(soup, url)
+        return []
+
+    def _extract_products(self, containers: list, strategy: Dict, category: str, base_url: str) -> List[Dict]:
+        """Extract products from the containers matched by `strategy`"""
+        raise NotImplementedError
+
+    def scrape_categories(self, categories: List[str]):
+        """Scrape several categories, yielding (category, products) page by page.
+
+        Every unique URL across the categories is fetched and parsed exactly
+        once, and its products are routed to categories by route_product.
+        When alternatives_are_fallbacks is set, alternative URLs are only
+        fetched for categories that are still empty afterwards.
+        """
+        for category in categories:
+            if category not in self.category_urls:
+                logger.warning("⚠️ Category '%s' not supported for %s", category, self.retailer_name)
+        categories = [category for category in categories if category in self.category_urls]
         
-        # If no valid price found, check if it might be a range or special format
-        range_match = re.search(r'(\d+\.?\d*)\s*-\s*(\d+\.?\d*)', clean_text)
-        if range_match:
-            try:
-                min_price = float(range_match.group(1))
-                if 0.01 <= min_price <= 10000:
-                    return min_price  # Return the lower end of the range
-            except ValueError:
-                pass
+        counts = {category: 0 for category in categories}
+        fetched, seen = set(), set()
+        plan = self.crawl_plan(categories)
+        # Time spent in here, not while the caller handles the yielded products
+        busy, resumed = 0.0, time.perf_counter()
         
-        print(f"⚠️ Could not parse valid price from: '{price_text}'")
-        return 0.0
+        while plan:
+            for url, url_categories in plan.items():
+                fetched.add(url)
+                logger.info("🔍 Scraping %s %s from %s", self.retailer_name, ', '.join(url_categories), url)
+                
+                for products in self._iter_url(url, url_categories[0]):
+                    routed = {}
+                    for product in products:
+                        key = (product['name'], product.get('product_url'))
+                        if key in seen:
+                            continue
+                        category = self.route_product(product, url_categories, categories)
+                        if category is None:
+                            continue
+                        seen.add(key)
+                        routed.setdefault(category, []).append({**product, 'category': category})
+                    
+                    for category, routed_products in routed.items():
+                        counts[category] += len(routed_products)
+                        busy += time.perf_counter() - resumed
+                        yield category, routed_products
+                        resumed = time.perf_counter()
+            
+            if not self.alternatives_are_fallbacks:
+                break
+            empty = [category for category in categories if not counts[category]]
+            plan = {url: url_categories for url, url_categories in self._plan(empty, True).items()
+                    if url not in fetched}
+        
+        busy += time.perf_counter() - resumed
+        metrics.observe('scrape', busy, retailer=self.retailer_name)
+        
+        # One summary record per category instead of a line per product
+        for category, count in counts.items():
+            metrics.inc('products_scraped', count, retailer=self.retailer_name, category=category)
+            logger.info("📦 %d %s products from %s", count, category, self.retailer_name,
+                        extra={'retailer': self.retailer_name, 'category': category, 'products': count})
+
+    def scrape_category(self, category: str):
+        """Yield lists of products for a category, one list per fetched page"""
+        for _, products in self.scrape_categories([category]):
+            yield products
+
+    def _async_host_slot(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        slots = BaseScraper._async_host_slots.setdefault(loop, {})
+        if host not in slots:
+            slots[host] = asyncio.Semaphore(self.max_host_concurrency)
+        return slots[host]
+
+    async def get_page_async(self, url: str, retries: int = 3):
+        """Async counterpart of get_page.
+
+        The blocking fetch runs in a worker thread, so requests to different
+        hosts overlap while each host still only sees `max_host_concurrency`
+        requests at a time, paced by the rate limiter.
+        """
+        async with self._async_host_slot(urlparse(url).netloc):
+            return await asyncio.to_thread(self.get_page, url, retries)
+
+    async def _iterate_in_thread(self, make_iterator):
+        """Run a blocking generator in a worker thread, yielding its items as they arrive"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for item in make_iterator():
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        async with self._async_host_slot(urlparse(self.base_url).netloc):
+            producer = asyncio.ensure_future(asyncio.to_thread(produce))
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            await producer
+
+    async def scrape_category_async(self, category: str):
+        """Async counterpart of scrape_category"""
+        async for products in self._iterate_in_thread(lambda: self.scrape_category(category)):
+            yield products
+
+    async def scrape_categories_async(self, categories: List[str]):
+        """Async counterpart of scrape_categories"""
+        async for item in self._iterate_in_thread(lambda: self.scrape_categories(categories)):
+            yield item
+    
+    def parse_price(self, price_text: str) -> float:
+        """Extract the price from a price text, 0.0 when it's out of stock or unparseable.
+
+        See utils/price_parser.py for the structured result.
+        """
+        return parse_price(price_text).amount or 0.0
     
     def categorize_product(self, title: str, tags: List[str] = None, url: str = '') -> str:
         """Categorize product based on title, tags, and URL"""
-        title_lower = title.lower()
-        tags_lower = [tag.lower() for tag in (tags or [])]
-        url_lower = url.lower()
-        all_text = f"{title_lower} {' '.join(tags_lower)} {url_lower}"
-        
-        # Switch keywords
-        switch_keywords = ['switch', 'switches', 'mx', 'gateron', 'cherry', 'kailh', 'linear', 'tactile', 'clicky', 'holy panda']
-        if any(word in all_text for word in switch_keywords):
-            return 'switches'
+        all_text = f"{title} {' '.join(tags or [])} {url}"
         
-        # Keycap keywords
-        keycap_keywords = ['keycap', 'keycaps', 'pbt', 'abs', 'gmk', 'cherry profile', 'sa profile', 'oem profile', 'xda', 'dsa']
-        if any(word in all_text for word in keycap_keywords):
-            return 'keycaps'
-        
-        # Case keywords
-        case_keywords = ['case', 'housing', 'aluminum', 'tofu', 'frame', 'chassis', 'keyboard kit', 'plate']
-        if any(word in all_text for word in case_keywords):
-            return 'case'
-        
-        # PCB keywords
-        pcb_keywords = ['pcb', 'circuit', 'board', 'hotswap', 'hot-swap', 'soldered']
-        if any(word in all_text for word in pcb_keywords):
-            return 'pcb'
-        
-        # Stabilizer keywords
-        stab_keywords = ['stabilizer', 'stabilizers', 'stab', 'stabs', 'durock', 'cherry stab']
-        if any(word in all_text for word in stab_keywords):
-            return 'stabilizers'
-        
-        return 'unknown'
+        # One scan finds every keyword table hit; categories keep their priority
+        # order: switches, keycaps, case, pcb, stabilizers
+        return category_from_labels(matcher.labels(all_text))
     
     def extract_specs(self, title: str, description: str = '', url: str = '') -> Dict:
-        """Extract specifications with improved layout detection"""
-        specs = {}
-        text = f"{title} {description} {url}".lower()
-        
-        # Enhanced layout detection with more patterns
-        layout_patterns = {
-            # Common form factors
-            '40%': r'40[%\s]|forty\s*percent|minila|planck',
-            '60%': r'60[%\s]|sixty\s*percent|poker|hhkb|tofu60',
-            '65%': r'65[%\s]|sixty.?five\s*percent|tofu65|nk65|kbd67|margo',
-            '75%': r'75[%\s]|seventy.?five\s*percent|kbd75|gmmk\s*pro|kbdpad|id80',
-            'TKL': r'tkl|tenkeyless|80[%\s]|eighty\s*percent|87\s*key',
-            '96%': r'96[%\s]|ninety.?six\s*percent|compact\s*full',
-            'Full': r'full\s*size|104\s*key|100[%\s]|full\s*layout',
-            # Specialty layouts
-            '1800': r'1800|compact\s*96|cp\s*layout',
-            'Split': r'split|ergodox|kinesis|lily58',
-            'Ortho': r'ortho|ortholinear|planck|preonic',
-            'Alice': r'alice|arisu|maja',
-            'Southpaw': r'southpaw|left\s*numpad',
-        }
-        
-        for layout, pattern in layout_patterns.items():
-            if re.search(pattern, text):
-                specs['layout'] = layout
-                break
-        
-        # If no layout found, try to detect from common keyboard names
-        keyboard_name_layouts = {
-            'tofu60': '60%', 'tofu65': '65%', 'kbd67': '65%', 'nk65': '65%',
-            'gmmk pro': '75%', 'kbd75': '75%', 'id80': 'TKL',
-            'margo': '65%',  # Margo is typically 65%
-            'mode65': '65%', 'mode80': 'TKL',
-            'voice65': '65%', 'mr suit': 'TKL',
-            'think6.5': '65%', 'satisfaction75': '75%',
-            'polaris': '60%', 'prophet': '65%',
-        }
-        
-        for name, layout in keyboard_name_layouts.items():
-            if name in text:
-                specs['layout'] = layout
-                break
-        
-        # Switch type detection
-        if any(word in text for word in ['linear']):
-            specs['switch_type'] = 'linear'
-        elif any(word in text for word in ['tactile']):
-            specs['switch_type'] = 'tactile'
-        elif any(word in text for word in ['clicky', 'click']):
-            specs['switch_type'] = 'clicky'
-        
-        # Pin count detection
-        if '5-pin' in text or '5 pin' in text or 'five pin' in text:
-            specs['pins'] = 5
-        elif '3-pin' in text or '3 pin' in text or 'three pin' in text:
-            specs['pins'] = 3
-        
-        # RGB facing detection
-        if 'south-facing' in text or 'south facing' in text:
-            specs['facing'] = 'south'
-        elif 'north-facing' in text or 'north facing' in text:
-            specs['facing'] = 'north'
-        
-        # Material detection
-        materials = ['aluminum', 'aluminium', 'plastic', 'abs', 'pbt', 'polycarbonate', 'pc', 'brass', 'steel', 'titanium', 'carbon fiber']
-        for material in materials:
-            if material in text:
-                if material in ['aluminium']:
-                    specs['material'] = 'aluminum'
-                elif material == 'pc':
-                    specs['material'] = 'polycarbonate'
-                else:
-                    specs['material'] = material
-                break
-        
-        return specs
+        """Extract specifications (layout, switch type, pins, facing, material) using the shared spec rules"""
+        return spec_rules.extract_specs(spec_text(title, description, url))
+    
+    def fill_specs(self, products: List[Dict], descriptions: List[str] = None):
+        """Set the specs of a page of products in one batch"""
+        descriptions = descriptions or [''] * len(products)
+        texts = [spec_text(product['name'], description, product.get('product_url') or '')
+                 for product, description in zip(products, descriptions)]
+        for product, specs in zip(products, spec_rules.extract_specs_many(texts)):
+            product['specs'] = specs
     
     def is_valid_product(self, title: str, price: float) -> bool:
         """Check if this looks like a valid product with stricter validation"""
@@ -249,38 +463,29 @@ class BaseScraper:
         if price <= 0 or price > 10000:
             return False
             
-        # Skip obvious non-products
-        skip_keywords = [
-            'gift card', 'shipping', 'tax', 'warranty', 'service',
-            'insurance', 'assembly', 'repair', 'consultation',
-            'subscription', 'membership', 'tutorial', 'course'
-        ]
-        title_lower = title.lower()
-        
-        if any(keyword in title_lower for keyword in skip_keywords):
+        # Skip obvious non-products and things that aren't keyboard components
+        if title_is_skipped(matcher.labels(title)):
             return False
-        
-        # Skip items that are clearly not keyboard components
-        non_component_keywords = [
-            'mouse', 'mousepad', 'monitor', 'headset', 'speaker',
-            'webcam', 'microphone', 'chair', 'desk', 'cable' # unless it's specifically a keyboard cable
-        ]
-        
-        for keyword in non_component_keywords:
-            if keyword in title_lower and 'keyboard' not in title_lower:
-                return False
             
         return True
     
     def debug_page_structure(self, soup, url: str):
-        """Debug page structure to help identify why scraping failed"""
+        """Debug page structure to help identify why scraping failed.
+
+        Only runs with debug logging on, since it serializes parts of the page.
+        """
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         if not soup:
-            print(f"🔍 Debug: No soup for {url}")
+            logger.debug("🔍 Debug: No soup for %s", url)
+            return
+        if soup.scoped:
+            # A full parse is retried before giving up, debug that one instead
             return
             
-        print(f"🔍 Debug info for {url}:")
-        print(f"   - Page title: {soup.title.string if soup.title else 'None'}")
-        print(f"   - Body length: {len(str(soup.body)) if soup.body else 0}")
+        lines = [f"🔍 Debug info for {url}:", f"   - Page title: {soup.title()}"]
+        body = soup.select_one('body')
+        lines.append(f"   - Body length: {len(body.html()) if body else 0}")
         
         # Look for common product container patterns
         common_selectors = [
@@ -297,16 +502,16 @@ class BaseScraper:
         for selector in common_selectors:
             elements = soup.select(selector)
             if elements:
-                print(f"   - Found {len(elements)} elements with selector: {selector}")
+                lines.append(f"   - Found {len(elements)} elements with selector: {selector}")
                 # Show a sample element
-                if elements:
-                    sample = str(elements[0])[:200]
-                    print(f"   - Sample: {sample}...")
+                lines.append(f"   - Sample: {elements[0].html()[:200]}...")
                 break
         else:
-            print("   - No common product containers found")
+            lines.append("   - No common product containers found")
             
         # Look for pagination or "no results" messages
-        no_results_indicators = soup.find_all(text=re.compile(r'no products|no results|0 products|empty', re.I))
-        if no_results_indicators:
-            print(f"   - Found 'no results' indicators: {[text.strip() for text in no_results_indicators[:3]]}")
\ No newline at end of file
+        no_results_indicator = soup.find_text(re.compile(r'no products|no results|0 products|empty', re.I))
+        if no_results_indicator:
+            lines.append(f"   - Found 'no results' indicator: {no_results_indicator}")
+        
+        logger.debug('\n'.join(lines))
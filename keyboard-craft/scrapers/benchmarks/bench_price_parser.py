@@ -0,0 +1,145 @@
+"""
+Micro-benchmark: utils.price_parser against the old BaseScraper.parse_price.
+
+Run from the scrapers directory:
+    python benchmarks/bench_price_parser.py [--repeat 5] [--size 20000]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import sys
+import timeit
+
+# Add the scrapers directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.price_parser import parse_price, parse_prices
+
+# Price texts as they come out of the retailers' price elements
+SAMPLES = [
+    '$19.99', 'From $19.99', '$0.65', '$129.00 USD', 'Sale price$79.00 Regular price$99.00',
+    'Regular price $99.00 Sale price $79.00', '$10.00 - $25.00', 'Sold out', 'Coming soon',
+    '$1,249.00', '€45,90', '£32.50', 'CA$59.99', 'Price: $4.50 each', 'Pre-order',
+    '$0.55 / switch', 'From $2.99 USD', '$ 14.50', '15.00', 'Notify me when available',
+]
+
+
+def legacy_parse_price(price_text: str) -> float:
+    """BaseScraper.parse_price before utils/price_parser.py, kept for comparison"""
+    if not price_text:
+        return 0.0
+
+    price_text_lower = price_text.lower().strip()
+
+    out_of_stock_indicators = [
+        'out of stock', 'sold out', 'unavailable', 'not available',
+        'discontinued', 'pre-order', 'coming soon', 'notify me',
+        'email when available', 'back in stock', 'temporarily unavailable'
+    ]
+
+    if any(indicator in price_text_lower for indicator in out_of_stock_indicators):
+        print(f"⚠️ Product appears to be out of stock: '{price_text}'")
+        return 0.0
+
+    clean_text = price_text.replace('$', '').replace('USD', '').replace('€', '').replace('£', '').replace(',', '').strip()
+
+    skip_words = ['sale', 'save', 'off', 'free', 'shipping', 'tax', 'msrp', 'retail']
+    if any(word in clean_text.lower() for word in skip_words):
+        pass
+
+    price_patterns = [
+        r'from\s*[\$]?(\d+\.?\d*)',
+        r'[\$]?(\d{1,4}\.?\d{0,2})',
+        r'(\d{1,3},\d{3}\.?\d{0,2})',
+    ]
+
+    for pattern in price_patterns:
+        matches = re.findall(pattern, clean_text, re.IGNORECASE)
+        if matches:
+            try:
+                for match in matches:
+                    price_str = match.replace(',', '').replace(' ', '')
+                    price = float(price_str)
+                    if 0.01 <= price <= 10000:
+                        return price
+                    elif price > 10000:
+                        print(f"⚠️ Rejected unreasonable price: ${price} from '{price_text}'")
+                        return 0.0
+            except ValueError:
+                continue
+
+    range_match = re.search(r'(\d+\.?\d*)\s*-\s*(\d+\.?\d*)', clean_text)
+    if range_match:
+        try:
+            min_price = float(range_match.group(1))
+            if 0.01 <= min_price <= 10000:
+                return min_price
+        except ValueError:
+            pass
+
+    print(f"⚠️ Could not parse valid price from: '{price_text}'")
+    return 0.0
+
+
+# Same shapes with varying amounts, so (almost) every string is new
+TEMPLATES = [
+    '${a}', '${a}', '${a}', '${a} USD', 'From ${a}', 'Sale price${a} Regular price${b}',
+    '${a} - ${b}', '€{a}', 'Sold out',
+]
+
+
+def make_batch(size: int, unique: bool) -> list:
+    rng = random.Random(42)
+    if not unique:
+        return [rng.choice(SAMPLES) for _ in range(size)]
+
+    batch = []
+    for _ in range(size):
+        a = rng.randint(100, 50000) / 100
+        batch.append(rng.choice(TEMPLATES).format(a=f"{a:.2f}", b=f"{a * 1.25:.2f}"))
+    return batch
+
+
+def bench(label: str, func, repeat: int) -> float:
+    # The legacy parser prints on every failure, which is part of its cost but not worth showing
+    with contextlib.redirect_stdout(io.StringIO()):
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print(f"   {label:<28}{best * 1000:9.1f} ms")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the price parser')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--size', type=int, default=20000)
+    args = parser.parse_args()
+
+    print("💰 Price parsing")
+    for name, unique in [('repeated strings', False), ('mostly unique strings', True)]:
+        batch = make_batch(args.size, unique)
+        print(f"\n📊 {args.size} {name}")
+        legacy = bench('legacy parse_price', lambda: [legacy_parse_price(t) for t in batch], args.repeat)
+
+        def cold():
+            parse_price.cache_clear()
+            parse_prices(batch)
+
+        new = bench('parse_prices (cold cache)', cold, args.repeat)
+        warm = bench('parse_prices (warm cache)', lambda: parse_prices(batch), args.repeat)
+        print(f"   speedup: {legacy / new:.1f}x cold, {legacy / warm:.1f}x warm")
+
+    print("\n🔍 Results that differ from the legacy parser:")
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_results = [legacy_parse_price(t) for t in SAMPLES]
+    for text, old in zip(SAMPLES, legacy_results):
+        new = parse_price(text)
+        if (new.amount or 0.0) != old:
+            print(f"   {text!r}: {old} -> {new}")
+
+
+if __name__ == "__main__":
+    main()
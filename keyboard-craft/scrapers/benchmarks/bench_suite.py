@@ -0,0 +1,394 @@
+"""
+Offline benchmark suite for the scraping and data hot paths.
+
+Times HTML parsing and product extraction for every retailer over the
+recorded collection pages in benchmarks/fixtures/ and over synthetic pages
+scaled up from them, then parse_price, categorize_product, extract_specs,
+DatabaseManager.save_products, export_to_json and clean_products_data over
+the products those pages yield. Nothing touches the network or data/.
+
+Results are compared with benchmarks/baseline.json. Every run of a benchmark
+is paired with a run of a fixed calibration workload, and the comparison is
+on the median ratio of the two over all runs, so a baseline recorded on one
+machine is still meaningful on another, or on the same one while it is busy.
+Each benchmark runs for at least MIN_TIME seconds, so millisecond-scale
+benchmarks get dozens of runs; the few that stay noisy have a wider
+tolerance in TOLERANCES.
+
+Run from the scrapers directory:
+    python benchmarks/bench_suite.py                  # compare with the baseline
+    python benchmarks/bench_suite.py --save-baseline  # record a new baseline
+    python benchmarks/bench_suite.py --only extract --repeat 10
+
+Exits with status 1 when a benchmark is slower than the baseline by more
+than --tolerance, or its entry in TOLERANCES.
+"""
+
+import argparse
+import contextlib
+import gc
+import html
+import io
+import json
+import logging
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add the scrapers directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clean_data import clean_products_data
+from database.db_manager import DatabaseManager
+from kbdfans_scraper import KBDfansScraper
+from novelkeys_scraper import NovelKeysScraper
+from mechanicalkeyboards_scraper import MechanicalKeyboardsScraper
+from utils import spec_rules
+from utils.keywords import matcher
+from utils.log import setup_logging
+from utils.price_parser import parse_price, parse_prices
+from utils.strategy_cache import StrategyCache
+from bench_price_parser import make_batch
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Seconds each benchmark runs for at least, and the most runs that takes
+MIN_TIME = 1.0
+MAX_RUNS = 200
+# Allowed slowdown for benchmarks whose name contains the key, where --tolerance
+# is too tight: the scaled pages run only a few times in MIN_TIME, and the
+# database and export benchmarks swing with the page cache and the heap
+TOLERANCES = {
+    '-x': 0.4,
+    'save_products': 0.4,
+    'export_to_json': 0.4,
+    'clean_products_data': 0.4,
+}
+
+# Recorded collection pages: fixture name -> scraper, page URL, category, title element
+FIXTURES = {
+    'kbdfans': (KBDfansScraper, 'kbdfans-switches.html', 'https://kbdfans.com/collections/switches',
+                'switches', r'(class="product-block__title">)([^<]+)(<)'),
+    'novelkeys': (NovelKeysScraper, 'novelkeys-keycaps.html', 'https://novelkeys.com/collections/keycaps',
+                  'keycaps', r'(class="product-card__title">)([^<]+)(<)'),
+    'mechanicalkeyboards': (MechanicalKeyboardsScraper, 'mechanicalkeyboards-switches.html',
+                            'https://mechanicalkeyboards.com/shop/index.php?l=product_list&c=107',
+                            'switches', r'(class="product_listing_name" href="[^"]*">)([^<]+)(<)'),
+}
+
+# Names for the copies of each card on a scaled-up page
+COLORWAYS = ['Olivia', 'Botanical', 'Nord', 'Dracula', 'Laser', 'Mizu', 'Striker', 'Oblivion',
+             'Milkshake', 'Bento', 'Hammerhead', 'Oni', 'Jamon', 'Taro', 'Sandstorm', 'Ume']
+
+GRID_START = '<!-- product-grid -->'
+GRID_END = '<!-- /product-grid -->'
+CARD_START = '<!-- product-card -->'
+# Where a card's product URL names the product: Shopify's /products/<handle>
+# and MechanicalKeyboards' index.php?...&p=<n>
+PRODUCT_HANDLE = re.compile(r'(href="[^"?#]*/products/[^"?#/]+)')
+PRODUCT_NUMBER = re.compile(r'(href="[^"]*[?&](?:amp;)?p=\d+)')
+
+
+def load_fixture(filename: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, filename), encoding='utf-8') as f:
+        return f.read()
+
+
+def scale_page(page: str, cards: int, title_pattern: str, seed: int = 42) -> str:
+    """Grow a fixture page to `cards` product cards, each with its own name and price"""
+    rng = random.Random(seed)
+    head, rest = page.split(GRID_START, 1)
+    grid, tail = rest.split(GRID_END, 1)
+    templates = grid.split(CARD_START)[1:]
+    title = re.compile(title_pattern)
+
+    grown = []
+    for i in range(cards):
+        card = templates[i % len(templates)]
+        copy = i // len(templates)
+        if copy:
+            colorway = f"{COLORWAYS[copy % len(COLORWAYS)]} R{copy // len(COLORWAYS) + 1}"
+            card = title.sub(lambda m: f"{m.group(1)}{m.group(2)} {html.escape(colorway)}{m.group(3)}", card)
+            factor = rng.uniform(0.8, 1.25)
+            card = re.sub(r'\$(\d+\.\d{2})', lambda m: f"${float(m.group(1)) * factor:.2f}", card)
+            # A product URL of its own, or saving the copies would upsert one row per template
+            card = PRODUCT_HANDLE.sub(lambda m: f"{m.group(1)}-r{copy}", card)
+            card = PRODUCT_NUMBER.sub(lambda m: f"{m.group(1)}{copy:04d}", card)
+        grown.append(CARD_START + card)
+    return f"{head}{GRID_START}{''.join(grown)}{GRID_END}{tail}"
+
+
+def clear_caches():
+    """Forget memoized results, so every run pays for the real work"""
+    parse_price.cache_clear()
+    matcher.labels.cache_clear()
+    spec_rules._extract.cache_clear()
+
+
+_CALIBRATION_PATTERN = re.compile(r'(\w+)-(\d+)')
+
+
+def calibration_workload():
+    """A fixed mix of dict, string, regex and JSON work (~10 ms)"""
+    table = {}
+    for i in range(12000):
+        key = f"item-{i % 1000}"
+        table[key] = table.get(key, 0) + i
+        _CALIBRATION_PATTERN.match(key)
+    json.loads(json.dumps(sorted(table.items())))
+
+
+def measure(func: Callable, setup: Callable = None, repeat: int = 5, min_time: float = MIN_TIME) -> Tuple[float, float]:
+    """Median wall time of func over at least `repeat` runs and `min_time` seconds,
+    and the median of each run's time over the calibration workload run right before it.
+
+    setup runs untimed before each run. Like timeit, the garbage collector is
+    off while timing, so a collection landing in one run doesn't count.
+    """
+    times, ratios = [], []
+    spent = 0.0
+    while len(times) < repeat or (spent < min_time and len(times) < MAX_RUNS):
+        if setup:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            calibration_workload()
+            middle = time.perf_counter()
+            func()
+            end = time.perf_counter()
+        finally:
+            gc.enable()
+        times.append(end - middle)
+        ratios.append((end - middle) / (middle - start))
+        spent += end - start
+    return statistics.median(times), statistics.median(ratios)
+
+
+class Suite:
+    def __init__(self, cards: int, repeat: int, only: Optional[str] = None):
+        self.cards = cards
+        self.repeat = repeat
+        self.only = only
+        # name -> {'seconds': median time, 'relative': median of time / calibration}
+        self.results: Dict[str, Dict[str, float]] = {}
+        self.benchmarks: Dict[str, Tuple[Callable, Callable]] = {}
+        self.workdir = tempfile.mkdtemp(prefix='kc-bench-')
+
+        # Scrapers learn selector strategies as they go; keep that out of data/
+        strategy_cache = StrategyCache(os.path.join(self.workdir, 'selector_cache'))
+        self.pages = {}
+        for name, (scraper_class, filename, url, category, title_pattern) in FIXTURES.items():
+            scraper = scraper_class()
+            scraper.strategy_cache = strategy_cache
+            page = load_fixture(filename)
+            self.pages[name] = (scraper, url, category, page, scale_page(page, cards, title_pattern))
+
+    def close(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def bench(self, name: str, func: Callable, setup: Callable = None):
+        if self.only and self.only not in name:
+            return
+        self.benchmarks[name] = (func, setup)
+        self.measure(name, self.repeat)
+
+    def measure(self, name: str, repeat: int):
+        func, setup = self.benchmarks[name]
+        seconds, relative = measure(func, setup, repeat)
+        self.results[name] = {'seconds': seconds, 'relative': relative}
+        print(f"   {name:<40}{seconds * 1000:10.2f} ms")
+
+    def report_scoping(self):
+        """Print what the scoped parse costs next to the full parse of the same page"""
+        pairs = [(name[len('parse-scoped/'):], result['seconds']) for name, result in self.results.items()
+                 if name.startswith('parse-scoped/') and f"parse/{name[len('parse-scoped/'):]}" in self.results]
+        if not pairs:
+            return
+        print("\n🔬 Scoped parse against the full parse")
+        for label, seconds in pairs:
+            ratio = seconds / self.results[f"parse/{label}"]['seconds']
+            print(f"   {label:<40}{ratio:9.2f}x  {'✅ cheaper' if ratio < 1 else '⚠️ not cheaper'}")
+
+    def run(self) -> Dict[str, Dict[str, float]]:
+        print(f"📄 Retailer pages (fixtures, and scaled to {self.cards} cards)")
+        products = []
+        for name, (scraper, url, category, page, scaled) in self.pages.items():
+            for label, content in ((name, page), (f"{name}-x{self.cards}", scaled)):
+                content = content.encode('utf-8')
+                # Loop variables are bound as defaults: main() measures these
+                # again after the loop has moved on to other pages
+                self.bench(f"parse/{label}", lambda scraper=scraper, content=content: scraper.parser.parse(
+                    content, links=scraper.pager_links))
+                if scraper.parse_scope:
+                    self.bench(f"parse-scoped/{label}", lambda scraper=scraper, content=content: scraper.parser.parse(
+                        content, scope=scraper.parse_scope, links=scraper.pager_links))
+
+                doc = scraper.parser.parse(content, links=scraper.pager_links)
+                self.bench(f"extract/{label}", lambda scraper=scraper, doc=doc, url=url, category=category:
+                           scraper._parse_page(doc, url, category), clear_caches)
+            clear_caches()
+            products += scraper._parse_page(scraper.parser.parse(scaled.encode('utf-8')), url, category)
+        self.report_scoping()
+
+        print(f"\n🧮 Product fields ({len(products)} products)")
+        scraper = self.pages['kbdfans'][0]
+        names = [product['name'] for product in products]
+        urls = [product.get('product_url') or '' for product in products]
+        price_texts = make_batch(len(products), unique=True)
+        self.bench('parse_price', lambda: parse_prices(price_texts), clear_caches)
+        self.bench('categorize_product', lambda: [scraper.categorize_product(n, [], u) for n, u in zip(names, urls)],
+                   clear_caches)
+        self.bench('extract_specs', lambda: [scraper.extract_specs(n, '', u) for n, u in zip(names, urls)],
+                   clear_caches)
+
+        # fill_specs replaces each product's specs: every run gets fresh copies
+        # of the products and empty caches, not the previous run's leftovers
+        spec_products = []
+
+        def fresh_products():
+            spec_products[:] = [dict(product) for product in products]
+            clear_caches()
+
+        self.bench('fill_specs', lambda: scraper.fill_specs(spec_products), fresh_products)
+
+        print(f"\n💾 Database and export ({len(products)} products)")
+        db_path = os.path.join(self.workdir, 'bench.db')
+        export_path = os.path.join(self.workdir, 'export.json')
+        db = None
+
+        def fresh_db():
+            nonlocal db
+            if db:
+                db.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+            db = DatabaseManager(db_path)
+
+        self.bench('save_products', lambda: db.save_products(products), fresh_db)
+        if db is None:
+            fresh_db()
+            db.save_products(products)
+        self.bench('export_to_json', lambda: db.export_to_json(export_path))
+        if not os.path.exists(export_path):
+            db.export_to_json(export_path)
+        db.close()
+
+        clean_dir = os.path.join(self.workdir, 'clean')
+        clean_input = os.path.join(clean_dir, 'export.json')
+
+        def fresh_export():
+            os.makedirs(clean_dir, exist_ok=True)
+            shutil.copyfile(export_path, clean_input)
+            clear_caches()
+
+        def clean():
+            # clean_data reports with print; that's not what is being measured
+            with contextlib.redirect_stdout(io.StringIO()):
+                clean_products_data(clean_input)
+
+        self.bench('clean_products_data', clean, fresh_export)
+        return self.results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict, tolerance: float,
+            noise: float = 0.002) -> List[str]:
+    """Print each benchmark against the baseline, return the names that regressed.
+
+    A benchmark in TOLERANCES may be slower by that much instead of `tolerance`,
+    if it's more. Differences under `noise` seconds never count as a regression.
+    """
+    regressions = []
+
+    print(f"\n📊 Against baseline ({baseline['recorded_at']}, Python {baseline['python']})")
+    for name, result in results.items():
+        if name not in baseline['results']:
+            print(f"   {name:<40}{'new':>10}")
+            continue
+        change = result['relative'] / baseline['results'][name]['relative'] - 1
+        # The baseline time as it would be on this machine right now
+        expected = result['seconds'] / (1 + change)
+        flag = ''
+        allowed = max([tolerance] + [value for key, value in TOLERANCES.items() if key in name])
+        if change > allowed and result['seconds'] - expected > noise:
+            flag = f"  ❌ regression (over {allowed:.0%})"
+            regressions.append(name)
+        elif change < -tolerance:
+            flag = '  🚀 faster'
+        print(f"   {name:<40}{expected * 1000:10.2f} ms -> {result['seconds'] * 1000:10.2f} ms {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scraping and data hot paths')
+    parser.add_argument('--cards', type=int, default=1000, help='Product cards per scaled-up page (default: 1000)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help=f'Runs per benchmark at least, the median counts (default: 5, and {MIN_TIME:g}s worth)')
+    parser.add_argument('--only', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline file (default: benchmarks/baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline before failing (default: 0.25 = 25%%)')
+    args = parser.parse_args()
+    if args.save_baseline and args.only:
+        parser.error('--save-baseline records the whole suite, drop --only')
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['cards'] != args.cards:
+            print(f"⚠️ Baseline was recorded with --cards {baseline['cards']}, not comparing\n")
+            baseline = None
+
+    # Benchmarks measure the quiet production path
+    setup_logging(logging.WARNING)
+
+    suite = Suite(args.cards, args.repeat, args.only)
+    regressions = []
+    try:
+        results = suite.run()
+        if baseline:
+            regressions = compare(results, baseline, args.tolerance)
+            if regressions:
+                # A busy machine can slow down any single benchmark; only repeatable slowdowns count
+                print(f"\n🔁 Measuring {len(regressions)} suspect(s) again")
+                for name in regressions:
+                    suite.measure(name, args.repeat * 2)
+                regressions = compare({name: suite.results[name] for name in regressions},
+                                      baseline, args.tolerance)
+    finally:
+        suite.close()
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python': platform.python_version(),
+                'cards': args.cards,
+                'results': results,
+            }, f, indent=2)
+            f.write('\n')
+        print(f"\n💾 Baseline saved to {args.baseline}")
+    elif not baseline:
+        print("\n⚠️ Nothing to compare with, record a baseline with --save-baseline")
+    elif regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) slower than the baseline by more than their tolerance")
+        sys.exit(1)
+    else:
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
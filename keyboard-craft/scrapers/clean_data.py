@@ -8,12 +8,16 @@ Data cleaner to fix issues with scraped data:
 import sys
 import os
 import json
-import re
 from datetime import datetime
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from database.json_export import catalog_files, write_catalog, write_sidecars
+from utils.spec_rules import extract_specs, extract_specs_many
+from utils import profiling
+from utils.log import setup_logging
+
 def clean_price(price, name):
     """Clean and validate price"""
     if price <= 0:
@@ -30,69 +34,18 @@ def detect_layout(name, specs):
     if specs.get('layout'):
         return specs['layout']  # Already has layout
     
-    name_lower = name.lower()
-    
-    # Layout patterns with more comprehensive detection
-    layout_patterns = {
-        '40%': ['40%', 'forty', 'planck', 'minila'],
-        '60%': ['60%', 'sixty', 'poker', 'hhkb', 'tofu60', 'dz60'],
-        '65%': ['65%', 'sixty-five', 'sixty five', 'tofu65', 'nk65', 'kbd67', 'margo', 'voice65', 'think6.5', 'prophet'],
-        '75%': ['75%', 'seventy-five', 'seventy five', 'kbd75', 'gmmk pro', 'id80', 'satisfaction75'],
-        'TKL': ['tkl', 'tenkeyless', '80%', 'eighty', '87 key', 'mode80', 'mr suit'],
-        '96%': ['96%', 'ninety-six', 'compact full'],
-        'Full': ['full size', 'full-size', '104 key', '100%'],
-        'Alice': ['alice', 'arisu', 'maja'],
-        'Split': ['split', 'ergodox', 'kinesis', 'lily58'],
-        'Ortho': ['ortho', 'ortholinear', 'planck', 'preonic'],
-    }
-    
-    for layout, keywords in layout_patterns.items():
-        if any(keyword in name_lower for keyword in keywords):
-            return layout
-    
-    # Try to extract from common naming patterns
-    size_match = re.search(r'(\d+)%', name_lower)
-    if size_match:
-        percentage = size_match.group(1)
-        return f"{percentage}%"
-    
-    return None
+    return extract_specs(name).get('layout')
 
-def enhance_specs(name, specs):
-    """Enhance product specifications"""
+def enhance_specs(name, specs, derived_specs=None):
+    """Enhance product specifications, filling in whatever the spec rules find in the name"""
     enhanced_specs = specs.copy()
-    name_lower = name.lower()
-    
-    # Detect layout if missing
-    layout = detect_layout(name, specs)
-    if layout:
-        enhanced_specs['layout'] = layout
+    if derived_specs is None:
+        derived_specs = extract_specs(name)
     
-    # Detect switch type if missing
-    if not specs.get('switch_type'):
-        if any(word in name_lower for word in ['linear']):
-            enhanced_specs['switch_type'] = 'linear'
-        elif any(word in name_lower for word in ['tactile']):
-            enhanced_specs['switch_type'] = 'tactile'
-        elif any(word in name_lower for word in ['clicky', 'click']):
-            enhanced_specs['switch_type'] = 'clicky'
-    
-    # Detect material if missing
-    if not specs.get('material'):
-        materials = {
-            'aluminum': ['aluminum', 'aluminium', 'alu'],
-            'polycarbonate': ['polycarbonate', 'pc'],
-            'abs': ['abs'],
-            'pbt': ['pbt'],
-            'brass': ['brass'],
-            'steel': ['steel'],
-            'titanium': ['titanium'],
-        }
-        
-        for material, keywords in materials.items():
-            if any(keyword in name_lower for keyword in keywords):
-                enhanced_specs['material'] = material
-                break
+    # Only fill in missing specs, scraped ones win
+    for key, value in derived_specs.items():
+        if not enhanced_specs.get(key):
+            enhanced_specs[key] = value
     
     return enhanced_specs
 
@@ -109,13 +62,17 @@ def clean_products_data(input_file, output_file=None):
         return
     
     print(f"📊 Found {len(products)} products to clean")
+    profiling.checkpoint()
+    
+    # Derive specs for the whole catalog in one batch
+    derived_specs = extract_specs_many([product.get('name', '') for product in products])
     
     cleaned_products = []
     removed_count = 0
     price_fixed_count = 0
     spec_enhanced_count = 0
     
-    for product in products:
+    for product, derived in zip(products, derived_specs):
         try:
             name = product.get('name', '')
             price = product.get('price', 0)
@@ -135,7 +92,7 @@ def clean_products_data(input_file, output_file=None):
             
             # Enhance specs
             original_specs = specs.copy()
-            enhanced_specs = enhance_specs(name, specs)
+            enhanced_specs = enhance_specs(name, specs, derived)
             
             if enhanced_specs != original_specs:
                 spec_enhanced_count += 1
@@ -150,6 +107,8 @@ def clean_products_data(input_file, output_file=None):
             print(f"❌ Error processing product {product.get('name', 'Unknown')}: {e}")
             continue
     
+    profiling.checkpoint()
+    
     # Summary
     print(f"\n📊 Cleaning Summary:")
     print(f"   - Original products: {len(products)}")
@@ -167,10 +126,11 @@ def clean_products_data(input_file, output_file=None):
             json.dump(cleaned_products, f, indent=2, ensure_ascii=False)
         print(f"✅ Cleaned data saved to {output_file}")
         
-        # Also update the latest-export.json
+        # Also update the latest-export.json and its shards, atomically since the API may be reading them
         latest_file = os.path.join(os.path.dirname(output_file), 'latest-export.json')
-        with open(latest_file, 'w', encoding='utf-8') as f:
-            json.dump(cleaned_products, f, indent=2, ensure_ascii=False)
+        manifest = write_catalog(latest_file, cleaned_products)
+        for path in catalog_files(os.path.dirname(latest_file), manifest):
+            write_sidecars(path)
         print(f"✅ Updated latest export: {latest_file}")
         
     except Exception as e:
@@ -236,7 +196,10 @@ def main():
     parser.add_argument('--analyze', action='store_true', help='Analyze data for issues')
     parser.add_argument('--clean', action='store_true', help='Clean the data')
     parser.add_argument('--file', default='../data/products/latest-export.json', help='Input file path')
+    parser.add_argument('--profile', action='store_true', help='Profile the cleaning pass into data/profiles/')
+    parser.add_argument('--profile-top', type=int, default=25, help='Hotspots listed in the profile summary')
     args = parser.parse_args()
+    setup_logging()
     
     # Get absolute path
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -250,7 +213,11 @@ def main():
         analyze_data(input_file)
     
     if args.clean:
-        clean_products_data(input_file)
+        if args.profile:
+            with profiling.Profiler('clean', top=args.profile_top):
+                clean_products_data(input_file)
+        else:
+            clean_products_data(input_file)
     
     if not args.analyze and not args.clean:
         print("Please specify --analyze or --clean (or both)")
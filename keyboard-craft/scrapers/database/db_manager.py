@@ -1,27 +1,174 @@
 import sqlite3
+import hashlib
 import json
+import logging
+import re
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
 import os
 
+from database.json_export import (DELTA_KEEP, EXTENSIONS, catalog_files, delta_path, prune_deltas, write_catalog,
+                                  write_delta, write_products, write_sidecars)
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ('case', 'pcb', 'switches', 'keycaps', 'stabilizers')
+
+# Anything but letters, digits, '_' and '-' is dropped from product IDs
+ID_UNSAFE = re.compile(r'[^\w-]')
+ID_MAX_LENGTH = 50
+# Hex digits of the sha1 appended to IDs that had to be shortened or cleaned up
+ID_HASH_LENGTH = 12
+# Query parameters that don't change which product a URL points to
+TRACKING_PARAMS = {'variant', 'ref', 'fbclid', 'gclid', '_pos', '_sid', '_ss', '_psq', '_v'}
+
+# Spec values of a products row, space separated, for the search index
+SPEC_TEXT = "(SELECT group_concat(value, ' ') FROM json_each(CASE WHEN json_valid({0}) THEN {0} ELSE '{{}}' END))"
+# bm25 weights of the indexed columns: name, retailer, specs, and category,
+# which is only there to filter on
+SEARCH_WEIGHTS = (10.0, 2.0, 1.0, 0.0)
+
+# Spec keys the builder filters on, promoted to generated columns of products
+# (schema 6) so they can be indexed; column name = key in the specs JSON
+SPEC_COLUMNS = {
+    'layout': 'TEXT',
+    'switch_type': 'TEXT',
+    'pins': 'INTEGER',
+    'facing': 'TEXT',
+    'material': 'TEXT',
+}
+# Composite indexes over them, each ending in price: a spec filter with a
+# price bound ("65% cases under $200") is one range scan, already cheapest first
+SPEC_INDEXES = {
+    'idx_products_layout': ('category', 'layout', 'price'),
+    'idx_products_switch_type': ('category', 'switch_type', 'price'),
+    'idx_products_pins': ('category', 'pins', 'price'),
+}
+# What a product is read back as; the generated columns are left out, their
+# values are already in specs
+PRODUCT_COLUMNS = ('id, name, category, price, currency, availability, image_url, product_url, retailer, '
+                   'specs, created_at, updated_at, change_seq')
+
+
+def default_products_dir() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, 'data', 'products')
+
+
+def canonical_url(url: str) -> str:
+    """A product URL without the parts that differ between links to the same product"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/').lower()
+    # Shopify also links products inside collections: /collections/<c>/products/<handle>
+    if '/products/' in path:
+        path = path[path.index('/products/'):]
+    # Some shops tell products apart by the query alone (MechanicalKeyboards:
+    # /shop/index.php?l=product_detail&p=5200), so it stays, sorted and without tracking
+    query = sorted((name, value) for name, value in parse_qsl(parts.query)
+                   if name.lower() not in TRACKING_PARAMS and not name.lower().startswith('utm_'))
+    return host + path + ('?' + urlencode(query) if query else '')
+
+
 class DatabaseManager:
-    def __init__(self, db_path: str = None):
+    # Seconds a connection waits for another writer before raising "database is locked"
+    busy_timeout = 30
+
+    # Bumped whenever init_database changes the schema; stored in PRAGMA user_version
+    schema_version = 7
+
+    # Applied to the connection when it is opened; override per instance with
+    # DatabaseManager(pragmas={...}), e.g. {'journal_mode': 'DELETE'}
+    pragmas = {
+        'journal_mode': 'WAL',     # readers (the Next.js API) don't block scraper writes
+        'synchronous': 'NORMAL',   # durable with WAL, only fsyncs at checkpoints
+        'cache_size': -32000,      # negative means KiB: a 32 MB page cache
+        'temp_store': 'MEMORY',
+    }
+
+    def __init__(self, db_path: str = None, pragmas: Dict = None):
         if db_path is None:
             # Get the project root directory
             project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
             self.db_path = os.path.join(project_root, 'data', 'keyboards.db')
         else:
             self.db_path = db_path
+        self.pragmas = {**self.pragmas, **(pragmas or {})}
             
+        # One connection for the manager's lifetime, shared by the scraper
+        # threads; the lock serializes every use of it
+        self._lock = threading.Lock()
+        
         # Create data directory if it doesn't exist
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = self._connect()
         self.init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly by _transaction()
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """One write transaction: committed when the block finishes, rolled back if it raises"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+    
+    def close(self):
+        """Close the connection (checkpointing the WAL into the database file)"""
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
     def init_database(self):
-        """Initialize SQLite database with tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        """Create or migrate the schema, unless the database is already at schema_version"""
+        with self._lock:
+            version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+            if version >= self.schema_version:
+                logger.debug("Database at %s is up to date (schema %d)", self.db_path, version)
+                return
+            with self._transaction():
+                cursor = self.conn.cursor()
+                if version < 1:
+                    self._create_schema(cursor)
+                if version < 2:
+                    self._migrate_price_intervals(cursor)
+                if version < 3:
+                    self._migrate_product_ids(cursor)
+                if version < 4:
+                    self._migrate_change_tracking(cursor)
+                if version < 5:
+                    self._migrate_search_index(cursor)
+                if version < 6:
+                    self._migrate_spec_columns(cursor)
+                if version < 7:
+                    self._migrate_query_ids(cursor)
+                self.conn.execute(f"PRAGMA user_version = {self.schema_version}")
+        logger.info("✅ Database initialized at %s (schema %d)", self.db_path, self.schema_version)
+    
+    def _create_schema(self, cursor: sqlite3.Cursor):
         # Products table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS products (
@@ -54,33 +201,194 @@ class DatabaseManager:
         # Create indexes
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category ON products(category)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_retailer ON products(retailer)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_price_history_product ON price_history(product_id, recorded_at)')
+    
+    def _migrate_price_intervals(self, cursor: sqlite3.Cursor):
+        # Schema 2: a price_history row is an interval, (price, availability) seen
+        # from first_seen to last_seen, instead of one row per product per run.
+        # Checks the columns, since lib/database/migrations.ts may have created
+        # the table in either shape
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(price_history)')}
+        if 'recorded_at' in columns:
+            cursor.execute('ALTER TABLE price_history RENAME COLUMN recorded_at TO first_seen')
+        if 'last_seen' not in columns:
+            cursor.execute('ALTER TABLE price_history ADD COLUMN last_seen TEXT')
+            cursor.execute('UPDATE price_history SET last_seen = first_seen')
+        if 'availability' not in columns:
+            # Left NULL (unknown) on old rows; the next save fills it in
+            cursor.execute('ALTER TABLE price_history ADD COLUMN availability INTEGER')
+        cursor.execute('DROP INDEX IF EXISTS idx_price_history_product')
+        cursor.execute('CREATE INDEX idx_price_history_product ON price_history(product_id, first_seen)')
+    
+    def _migrate_product_ids(self, cursor: sqlite3.Cursor):
+        # Schema 3: product IDs come from the canonical product URL rather than
+        # the truncated name, so existing rows (and their history) are re-keyed
+        id_map = {}
+        latest = {}
+        for old_id, name, retailer, product_url, updated_at in cursor.execute(
+                'SELECT id, name, retailer, product_url, updated_at FROM products'):
+            new_id = self.product_id({'name': name, 'retailer': retailer, 'product_url': product_url})
+            id_map[old_id] = new_id
+            # Rows that turn out to be the same product: the most recently updated one is kept
+            if new_id not in latest or (updated_at or '') > latest[new_id][1]:
+                latest[new_id] = (old_id, updated_at or '')
+        
+        keep = {old_id for old_id, _ in latest.values()}
+        cursor.executemany('DELETE FROM products WHERE id = ?', [(old_id,) for old_id in id_map if old_id not in keep])
+        
+        renamed = [(old_id, new_id) for old_id, new_id in id_map.items() if old_id != new_id]
+        cursor.execute('CREATE TEMP TABLE id_map (old_id TEXT PRIMARY KEY, new_id TEXT)')
+        cursor.executemany('INSERT INTO id_map VALUES (?, ?)', renamed)
+        # Moved out of the way first (':' never appears in an ID), so a new ID
+        # can't clash with an old one that is still waiting to be renamed
+        cursor.execute("UPDATE products SET id = 'migrating:' || id WHERE id IN (SELECT old_id FROM id_map)")
+        cursor.execute('''
+            UPDATE products SET id = (SELECT new_id FROM id_map WHERE old_id = substr(products.id, 11))
+            WHERE id LIKE 'migrating:%'
+        ''')
+        cursor.execute('''
+            UPDATE price_history SET product_id = (SELECT new_id FROM id_map WHERE old_id = product_id)
+            WHERE product_id IN (SELECT old_id FROM id_map)
+        ''')
+        cursor.execute('DROP TABLE id_map')
+        if renamed:
+            logger.info("🔑 Re-keyed %d products (%d duplicates merged)",
+                        len([old_id for old_id, _ in renamed if old_id in keep]), len(id_map) - len(keep))
+    
+    def _migrate_change_tracking(self, cursor: sqlite3.Cursor):
+        # Schema 4: a catalog version that goes up with every write that changes
+        # something. Each product row keeps the version that last changed it
+        # (change_seq), and removed products leave a tombstone, so export_delta()
+        # can tell a consumer what changed since the version it has
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(products)')}
+        if 'change_seq' not in columns:
+            cursor.execute('ALTER TABLE products ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_change_seq ON products(change_seq)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS deleted_products (
+                id TEXT PRIMARY KEY,
+                change_seq INTEGER NOT NULL,
+                deleted_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_deleted_products_change_seq ON deleted_products(change_seq)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''')
+        # What's already there becomes version 1, so a delta since 0 is the whole catalog
+        has_products = cursor.execute('SELECT EXISTS (SELECT 1 FROM products)').fetchone()[0]
+        cursor.execute('UPDATE products SET change_seq = 1 WHERE change_seq = 0')
+        cursor.execute('INSERT OR IGNORE INTO catalog_state (id, version) VALUES (1, ?)', (1 if has_products else 0,))
+    
+    def _migrate_search_index(self, cursor: sqlite3.Cursor):
+        # Schema 5: full-text index over name, retailer and spec values, rowid
+        # for rowid with products. Category is indexed too, so a category
+        # search is narrowed inside the index instead of by joining every
+        # match to products. Writes reindex what they changed in one statement
+        # (_index_products): through a trigger FTS5 flushes a segment per row
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                name, retailer, specs, category,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+                DELETE FROM products_fts WHERE rowid = OLD.rowid;
+            END
+        ''')
+        cursor.execute('DELETE FROM products_fts')
+        cursor.execute(f'''
+            INSERT INTO products_fts (rowid, name, retailer, specs, category)
+            SELECT rowid, name, retailer, {SPEC_TEXT.format('specs')}, category FROM products
+        ''')
+    
+    def _migrate_spec_columns(self, cursor: sqlite3.Cursor):
+        # Schema 6: the specs the builder filters on as generated columns. They
+        # are VIRTUAL (the only kind ALTER TABLE can add): nothing more is
+        # stored in the table, the value is computed from specs when a row is
+        # written to an index or filtered on. json_valid guards the rows whose
+        # specs aren't JSON, json_extract would raise on them
+        columns = {row[1] for row in cursor.execute('PRAGMA table_xinfo(products)')}
+        for column, column_type in SPEC_COLUMNS.items():
+            if column not in columns:
+                cursor.execute(f'''
+                    ALTER TABLE products ADD COLUMN {column} {column_type}
+                    GENERATED ALWAYS AS (CASE WHEN json_valid(specs) THEN json_extract(specs, '$.{column}') END) VIRTUAL
+                ''')
+        for index, columns in SPEC_INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index} ON products({', '.join(columns)})")
+    
+    def _migrate_query_ids(self, cursor: sqlite3.Cursor):
+        # Schema 7: canonical URLs keep the query that identifies a product, so
+        # the products schema 3 keyed to one ID per retailer (every
+        # MechanicalKeyboards index.php?...&p=<n>) get their own IDs again. Only
+        # the last one saved survived; the next scrape brings back the others.
+        # Renames reach delta consumers as a removal plus a change
+        before = {row[0] for row in cursor.execute('SELECT id FROM products')}
+        self._migrate_product_ids(cursor)
+        after = {row[0] for row in cursor.execute('SELECT id FROM products')}
+        if before == after:
+            return
         
-        conn.commit()
-        conn.close()
-        print(f"✅ Database initialized at {self.db_path}")
+        version = self._catalog_version() + 1
+        cursor.executemany('INSERT OR REPLACE INTO deleted_products (id, change_seq) VALUES (?, ?)',
+                           [(product_id, version) for product_id in before - after])
+        cursor.executemany('DELETE FROM deleted_products WHERE id = ?', [(product_id,) for product_id in after - before])
+        cursor.executemany('UPDATE products SET change_seq = ? WHERE id = ?',
+                           [(version, product_id) for product_id in after - before])
+        self._set_catalog_version(version)
+    
+    def _catalog_version(self) -> int:
+        return self.conn.execute('SELECT version FROM catalog_state WHERE id = 1').fetchone()[0]
+    
+    def catalog_version(self) -> int:
+        """Version of the catalog as of its last change"""
+        with self._lock:
+            return self._catalog_version()
+    
+    @staticmethod
+    def product_id(product: Dict) -> str:
+        """Stable ID from the retailer and the canonical product URL, or the name when there is no URL"""
+        retailer = product['retailer'].lower()
+        if product.get('product_url'):
+            key = canonical_url(product['product_url'])
+            path, _, query = key.partition('?')
+            readable = path.rsplit('/', 1)[-1]
+            if query:
+                # index.php?l=product_detail&p=5200 -> index-product_detail-5200
+                readable = '-'.join([readable.rsplit('.', 1)[0]] + [value for _, value in parse_qsl(query)])
+        else:
+            key = readable = product['name'].lower()
+        
+        slug = ID_UNSAFE.sub('', readable.replace(' ', '-').replace('/', '-'))
+        product_id = ID_UNSAFE.sub('', retailer.replace(' ', '-')) + '-' + slug
+        if slug != readable or len(product_id) > ID_MAX_LENGTH:
+            # Cleaning up or shortening could make two products meet, the hash of the full key keeps them apart
+            digest = hashlib.sha1(f"{retailer}|{key}".encode('utf-8')).hexdigest()[:ID_HASH_LENGTH]
+            product_id = f"{product_id[:ID_MAX_LENGTH - ID_HASH_LENGTH - 1].rstrip('-')}-{digest}"
+        return product_id
     
     def save_products(self, products: List[Dict]) -> int:
         """Save products to database, return count of saved items"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        saved_count = 0
+        with self._lock:
+            with metrics.timer('db_save'):
+                saved_count = self._save_products(products)
+        metrics.inc('db_products_saved', saved_count)
+        return saved_count
+
+    def _save_products(self, products: List[Dict]) -> int:
+        now = datetime.now().isoformat()
+        rows = []
         for product in products:
             try:
-                # Generate ID from retailer and name
-                product_id = f"{product['retailer'].lower()}-{product['name'].lower().replace(' ', '-').replace('/', '-')}"
-                product_id = ''.join(c for c in product_id if c.isalnum() or c in '-_')[:50]  # Limit length
-                
-                # Convert specs to JSON string
-                specs_json = json.dumps(product.get('specs', {}))
-                
-                cursor.execute('''
-                    INSERT OR REPLACE INTO products 
-                    (id, name, category, price, availability, image_url, product_url, retailer, specs, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    product_id,
+                if product['category'] not in CATEGORIES:
+                    raise ValueError(f"unknown category '{product['category']}'")
+                rows.append((
+                    self.product_id(product),
                     product['name'],
                     product['category'],
                     product['price'],
@@ -88,39 +396,311 @@ class DatabaseManager:
                     product.get('image_url'),
                     product.get('product_url'),
                     product['retailer'],
-                    specs_json,
-                    datetime.now().isoformat()
+                    json.dumps(product.get('specs', {})),
+                    now
                 ))
-                
-                # Save price history
-                cursor.execute('''
-                    INSERT INTO price_history (product_id, price)
-                    VALUES (?, ?)
-                ''', (product_id, product['price']))
-                
-                saved_count += 1
-                
             except Exception as e:
-                print(f"❌ Error saving product {product.get('name', 'Unknown')}: {e}")
+                logger.warning("❌ Error saving product %s: %s", product.get('name', 'Unknown'), e)
+        
+        try:
+            with self._transaction():
+                version = self._catalog_version() + 1
+                written = self._write_rows(rows, version)
+                if written:
+                    self._index_products(version)
+                    self._set_catalog_version(version)
+        except sqlite3.IntegrityError:
+            # Find the offending rows instead of losing the whole batch
+            return self._write_rows_one_by_one(rows)
+        # Counted once committed, so a batch that falls back isn't counted twice
+        metrics.inc('db_products_written', written)
+        return len(rows)
+    
+    def _set_catalog_version(self, version: int):
+        self.conn.execute('UPDATE catalog_state SET version = ? WHERE id = 1', (version,))
+    
+    def _write_rows(self, rows: List[tuple], version: int) -> int:
+        """Upsert rows as of catalog `version`, return how many were inserted or changed"""
+        # An upsert rather than INSERT OR REPLACE: the row is updated in place
+        # (created_at survives), and a product that hasn't changed isn't
+        # written at all, so updated_at is the time of the last real change
+        cursor = self.conn.executemany('''
+            INSERT INTO products
+            (id, name, category, price, availability, image_url, product_url, retailer, specs, updated_at,
+             change_seq)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                name = excluded.name, category = excluded.category, price = excluded.price,
+                availability = excluded.availability, image_url = excluded.image_url,
+                product_url = excluded.product_url, retailer = excluded.retailer,
+                specs = excluded.specs, updated_at = excluded.updated_at, change_seq = excluded.change_seq
+            WHERE (products.name, products.category, products.price, products.availability,
+                   products.image_url, products.product_url, products.retailer, products.specs)
+               IS NOT (excluded.name, excluded.category, excluded.price, excluded.availability,
+                       excluded.image_url, excluded.product_url, excluded.retailer, excluded.specs)
+        ''', [row + (version,) for row in rows])
+        written = cursor.rowcount
+        # A product that comes back is no longer deleted
+        self.conn.executemany('DELETE FROM deleted_products WHERE id = ?', [(row[0],) for row in rows])
+        self._write_history(rows)
+        return written
+    
+    def _index_products(self, version: int):
+        """Bring products_fts up to date with the rows written as of catalog `version`"""
+        self.conn.execute('''
+            DELETE FROM products_fts WHERE rowid IN (SELECT rowid FROM products WHERE change_seq = ?)
+        ''', (version,))
+        self.conn.execute(f'''
+            INSERT INTO products_fts (rowid, name, retailer, specs, category)
+            SELECT rowid, name, retailer, {SPEC_TEXT.format('specs')}, category FROM products
+            WHERE change_seq = ?
+        ''', (version,))
+    
+    def _write_history(self, rows: List[tuple]):
+        """Extend each product's latest price interval, or start a new one if the price or availability changed"""
+        # Last row wins for a product saved twice in one batch, as in products
+        observed = {row[0]: (row[3], row[4]) for row in rows}
+        latest = self._latest_intervals(list(observed))
+        
+        extend, start = [], []
+        for product_id, (price, availability) in observed.items():
+            interval = latest.get(product_id)
+            # availability is NULL on rows from before schema 2: same price means same interval
+            if interval and interval[1] == price and interval[2] in (None, availability):
+                extend.append((availability, interval[0]))
+            else:
+                start.append((product_id, price, availability))
         
-        conn.commit()
-        conn.close()
+        self.conn.executemany('''
+            UPDATE price_history SET last_seen = CURRENT_TIMESTAMP, availability = ?
+            WHERE id = ?
+        ''', extend)
+        self.conn.executemany('''
+            INSERT INTO price_history (product_id, price, availability, first_seen, last_seen)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+        ''', start)
+        metrics.inc('price_history_extended', len(extend))
+        metrics.inc('price_history_written', len(start))
+    
+    def _latest_intervals(self, product_ids: List[str]) -> Dict[str, tuple]:
+        """product_id -> (id, price, availability) of its most recent price_history row"""
+        latest = {}
+        # Chunked to stay under SQLite's limit on bound parameters
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            # Bare columns next to MAX() come from the row holding the maximum
+            # (an SQLite guarantee); ids only grow, so that's the newest interval
+            for product_id, row_id, price, availability in self.conn.execute(f'''
+                SELECT product_id, MAX(id), price, availability FROM price_history
+                WHERE product_id IN ({placeholders})
+                GROUP BY product_id
+            ''', chunk):
+                latest[product_id] = (row_id, price, availability)
+        return latest
+    
+    def _write_rows_one_by_one(self, rows: List[tuple]) -> int:
+        saved_count = 0
+        written = 0
+        with self._transaction():
+            version = self._catalog_version() + 1
+            for row in rows:
+                self.conn.execute('SAVEPOINT product')
+                try:
+                    written += self._write_rows([row], version)
+                    saved_count += 1
+                except sqlite3.IntegrityError as e:
+                    self.conn.execute('ROLLBACK TO product')
+                    logger.warning("❌ Error saving product %s: %s", row[1], e)
+                self.conn.execute('RELEASE product')
+            if written:
+                self._index_products(version)
+                self._set_catalog_version(version)
+        metrics.inc('db_products_written', written)
         return saved_count
     
+    def delete_products(self, product_ids: List[str]) -> int:
+        """Remove products, leaving tombstones for export_delta(); return how many were removed"""
+        with self._lock:
+            with self._transaction():
+                version = self._catalog_version() + 1
+                removed = [(product_id, version) for product_id in dict.fromkeys(product_ids)
+                           if self.conn.execute('SELECT 1 FROM products WHERE id = ?', (product_id,)).fetchone()]
+                self.conn.executemany('DELETE FROM products WHERE id = ?', [(product_id,) for product_id, _ in removed])
+                self.conn.executemany('INSERT OR REPLACE INTO deleted_products (id, change_seq) VALUES (?, ?)', removed)
+                if removed:
+                    self._set_catalog_version(version)
+        
+        # Their price history stays, it is still history
+        metrics.inc('db_products_deleted', len(removed))
+        return len(removed)
+    
+    def prune_products(self, days: int) -> int:
+        """Remove products no scrape has seen for `days` days, return how many were removed"""
+        with self._lock:
+            stale = [row[0] for row in self.conn.execute('''
+                SELECT product_id FROM price_history
+                WHERE product_id IN (SELECT id FROM products)
+                GROUP BY product_id
+                HAVING MAX(COALESCE(last_seen, first_seen)) < datetime('now', ?)
+            ''', (f'-{days} days',))]
+        removed = self.delete_products(stale)
+        logger.info("🧹 Removed %d products not seen for %d days", removed, days)
+        return removed
+    
+    def compact_price_history(self) -> int:
+        """Collapse runs of identical consecutive price_history rows into one interval, return rows removed"""
+        with self._lock:
+            before = self.conn.execute('SELECT COUNT(*) FROM price_history').fetchone()[0]
+            with self._transaction():
+                # A run starts at a product's first row and wherever price or
+                # availability differ from the row before (unknown availability,
+                # from before schema 2, joins the run that follows); each run
+                # keeps its first row, stretched to the run's last sighting
+                self.conn.execute('''
+                    CREATE TEMP TABLE history_runs AS
+                    WITH marked AS (
+                        SELECT id, product_id, first_seen, availability,
+                               COALESCE(last_seen, first_seen) AS seen,
+                               CASE WHEN price IS LAG(price) OVER history
+                                     AND (availability IS LAG(availability) OVER history
+                                          OR LAG(availability) OVER history IS NULL)
+                                    THEN 0 ELSE 1 END AS starts_run
+                        FROM price_history
+                        WINDOW history AS (PARTITION BY product_id ORDER BY first_seen, id)
+                    ), numbered AS (
+                        SELECT id, product_id, availability, seen,
+                               SUM(starts_run) OVER (PARTITION BY product_id ORDER BY first_seen, id) AS run
+                        FROM marked
+                    )
+                    SELECT MIN(id) AS keep_id, MAX(seen) AS last_seen, MAX(availability) AS availability
+                    FROM numbered GROUP BY product_id, run
+                ''')
+                self.conn.execute('''
+                    UPDATE price_history
+                    SET (last_seen, availability) =
+                        (SELECT last_seen, availability FROM history_runs WHERE keep_id = price_history.id)
+                    WHERE id IN (SELECT keep_id FROM history_runs)
+                ''')
+                self.conn.execute('DELETE FROM price_history WHERE id NOT IN (SELECT keep_id FROM history_runs)')
+                self.conn.execute('DROP TABLE history_runs')
+            after = self.conn.execute('SELECT COUNT(*) FROM price_history').fetchone()[0]
+            # Hand the freed pages back to the filesystem
+            self.conn.execute('VACUUM')
+        
+        logger.info("🗜️ Compacted price history from %d to %d rows", before, after)
+        return before - after
+    
+    def get_price_history(self, product_id: str) -> List[Dict]:
+        """A product's price intervals, oldest first"""
+        with self._lock:
+            cursor = self.conn.execute('''
+                SELECT price, availability, first_seen, last_seen FROM price_history
+                WHERE product_id = ? ORDER BY first_seen, id
+            ''', (product_id,))
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def search_expression(query: str, category: Optional[str] = None) -> Optional[str]:
+        """FTS5 MATCH expression for what a user typed: every word must match, the last one as a prefix"""
+        words = re.findall(r'\w+', query.lower())
+        if not words:
+            return None
+        # Quoted, so words like AND/OR/NEAR are searched for rather than parsed
+        terms = [f'"{word}"' for word in words]
+        terms[-1] += '*'
+        expression = f"{{name retailer specs}} : ({' '.join(terms)})"
+        if category:
+            expression += f' AND category : "{category.replace(chr(34), "")}"'
+        return expression
+    
+    def search(self, query: str, category: Optional[str] = None, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """Products matching `query` by name, retailer or spec values, best match (bm25) first"""
+        expression = self.search_expression(query, category)
+        if not expression:
+            return []
+        
+        # Ranked and cut to the page inside the index, only that page is joined to products
+        weights = ', '.join(map(str, SEARCH_WEIGHTS))
+        with self._lock, metrics.timer('db_search'):
+            cursor = self.conn.execute(f'''
+                SELECT {PRODUCT_COLUMNS} FROM (
+                    SELECT rowid, bm25(products_fts, {weights}) AS score FROM products_fts
+                    WHERE products_fts MATCH ?
+                    ORDER BY score LIMIT ? OFFSET ?
+                ) AS hits
+                JOIN products ON products.rowid = hits.rowid
+                ORDER BY hits.score
+            ''', (expression, limit, offset))
+            return list(self._product_dicts(cursor))
+
+    def find_products(self, category: Optional[str] = None, min_price: Optional[float] = None,
+                      max_price: Optional[float] = None, limit: Optional[int] = None, offset: int = 0,
+                      **specs) -> List[Dict]:
+        """Products matching spec values and a price range, cheapest first
+
+        Specs are filtered by keyword, one of SPEC_COLUMNS set to a value or a
+        list of accepted values: find_products('case', layout='65%', max_price=200).
+        With a category, the spec and price filters are a range scan of one of
+        SPEC_INDEXES rather than a decode of every row's specs.
+        """
+        unknown = set(specs) - set(SPEC_COLUMNS)
+        if unknown:
+            raise ValueError(f"Can't filter on {', '.join(sorted(unknown))}. Available: {', '.join(SPEC_COLUMNS)}")
+
+        conditions, params = [], []
+        if category:
+            conditions.append('category = ?')
+            params.append(category)
+        for column, value in specs.items():
+            if value is None:
+                continue
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if min_price is not None:
+            conditions.append('price >= ?')
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append('price <= ?')
+            params.append(max_price)
+
+        query = f'SELECT {PRODUCT_COLUMNS} FROM products'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY price ASC'
+        if limit is not None:
+            query += ' LIMIT ? OFFSET ?'
+            params.extend((limit, offset))
+
+        with self._lock, metrics.timer('db_find'):
+            return list(self._product_dicts(self.conn.execute(query, params)))
+
     def get_products_json(self, category: Optional[str] = None) -> str:
         """Get products as JSON string"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._lock:
+            products = self._get_products(category)
+        return json.dumps(products, indent=2)
+    
+    def _get_products(self, category: Optional[str] = None) -> List[Dict]:
+        return list(self._iter_products(category))
+    
+    def _iter_products(self, category: Optional[str] = None):
+        """Yield products straight off the cursor; the caller holds the lock until it's exhausted"""
+        cursor = self.conn.cursor()
         
         if category:
-            cursor.execute('SELECT * FROM products WHERE category = ? ORDER BY price ASC', (category,))
+            cursor.execute(f'SELECT {PRODUCT_COLUMNS} FROM products WHERE category = ? ORDER BY price ASC', (category,))
         else:
-            cursor.execute('SELECT * FROM products ORDER BY category, price ASC')
+            cursor.execute(f'SELECT {PRODUCT_COLUMNS} FROM products ORDER BY category, price ASC')
         
+        yield from self._product_dicts(cursor)
+    
+    def _product_dicts(self, cursor: sqlite3.Cursor):
         columns = [description[0] for description in cursor.description]
-        products = []
         
-        for row in cursor.fetchall():
+        for row in cursor:
             product = dict(zip(columns, row))
             # Parse specs JSON
             if product['specs']:
@@ -128,26 +708,68 @@ class DatabaseManager:
                     product['specs'] = json.loads(product['specs'])
                 except:
                     product['specs'] = {}
-            products.append(product)
-        
-        conn.close()
-        return json.dumps(products, indent=2)
+            yield product
+
+    def export_to_json(self, filename: str = None, fmt: str = 'pretty', compress: bool = True,
+                       shards: bool = False) -> str:
+        """Stream all products into a JSON (or NDJSON) file, replacing it atomically
 
-    def export_to_json(self, filename: str = None) -> str:
-        """Export all products to JSON file"""
+        With shards, the per-category and per-retailer shards and manifest.json
+        are written next to it in the same pass (see database/json_export.py).
+        """
         if not filename:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"keyboard_products_{timestamp}.json"
+            filename = f"keyboard_products_{timestamp}{EXTENSIONS.get(fmt, '.json')}"
         
         # Save to data/products directory
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        export_path = os.path.join(project_root, 'data', 'products', filename)
+        export_path = os.path.join(default_products_dir(), filename)
         os.makedirs(os.path.dirname(export_path), exist_ok=True)
         
-        products_json = self.get_products_json()
+        with self._lock:
+            if shards:
+                manifest = write_catalog(export_path, self._iter_products(), fmt, self._catalog_version())
+                count = manifest['export']['count']
+                files = catalog_files(os.path.dirname(export_path), manifest)
+            else:
+                count = write_products(export_path, self._iter_products(), fmt)
+                files = [export_path]
         
-        with open(export_path, 'w') as f:
-            f.write(products_json)
+        # Compressed after the lock is released, scraper threads can keep saving meanwhile
+        sidecars = [sidecar for path in files for sidecar in write_sidecars(path)] if compress else []
         
-        print(f"📄 Products exported to {export_path}")
-        return export_path
\ No newline at end of file
+        logger.info("📄 %d products exported to %s%s", count, export_path,
+                    f" ({len(files) - 1} shards)" if shards else '')
+        if sidecars:
+            logger.debug("🗜️ Wrote %d compressed sidecars", len(sidecars))
+        return export_path
+    
+    def export_delta(self, since_version: int, filename: str = None, compress: bool = True,
+                     keep: int = DELTA_KEEP) -> str:
+        """Write the products changed and removed since catalog `since_version` (see json_export.write_delta)
+
+        Without a filename it goes to deltas/, where only the `keep` newest deltas are kept.
+        """
+        products_dir = default_products_dir()
+        with self._lock:
+            version = self._catalog_version()
+            if filename:
+                path = os.path.join(products_dir, filename)
+            else:
+                path = delta_path(products_dir, since_version, version)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+            removed = [row[0] for row in self.conn.execute(
+                'SELECT id FROM deleted_products WHERE change_seq > ? ORDER BY change_seq, id', (since_version,))]
+            changed = self.conn.execute(
+                f'SELECT {PRODUCT_COLUMNS} FROM products WHERE change_seq > ? ORDER BY change_seq, id', (since_version,))
+            count = write_delta(path, since_version, version, self._product_dicts(changed), removed)
+        
+        if compress:
+            write_sidecars(path)
+        logger.info("🧩 Delta %d -> %d: %d changed, %d removed, written to %s",
+                    since_version, version, count, len(removed), path)
+        if not filename:
+            pruned = prune_deltas(products_dir, keep)
+            if pruned:
+                logger.info("🧹 Removed %d old delta files, keeping the %d newest deltas", len(pruned), keep)
+        return path
\ No newline at end of file
@@ -0,0 +1,360 @@
+"""
+Streaming JSON export of the product catalog.
+
+Products are encoded and written one at a time as the cursor yields them,
+so memory stays flat however large the catalog gets. Three formats:
+
+    pretty    a JSON array indented by 2, as json.dumps(..., indent=2) would write it
+    compact   a JSON array without whitespace
+    ndjson    one product per line (newline-delimited JSON)
+
+Every file is written to a temp file next to it and renamed into place, so a
+reader (the Next.js API) sees either the previous export or the new one, never
+half of one. Precompressed .gz and, with brotli installed, .br sidecars are
+written next to the export for servers that can send them as-is.
+
+write_catalog() also shards the catalog in the same pass, so the API can load
+only the products a request asks for:
+
+    latest-export.json        everything, in the chosen format
+    cases.json, pcbs.json...  one compact shard per category
+    retailers/<retailer>.json one compact shard per retailer
+    manifest.json             count, size and sha256 of every file, and where
+                              each category's products sit in the export
+
+A category's offset/length is the byte range of its products in the export,
+or null when they aren't contiguous. How the slice parses depends on the
+export format: for pretty and compact it is the products with their
+separators, so '[' + slice + ']' is a JSON array; for ndjson it is whole
+lines, one product each.
+
+write_delta() writes only what changed between two catalog versions, for
+consumers that already hold the older one:
+
+    {"from_version": 41, "to_version": 42, "generated_at": "...",
+     "removed": ["<id>", ...], "changed": [<product>, ...]}
+
+Apply it by dropping the removed IDs and upserting the changed products by id.
+
+Deltas go to deltas/delta-<from>-<to>.json. Only the DELTA_KEEP newest (by
+to_version) are kept, with their sidecars; prune_deltas() removes the rest. A
+consumer further behind than the oldest delta left reloads the full export.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional, only the .gz sidecar is written
+    brotli = None
+
+FORMATS = ('pretty', 'compact', 'ndjson')
+EXTENSIONS = {'pretty': '.json', 'compact': '.json', 'ndjson': '.ndjson'}
+
+# Sidecars are written once per run and read on every request: compress hard
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Bytes buffered before each write() to the export file
+BUFFER_SIZE = 1 << 16
+
+# Shards are only read by the API, so they skip the indentation
+SHARD_FORMAT = 'compact'
+# Category -> shard file name; every category gets a shard, empty or not
+CATEGORY_SHARDS = {
+    'case': 'cases.json',
+    'pcb': 'pcbs.json',
+    'switches': 'switches.json',
+    'keycaps': 'keycaps.json',
+    'stabilizers': 'stabilizers.json',
+}
+RETAILER_DIR = 'retailers'
+MANIFEST = 'manifest.json'
+# Bumped when the manifest layout changes
+MANIFEST_VERSION = 2
+
+DELTA_DIR = 'deltas'
+DELTA_FILE = re.compile(r'^delta-(\d+)-(\d+)\.json')
+# Deltas kept in DELTA_DIR, newest first
+DELTA_KEEP = 30
+
+# The umask can only be read by setting it; done once at import, before the
+# scraper threads start creating files
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def _dumps_pretty(product: Dict) -> str:
+    # Newlines only occur between tokens (they're escaped inside strings),
+    # so indenting every line shifts the product one level into the array
+    return json.dumps(product, indent=2).replace('\n', '\n  ')
+
+
+def _dumps_compact(product: Dict) -> str:
+    return json.dumps(product, separators=(',', ':'))
+
+
+def _dumps_ndjson(product: Dict) -> str:
+    return json.dumps(product, separators=(',', ':')) + '\n'
+
+
+# format -> (before the first product, between products, after the last, if there are none, encoder)
+LAYOUTS = {
+    'pretty': ('[\n  ', ',\n  ', '\n]', '[]', _dumps_pretty),
+    'compact': ('[', ',', ']', '[]', _dumps_compact),
+    'ndjson': ('', '', '', '', _dumps_ndjson),
+}
+
+
+def _file_mode(path: str) -> int:
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
+
+
+@contextmanager
+def atomic_file(path: str):
+    """Binary file that replaces `path` when the block finishes, and is discarded if it raises"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb', buffering=BUFFER_SIZE) as f:
+            yield f
+        # mkstemp creates the file 0600; give it the mode a plain open() would
+        # (or the file it replaces has), so the web server can still read it
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ProductWriter:
+    """Writes products one at a time into an export file, keeping its size and sha256
+
+    Used as a context manager: the file only replaces `path` if the block finishes.
+    """
+
+    def __init__(self, path: str, fmt: str = 'pretty'):
+        if fmt not in LAYOUTS:
+            raise ValueError(f"Unknown export format '{fmt}'. Available: {', '.join(FORMATS)}")
+        self.path = path
+        self.fmt = fmt
+        self.count = 0
+        self.bytes = 0
+        self.sha256 = hashlib.sha256()
+        self._file = None
+        self._atomic = None
+
+    def __enter__(self):
+        self._atomic = atomic_file(self.path)
+        self._file = self._atomic.__enter__()
+        return self
+
+    def _emit(self, text: str):
+        data = text.encode('utf-8')
+        self._file.write(data)
+        self.sha256.update(data)
+        self.bytes += len(data)
+
+    def write(self, product: Dict) -> Tuple[int, int]:
+        """Append a product, return the byte range its JSON occupies in the file"""
+        first, between, _, _, dumps = LAYOUTS[self.fmt]
+        self._emit(between if self.count else first)
+        start = self.bytes
+        self._emit(dumps(product))
+        self.count += 1
+        return start, self.bytes
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            _, _, last, empty, _ = LAYOUTS[self.fmt]
+            self._emit(last if self.count else empty)
+        return self._atomic.__exit__(exc_type, exc, tb)
+
+    def entry(self, directory: str) -> Dict:
+        """This file's manifest entry, with its path relative to `directory`"""
+        return {
+            'file': os.path.relpath(self.path, directory).replace(os.sep, '/'),
+            'count': self.count,
+            'bytes': self.bytes,
+            'sha256': self.sha256.hexdigest(),
+        }
+
+
+def write_products(path: str, products: Iterable[Dict], fmt: str = 'pretty') -> int:
+    """Stream `products` into `path` atomically, return how many were written"""
+    with ProductWriter(path, fmt) as writer:
+        for product in products:
+            writer.write(product)
+    return writer.count
+
+
+def retailer_shard(retailer: str) -> str:
+    slug = re.sub(r'[^\w-]', '', retailer.lower().replace(' ', '-'))
+    return f"{RETAILER_DIR}/{slug}.json"
+
+
+def write_catalog(export_path: str, products: Iterable[Dict], fmt: str = 'pretty',
+                  version: Optional[int] = None) -> Dict:
+    """Stream `products` into the export, its category and retailer shards and the manifest; return the manifest
+
+    `version` is the catalog version being exported (DatabaseManager.catalog_version()),
+    by default the highest change_seq among the products.
+    """
+    directory = os.path.dirname(export_path)
+    os.makedirs(os.path.join(directory, RETAILER_DIR), exist_ok=True)
+
+    # category -> [start, end] of its products in the export; None if they aren't contiguous
+    ranges = {}
+    latest_change = 0
+    with ExitStack() as stack:
+        export = stack.enter_context(ProductWriter(export_path, fmt))
+        shards = {}
+
+        def shard(name: str) -> ProductWriter:
+            if name not in shards:
+                shards[name] = stack.enter_context(ProductWriter(os.path.join(directory, name), SHARD_FORMAT))
+            return shards[name]
+
+        categories = {category: shard(name) for category, name in CATEGORY_SHARDS.items()}
+        retailers = {}
+        previous = None
+        for product in products:
+            start, end = export.write(product)
+            latest_change = max(latest_change, product.get('change_seq') or 0)
+            category = product.get('category')
+            if category != previous:
+                ranges[category] = None if category in ranges else [start, end]
+            elif ranges[category]:
+                ranges[category][1] = end
+            previous = category
+
+            if category not in categories:
+                categories[category] = shard(f"{category}.json")
+            categories[category].write(product)
+            if product['retailer'] not in retailers:
+                retailers[product['retailer']] = shard(retailer_shard(product['retailer']))
+            retailers[product['retailer']].write(product)
+
+    # Retailers that are gone from the catalog would otherwise keep serving old products
+    written = {writer.path for writer in retailers.values()}
+    for name in os.listdir(os.path.join(directory, RETAILER_DIR)):
+        path = os.path.join(directory, RETAILER_DIR, name)
+        if not any(path.startswith(shard_path) for shard_path in written):
+            os.remove(path)  # the shard and its sidecars
+
+    export_entry = export.entry(directory)
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'generated_at': datetime.now().isoformat(),
+        # Goes up whenever any product changes; deltas are written between these
+        'catalog_version': latest_change if version is None else version,
+        'export': {**export_entry, 'format': fmt},
+        'shard_format': SHARD_FORMAT,
+        'categories': {},
+        'retailers': {retailer: writer.entry(directory) for retailer, writer in sorted(retailers.items())},
+    }
+    for category, writer in categories.items():
+        entry = writer.entry(directory)
+        span = ranges.get(category)
+        # Byte range of the category inside the export, framed as the module docstring says
+        entry['offset'], entry['length'] = (span[0], span[1] - span[0]) if span else (None, None)
+        manifest['categories'][category] = entry
+
+    # Last, so a manifest only ever points at files that are already in place
+    with atomic_file(os.path.join(directory, MANIFEST)) as f:
+        f.write(json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+def read_manifest(directory: str) -> Optional[Dict]:
+    """The manifest of the catalog exported into `directory`, if there is one"""
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_delta(path: str, from_version: int, to_version: int, changed: Iterable[Dict], removed: List[str]) -> int:
+    """Stream a delta between two catalog versions into `path` atomically, return how many products changed"""
+    header = {
+        'from_version': from_version,
+        'to_version': to_version,
+        'generated_at': datetime.now().isoformat(),
+        'removed': removed,
+    }
+    count = 0
+    with atomic_file(path) as f:
+        # The header's closing brace is swapped for the changed products, streamed as they come
+        f.write(json.dumps(header, separators=(',', ':'))[:-1].encode('utf-8') + b',"changed":[')
+        for product in changed:
+            f.write((b',' if count else b'') + _dumps_compact(product).encode('utf-8'))
+            count += 1
+        f.write(b']}')
+    return count
+
+
+def delta_path(directory: str, from_version: int, to_version: int) -> str:
+    return os.path.join(directory, DELTA_DIR, f"delta-{from_version}-{to_version}.json")
+
+
+def prune_deltas(directory: str, keep: int = DELTA_KEEP) -> List[str]:
+    """Remove all but the `keep` newest deltas under `directory` and their sidecars, return the files removed"""
+    deltas_dir = os.path.join(directory, DELTA_DIR)
+    if not os.path.isdir(deltas_dir):
+        return []
+
+    # (to, from) -> the delta and its sidecars (and any temp file left by a failed write)
+    files = {}
+    for name in os.listdir(deltas_dir):
+        match = DELTA_FILE.match(name)
+        if match:
+            files.setdefault((int(match.group(2)), int(match.group(1))), []).append(os.path.join(deltas_dir, name))
+
+    removed = []
+    for versions in sorted(files, reverse=True)[keep:]:
+        for path in files[versions]:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def catalog_files(directory: str, manifest: Dict) -> List[str]:
+    """Every file a manifest lists, export first"""
+    entries = [manifest['export'], *manifest['categories'].values(), *manifest['retailers'].values()]
+    return [os.path.join(directory, entry['file']) for entry in entries]
+
+
+def write_sidecars(path: str) -> List[str]:
+    """Write path.gz (and path.br with brotli installed) from `path`, return the sidecars written"""
+    sidecars = []
+
+    with open(path, 'rb') as source, atomic_file(path + '.gz') as target:
+        # mtime=0 and no file name: the same export always compresses to the same bytes
+        with gzip.GzipFile(filename='', mode='wb', fileobj=target, compresslevel=GZIP_LEVEL, mtime=0) as gz:
+            shutil.copyfileobj(source, gz, BUFFER_SIZE)
+    sidecars.append(path + '.gz')
+
+    if brotli:
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        with open(path, 'rb') as source, atomic_file(path + '.br') as target:
+            for block in iter(lambda: source.read(BUFFER_SIZE), b''):
+                target.write(compressor.process(block))
+            target.write(compressor.finish())
+        sidecars.append(path + '.br')
+    elif os.path.exists(path + '.br'):
+        # Left by a run that had brotli, and would now be stale
+        os.remove(path + '.br')
+
+    return sidecars
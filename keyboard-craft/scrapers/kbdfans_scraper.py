@@ -1,9 +1,46 @@
-from base_scraper import BaseScraper
+import logging
+from shopify_scraper import ShopifyScraper
+from utils.keywords import is_sold_out
 from urllib.parse import urljoin
 from typing import List, Dict
 import re
 
-class KBDfansScraper(BaseScraper):
+logger = logging.getLogger(__name__)
+
+class KBDfansScraper(ShopifyScraper):
+    # Alternatives are only fetched for categories their primary URL left empty
+    alternatives_are_fallbacks = True
+    # Product grid; anything else is skipped by a scoped parse
+    parse_scope = r'product-block|grid-flex__item|product-item'
+
+    # KBDfans specific selectors based on the debug output
+    selector_strategies = [
+        # Strategy 1: KBDfans actual structure (from debug output)
+        {
+            'container': '.product-block',
+            'title': '.product-block__title a, .product-block__title, h3 a, h3',
+            'price': '.money, .price, [class*="price"]',
+            'link': 'a',
+            'image': '.product-block__image img, img'
+        },
+        # Strategy 2: Alternative KBDfans selectors
+        {
+            'container': '.grid-flex__item, .product-item',
+            'title': '.product-title, .title, h3, h4',
+            'price': '.money, .price, [data-price]',
+            'link': 'a',
+            'image': 'img'
+        },
+        # Strategy 3: Generic fallback
+        {
+            'container': '[class*="product-block"], [class*="grid-flex__item"]',
+            'title': 'a[href*="/products"], h3, h4',
+            'price': '.money, [class*="price"], [class*="cost"]',
+            'link': 'a[href*="/products"]',
+            'image': 'img'
+        }
+    ]
+
     def __init__(self):
         super().__init__('https://kbdfans.com', 'KBDfans')
         self.category_urls = {
@@ -23,85 +60,6 @@ class KBDfansScraper(BaseScraper):
             'stabilizers': []
         }
     
-    def scrape_category(self, category: str) -> List[Dict]:
-        """Scrape a specific category with fallback URLs"""
-        if category not in self.category_urls:
-            print(f"⚠️ Category '{category}' not supported for KBDfans")
-            return []
-        
-        # Try primary URL first
-        urls_to_try = [self.category_urls[category]]
-        
-        # Add alternative URLs
-        if category in self.alternative_urls:
-            urls_to_try.extend(self.alternative_urls[category])
-        
-        for url in urls_to_try:
-            full_url = urljoin(self.base_url, url)
-            print(f"🔍 Trying KBDfans {category} from {full_url}")
-            
-            products = self._scrape_url(full_url, category)
-            if products:
-                print(f"✅ Successfully scraped {len(products)} products from {full_url}")
-                return products
-            else:
-                print(f"⚠️ No products found at {full_url}, trying next URL...")
-        
-        print(f"❌ Failed to scrape {category} from all KBDfans URLs")
-        return []
-    
-    def _scrape_url(self, url: str, category: str) -> List[Dict]:
-        """Scrape products from a specific URL"""
-        soup = self.get_page(url)
-        if not soup:
-            return []
-        
-        products = []
-        
-        # KBDfans specific selectors based on the debug output
-        selector_strategies = [
-            # Strategy 1: KBDfans actual structure (from debug output)
-            {
-                'container': '.product-block',
-                'title': '.product-block__title a, .product-block__title, h3 a, h3',
-                'price': '.money, .price, [class*="price"]',
-                'link': 'a',
-                'image': '.product-block__image img, img'
-            },
-            # Strategy 2: Alternative KBDfans selectors
-            {
-                'container': '.grid-flex__item, .product-item',
-                'title': '.product-title, .title, h3, h4',
-                'price': '.money, .price, [data-price]',
-                'link': 'a',
-                'image': 'img'
-            },
-            # Strategy 3: Generic fallback
-            {
-                'container': '[class*="product-block"], [class*="grid-flex__item"]',
-                'title': 'a[href*="/products"], h3, h4',
-                'price': '.money, [class*="price"], [class*="cost"]',
-                'link': 'a[href*="/products"]',
-                'image': 'img'
-            }
-        ]
-        
-        for strategy in selector_strategies:
-            print(f"🔍 Trying KBDfans selector strategy: {strategy['container']}")
-            containers = soup.select(strategy['container'])
-            
-            if containers:
-                print(f"📦 Found {len(containers)} product containers")
-                products = self._extract_products(containers, strategy, category, url)
-                if products:
-                    return products
-            else:
-                print(f"⚠️ No containers found with selector: {strategy['container']}")
-        
-        # Debug the page if all strategies failed
-        self.debug_page_structure(soup, url)
-        return []
-    
     def _extract_products(self, containers: list, strategy: dict, category: str, base_url: str) -> List[Dict]:
         """Extract product information using the given strategy"""
         products = []
@@ -112,35 +70,32 @@ class KBDfansScraper(BaseScraper):
                 title_elem = container.select_one(strategy['title'])
                 if not title_elem:
                     # Try more fallback selectors
-                    title_elem = (container.find('a', href=re.compile(r'/products/')) or
-                                 container.find('h3') or
-                                 container.find('h4') or
-                                 container.find('a'))
+                    title_elem = (container.select_one('a[href*="/products/"]') or
+                                 container.select_one('h3') or
+                                 container.select_one('h4') or
+                                 container.select_one('a'))
                 
                 if not title_elem:
                     continue
                 
-                title = title_elem.get_text(strip=True)
+                title = title_elem.text()
                 if not title:
                     continue
                 
                 # Extract price - be more flexible
-                price_elem = container.select_one(strategy['price'])
-                if not price_elem:
-                    # Try alternative price selectors
-                    price_elem = (container.find('span', class_='money') or
-                                 container.find('div', class_='price') or
-                                 container.find('span', string=re.compile(r'\$\d+')) or
-                                 container.find(text=re.compile(r'\$\d+')))
-                
-                if not price_elem:
-                    continue
+                price_elem = (container.select_one(strategy['price']) or
+                              # Try alternative price selectors
+                              container.select_one('span.money') or
+                              container.select_one('div.price'))
                 
-                # Handle price text extraction
-                if hasattr(price_elem, 'get_text'):
-                    price_text = price_elem.get_text(strip=True)
+                if price_elem:
+                    price_text = price_elem.text()
                 else:
-                    price_text = str(price_elem).strip()
+                    # Fall back to any text that looks like a price
+                    price_text = container.find_text(re.compile(r'\$\d+'))
+                
+                if not price_text:
+                    continue
                 
                 price = self.parse_price(price_text)
                 
@@ -150,20 +105,20 @@ class KBDfansScraper(BaseScraper):
                 # Extract link
                 link_elem = container.select_one(strategy['link'])
                 if not link_elem:
-                    link_elem = container.find('a', href=re.compile(r'/products/'))
+                    link_elem = container.select_one('a[href*="/products/"]')
                 
                 product_url = None
-                if link_elem and link_elem.get('href'):
-                    product_url = urljoin(base_url, link_elem['href'])
+                if link_elem and link_elem.attr('href'):
+                    product_url = urljoin(base_url, link_elem.attr('href'))
                 
                 # Extract image
                 img_elem = container.select_one(strategy['image'])
                 image_url = None
                 if img_elem:
-                    img_src = (img_elem.get('src') or 
-                              img_elem.get('data-src') or 
-                              img_elem.get('data-original') or
-                              img_elem.get('data-lazy'))
+                    img_src = (img_elem.attr('src') or 
+                              img_elem.attr('data-src') or 
+                              img_elem.attr('data-original') or
+                              img_elem.attr('data-lazy'))
                     if img_src:
                         # Handle relative URLs and lazy loading placeholders
                         if img_src.startswith('//'):
@@ -182,34 +137,30 @@ class KBDfansScraper(BaseScraper):
                 else:
                     actual_category = category
                 
-                # Only include products that match our target category
-                if actual_category == category:
-                    # Extract specs
-                    specs = self.extract_specs(title, '', product_url or '')
-                    
-                    # Check availability
-                    availability = 1  # Default to available
-                    availability_indicators = container.find_all(text=re.compile(r'sold out|out of stock|unavailable', re.I))
-                    if availability_indicators or 'sold out' in price_text.lower():
-                        availability = 0
-                    
-                    product = {
-                        'name': title,
-                        'category': actual_category,
-                        'price': price,
-                        'retailer': self.retailer_name,
-                        'product_url': product_url,
-                        'image_url': image_url,
-                        'specs': specs,
-                        'availability': availability
-                    }
-                    
-                    products.append(product)
-                    print(f"✅ Found: {title} - ${price}")
+                # Check availability
+                availability = 1  # Default to available
+                availability_indicators = container.find_text(re.compile(r'sold out|out of stock|unavailable', re.I))
+                if availability_indicators or is_sold_out(price_text):
+                    availability = 0
+                
+                product = {
+                    'name': title,
+                    'category': actual_category,
+                    'price': price,
+                    'retailer': self.retailer_name,
+                    'product_url': product_url,
+                    'image_url': image_url,
+                    'specs': {},  # filled in for the whole page below
+                    'availability': availability
+                }
+                
+                products.append(product)
+                logger.debug("✅ Found: %s - $%s", title, price)
                 
             except Exception as e:
-                print(f"❌ Error parsing KBDfans product: {e}")
+                logger.warning("❌ Error parsing KBDfans product: %s", e)
                 continue
         
-        print(f"📦 Found {len(products)} valid products in {category} from KBDfans")
+        self.fill_specs(products)
+        logger.debug("📦 Found %d valid products in %s from KBDfans", len(products), category)
         return products
\ No newline at end of file
@@ -6,21 +6,42 @@ Run this to scrape all keyboard retailers and update the database.
 import sys
 import os
 import argparse
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import json
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.db_manager import DatabaseManager
+from database.db_manager import DatabaseManager, default_products_dir
+from database.json_export import DELTA_KEEP, EXTENSIONS, FORMATS, read_manifest
 from kbdfans_scraper import KBDfansScraper
 from novelkeys_scraper import NovelKeysScraper
 from mechanicalkeyboards_scraper import MechanicalKeyboardsScraper
+from utils.rate_limiter import shared_limiter
+from utils.response_archive import ResponseArchive
+from utils.html_parser import get_backend, BACKENDS
+from utils.log import setup_logging, LOG_FORMATS
+from utils.metrics import metrics
+from utils import profiling
+
+logger = logging.getLogger(__name__)
 
 class KeyboardScraperManager:
-    def __init__(self, dev_mode=False):
+    def __init__(self, dev_mode=False, use_cache=True, archive: ResponseArchive = None,
+                 parser: str = None, metrics_dir: str = None, export_format: str = 'pretty',
+                 prune_days: int = None, keep_deltas: int = DELTA_KEEP):
         self.db = DatabaseManager()
         self.dev_mode = dev_mode
+        # Where the run metrics go (default: data/metrics)
+        self.metrics_dir = metrics_dir
+        self.export_format = export_format
+        # Products not seen for this many days are removed after a run (default: kept)
+        self.prune_days = prune_days
+        # Deltas kept in data/products/deltas, newest first
+        self.keep_deltas = keep_deltas
         self.scrapers = {
             'novelkeys': NovelKeysScraper(),
             'kbdfans': KBDfansScraper(),
@@ -34,121 +55,184 @@ class KeyboardScraperManager:
             self.scrapers = {'novelkeys': NovelKeysScraper()}
         else:
             self.categories = ['switches', 'keycaps', 'case', 'pcb', 'stabilizers']
+        
+        for scraper in self.scrapers.values():
+            # Recording needs full bodies and replaying must not touch the cache,
+            # so the conditional-GET cache only applies to plain live runs
+            if not use_cache or archive:
+                scraper.http_cache = None
+            scraper.archive = archive
+            if parser:
+                scraper.parser = get_backend(parser)
     
     def test_scraper(self, scraper_name: str):
         """Test a single scraper"""
         if scraper_name not in self.scrapers:
-            print(f"❌ Scraper '{scraper_name}' not found")
+            logger.error("❌ Scraper '%s' not found", scraper_name)
             return
         
         scraper = self.scrapers[scraper_name]
-        print(f"🧪 Testing {scraper_name} scraper...")
+        logger.info("🧪 Testing %s scraper...", scraper_name)
         
-        # Test with switches category
+        # Test with the first page of the switches category
         try:
-            products = scraper.scrape_category('switches')
+            products = next(iter(scraper.scrape_category('switches')), [])
             if products:
-                print(f"✅ {scraper_name} test successful: {len(products)} products found")
+                logger.info("✅ %s test successful: %d products found on the first page", scraper_name, len(products))
                 # Show first product as example
-                print(f"   Example: {products[0]['name']} - ${products[0]['price']}")
+                logger.info("   Example: %s - $%s", products[0]['name'], products[0]['price'])
             else:
-                print(f"⚠️ {scraper_name} test returned no products")
+                logger.warning("⚠️ %s test returned no products", scraper_name)
         except Exception as e:
-            print(f"❌ {scraper_name} test failed: {e}")
+            logger.exception("❌ %s test failed: %s", scraper_name, e)
+
+    def _save_batch(self, scraper_name: str, category: str, products: list) -> int:
+        """Write one page of products to the database as soon as it arrives"""
+        saved_count = self.db.save_products(products)
+        profiling.checkpoint()
+        logger.debug("💾 Saved %d/%d %s products from %s", saved_count, len(products), category, scraper_name)
+        return saved_count
     
-    def scrape_retailer(self, retailer_name: str):
-        """Scrape a specific retailer"""
+    def scrape_retailer(self, retailer_name: str) -> int:
+        """Scrape a specific retailer, return the number of products processed"""
         if retailer_name not in self.scrapers:
-            print(f"❌ Retailer '{retailer_name}' not found")
-            return []
+            logger.error("❌ Retailer '%s' not found", retailer_name)
+            return 0
         
         scraper = self.scrapers[retailer_name]
-        print(f"\n🏪 === Scraping {retailer_name.upper()} ===")
+        logger.info("🏪 === Scraping %s ===", retailer_name.upper())
         
-        all_products = []
+        counts = {category: 0 for category in self.categories}
         
-        for category in self.categories:
-            try:
-                print(f"📂 Category: {category}")
-                products = scraper.scrape_category(category)
-                
-                if products:
-                    # Save to database immediately
-                    saved_count = self.db.save_products(products)
-                    print(f"💾 Saved {saved_count}/{len(products)} {category} products from {retailer_name}")
-                    all_products.extend(products)
-                else:
-                    print(f"⚠️ No products found for {category} from {retailer_name}")
-                
-                # Be respectful - wait between categories
-                if not self.dev_mode:
-                    import time
-                    time.sleep(3)
-                
-            except Exception as e:
-                print(f"❌ Error scraping {category} from {retailer_name}: {e}")
-                import traceback
-                traceback.print_exc()
+        try:
+            # Each URL is fetched once and its products fanned out to categories
+            for category, products in scraper.scrape_categories(self.categories):
+                counts[category] += self._save_batch(retailer_name, category, products)
+            
+        except Exception as e:
+            logger.exception("❌ Error scraping %s: %s", retailer_name, e)
+        
+        for category, count in counts.items():
+            if not count:
+                logger.warning("⚠️ No products found for %s from %s", category, retailer_name)
         
-        return all_products
+        return sum(counts.values())
     
-    def scrape_all(self):
-        """Scrape all sites and categories"""
-        print(f"🚀 Starting scrape at {datetime.now()}")
-        print(f"📊 Mode: {'Development' if self.dev_mode else 'Production'}")
-        print(f"🏪 Retailers: {', '.join(self.scrapers.keys())}")
-        print(f"📂 Categories: {', '.join(self.categories)}")
-        
-        all_products = []
+    def scrape_all(self, workers: int = 1) -> int:
+        """Scrape all sites and categories.
+
+        With workers > 1 each retailer runs in its own thread. Retailers are
+        independent hosts with independent rate limits, so the run takes about
+        as long as the slowest retailer.
+        """
+        logger.info("🚀 Starting scrape at %s", datetime.now())
+        metrics.reset()
+        self._log_setup()
+        if workers > 1:
+            logger.info("🧵 Workers: %d", workers)
+        
         retailer_stats = {}
         
-        for scraper_name in self.scrapers.keys():
-            try:
-                products = self.scrape_retailer(scraper_name)
-                retailer_stats[scraper_name] = len(products)
-                all_products.extend(products)
-                
-            except Exception as e:
-                print(f"💥 Fatal error scraping {scraper_name}: {e}")
-                retailer_stats[scraper_name] = 0
-                import traceback
-                traceback.print_exc()
-        
-        # Print summary
-        print(f"\n✅ Scraping completed!")
-        print(f"📊 Summary by retailer:")
-        for retailer, count in retailer_stats.items():
-            print(f"   - {retailer}: {count} products")
-        print(f"📊 Total products processed: {len(all_products)}")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(self.scrape_retailer, name): name for name in self.scrapers}
+            for future in as_completed(futures):
+                scraper_name = futures[future]
+                try:
+                    retailer_stats[scraper_name] = future.result()
+                    
+                except Exception as e:
+                    logger.exception("💥 Fatal error scraping %s: %s", scraper_name, e)
+                    retailer_stats[scraper_name] = 0
+        
+        # Report retailers in their configured order, not completion order
+        return self._report({name: retailer_stats[name] for name in self.scrapers})
+
+    async def _scrape_retailer_task(self, scraper_name: str) -> int:
+        counts = {category: 0 for category in self.categories}
+        try:
+            async for category, products in self.scrapers[scraper_name].scrape_categories_async(self.categories):
+                counts[category] += self._save_batch(scraper_name, category, products)
+        except Exception as e:
+            logger.exception("❌ Error scraping %s: %s", scraper_name, e)
+        
+        for category, count in counts.items():
+            if not count:
+                logger.warning("⚠️ No products found for %s from %s", category, scraper_name)
+        return sum(counts.values())
+
+    async def scrape_all_async(self) -> int:
+        """Scrape all sites concurrently.
+
+        Every retailer is scheduled at once; per-host politeness is enforced
+        by the scrapers' host slots and the rate limiter, so different
+        retailers overlap while each one is still crawled at a polite pace.
+        Pages are saved as they arrive.
+        """
+        logger.info("🚀 Starting async scrape at %s", datetime.now())
+        metrics.reset()
+        self._log_setup()
+
+        names = list(self.scrapers)
+        counts = await asyncio.gather(*(self._scrape_retailer_task(name) for name in names))
+
+        return self._report(dict(zip(names, counts)))
+
+    def _log_setup(self):
+        logger.info("📊 Mode: %s", 'Development' if self.dev_mode else 'Production')
+        logger.info("🏪 Retailers: %s", ', '.join(self.scrapers.keys()))
+        logger.info("📂 Categories: %s", ', '.join(self.categories))
+
+    def _report(self, retailer_stats: dict) -> int:
+        """Log the run summary, export the latest data and write the run metrics"""
+        total = sum(retailer_stats.values())
+        
+        logger.info("✅ Scraping completed!")
+        logger.info("📊 Summary by retailer:")
+        for name, count in retailer_stats.items():
+            stats = metrics.retailer_summary(self.scrapers[name].retailer_name)
+            logger.info("   - %s: %d products (%.1f/s, %d requests, %.1f MB, %d retries)", name, count,
+                        stats['products_per_second'], stats['requests'], stats['bytes_downloaded'] / 1e6,
+                        stats['retries'], extra={'retailer': name, 'products': count, **stats})
+        logger.info("📊 Total products processed: %d", total, extra={'products': total})
         
         # Export latest data
-        if all_products:
-            export_file = self.db.export_to_json('latest-export.json')
-            print(f"📄 Latest data exported to: {export_file}")
+        if total:
+            if self.prune_days:
+                self.db.prune_products(self.prune_days)
+            
+            # The version the previous export was at, consumers holding it only need the delta
+            previous = (read_manifest(default_products_dir()) or {}).get('catalog_version')
+            with metrics.timer('export'):
+                export_file = self.db.export_to_json(f"latest-export{EXTENSIONS[self.export_format]}",
+                                                     fmt=self.export_format, shards=True)
+                if isinstance(previous, int) and previous < self.db.catalog_version():
+                    self.db.export_delta(previous, keep=self.keep_deltas)
+            logger.info("📄 Latest data exported to: %s", export_file)
         else:
-            print("⚠️ No products to export")
+            logger.warning("⚠️ No products to export")
         
-        return all_products
+        prom_file, summary_file = metrics.export(self.metrics_dir)
+        logger.info("⏱️ Run metrics written to %s and %s", prom_file, summary_file)
+        return total
     
-    def scrape_category(self, category: str):
+    def scrape_category(self, category: str) -> int:
         """Scrape a specific category from all retailers"""
-        print(f"🎯 Scraping category: {category}")
+        logger.info("🎯 Scraping category: %s", category)
         
-        all_products = []
+        total = 0
         for scraper_name, scraper in self.scrapers.items():
             try:
-                print(f"\n🏪 {scraper_name} - {category}")
-                products = scraper.scrape_category(category)
-                if products:
-                    saved_count = self.db.save_products(products)
-                    print(f"💾 Saved {saved_count} {category} products from {scraper_name}")
-                    all_products.extend(products)
-                else:
-                    print(f"⚠️ No {category} products from {scraper_name}")
+                logger.info("🏪 %s - %s", scraper_name, category)
+                count = 0
+                for products in scraper.scrape_category(category):
+                    count += self._save_batch(scraper_name, category, products)
+                if not count:
+                    logger.warning("⚠️ No %s products from %s", category, scraper_name)
+                total += count
             except Exception as e:
-                print(f"❌ Error scraping {category} from {scraper_name}: {e}")
+                logger.exception("❌ Error scraping %s from %s: %s", category, scraper_name, e)
         
-        return all_products
+        return total
 
 def main():
     parser = argparse.ArgumentParser(description='Scrape keyboard component data')
@@ -157,10 +241,72 @@ def main():
     parser.add_argument('--retailer', help='Scrape specific retailer only')
     parser.add_argument('--test', help='Test a specific scraper')
     parser.add_argument('--list', action='store_true', help='List available scrapers')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Fetch all retailers and categories concurrently')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Scrape up to N retailers in parallel threads (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore the conditional-GET cache and re-download every page')
+    parser.add_argument('--record', action='store_true',
+                        help='Archive every raw response so the run can be replayed offline')
+    parser.add_argument('--replay', metavar='RUN_ID',
+                        help="Re-run the pipeline from an archived run ('latest' for the newest) without network I/O")
+    parser.add_argument('--rate', type=float, help='Max requests per second per host (default: 1.0)')
+    parser.add_argument('--burst', type=int, help='Requests allowed back to back per host (default: 2)')
+    parser.add_argument('--parser', choices=BACKENDS,
+                        help='HTML parser backend (default: bs4)')
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('--quiet', '-q', action='store_true', help='Only log warnings and errors')
+    verbosity.add_argument('--verbose', '-v', action='store_true',
+                           help='Log every fetch, selector attempt and product (debug level)')
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default='text',
+                        help='Log as plain text lines or one JSON object per record (default: text)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the run (CPU and memory) into data/profiles/')
+    parser.add_argument('--profile-top', type=int, default=25, metavar='N',
+                        help='Hotspots listed in the profile summary (default: 25)')
+    parser.add_argument('--metrics-dir',
+                        help='Where to write the Prometheus textfile and JSON run summary (default: data/metrics)')
+    parser.add_argument('--export-format', choices=FORMATS, default='pretty',
+                        help='latest-export layout: indented JSON, compact JSON or NDJSON (default: pretty)')
+    parser.add_argument('--prune-days', type=int, metavar='DAYS',
+                        help='After the run, remove products no scrape has seen for DAYS days')
+    parser.add_argument('--keep-deltas', type=int, default=DELTA_KEEP, metavar='N',
+                        help=f'Delta exports kept in data/products/deltas, newest first (default: {DELTA_KEEP})')
+    parser.add_argument('--compact-history', action='store_true',
+                        help='Collapse repeated price history rows into intervals, then exit')
     args = parser.parse_args()
     
+    level = logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO
+    setup_logging(level, args.log_format)
+    
+    profiler = None
+    scraper_manager = None
     try:
-        scraper_manager = KeyboardScraperManager(dev_mode=args.dev)
+        # Politeness is enforced per host by the shared rate limiter
+        shared_limiter.configure(rate=args.rate, burst=args.burst)
+
+        archive = None
+        if args.replay:
+            archive = ResponseArchive(run_id=args.replay, replay=True)
+            logger.info("📼 Replaying archived run %s (%d responses)", archive.run_id, len(archive.index))
+        elif args.record:
+            archive = ResponseArchive()
+            logger.info("📼 Recording responses to archive run %s", archive.run_id)
+
+        if args.profile:
+            # Replays are named after the archived run, so profiles of the same input line up
+            name = f"main-replay-{archive.run_id}" if args.replay else 'main'
+            profiler = profiling.Profiler(name, top=args.profile_top).start()
+
+        scraper_manager = KeyboardScraperManager(dev_mode=args.dev, use_cache=not args.no_cache,
+                                                 archive=archive, parser=args.parser,
+                                                 metrics_dir=args.metrics_dir, export_format=args.export_format,
+                                                 prune_days=args.prune_days, keep_deltas=args.keep_deltas)
+        
+        if args.compact_history:
+            scraper_manager.db.compact_price_history()
+            return
         
         if args.list:
             print("Available scrapers:")
@@ -174,30 +320,36 @@ def main():
         
         if args.retailer:
             if args.retailer not in scraper_manager.scrapers:
-                print(f"❌ Unknown retailer: {args.retailer}")
-                print(f"Available: {', '.join(scraper_manager.scrapers.keys())}")
+                logger.error("❌ Unknown retailer: %s", args.retailer)
+                logger.error("Available: %s", ', '.join(scraper_manager.scrapers.keys()))
                 return
             scraper_manager.scrape_retailer(args.retailer)
             return
         
         if args.category:
             if args.category not in scraper_manager.categories:
-                print(f"❌ Unknown category: {args.category}")
-                print(f"Available: {', '.join(scraper_manager.categories)}")
+                logger.error("❌ Unknown category: %s", args.category)
+                logger.error("Available: %s", ', '.join(scraper_manager.categories))
                 return
             scraper_manager.scrape_category(args.category)
             return
         
         # Default: scrape everything
-        scraper_manager.scrape_all()
+        if args.use_async:
+            asyncio.run(scraper_manager.scrape_all_async())
+        else:
+            scraper_manager.scrape_all(workers=args.workers)
             
     except KeyboardInterrupt:
-        print("\n🛑 Scraping interrupted by user")
+        logger.warning("🛑 Scraping interrupted by user")
     except Exception as e:
-        print(f"💥 Fatal error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("💥 Fatal error: %s", e)
         sys.exit(1)
+    finally:
+        if scraper_manager:
+            scraper_manager.db.close()
+        if profiler:
+            profiler.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,8 +1,16 @@
+import logging
 from base_scraper import BaseScraper
-from urllib.parse import urljoin
+from utils.keywords import is_sold_out
+from urllib.parse import urljoin, urlparse, parse_qs
 from typing import List, Dict
 
+logger = logging.getLogger(__name__)
+
 class MechanicalKeyboardsScraper(BaseScraper):
+    # Product listings; anything else is skipped by a scoped parse
+    parse_scope = r'product'
+    pager_links = r'l=product_list'
+
     def __init__(self):
         super().__init__('https://mechanicalkeyboards.com', 'MechanicalKeyboards')
         self.category_urls = {
@@ -13,30 +21,51 @@ class MechanicalKeyboardsScraper(BaseScraper):
             'stabilizers': '/shop/index.php?l=product_list&c=306'
         }
     
-    def scrape_category(self, category: str) -> List[Dict]:
-        """Scrape MechanicalKeyboards.com category"""
-        if category not in self.category_urls:
-            print(f"⚠️ Category '{category}' not supported for MechanicalKeyboards")
-            return []
+    def next_page_url(self, soup, url: str, page: int):
+        """product_list pages are paged by an offset parameter rather than ?page=N"""
+        next_url = super().next_page_url(soup, url, page)
+        if next_url:
+            return next_url
         
-        products = []
-        url = urljoin(self.base_url, self.category_urls[category])
+        current = parse_qs(urlparse(url).query)
+        current_offset = self._list_offset(current)
         
-        print(f"🔍 Scraping MechanicalKeyboards {category} from {url}")
+        # Pick the closest product_list link for the same category with a larger offset
+        candidates = []
+        for link in soup.select('a[href*="l=product_list"]'):
+            href = urljoin(url, link.attr('href'))
+            query = parse_qs(urlparse(href).query)
+            if query.get('c') != current.get('c'):
+                continue
+            offset = self._list_offset(query)
+            if offset > current_offset:
+                candidates.append((offset, href))
         
-        soup = self.get_page(url)
+        return min(candidates)[1] if candidates else None
+
+    def _list_offset(self, query: Dict) -> int:
+        """The numeric paging parameter of a product_list URL (anything besides l and c)"""
+        for key, values in query.items():
+            if key not in ('l', 'c') and values and values[0].isdigit():
+                return int(values[0])
+        return 0
+
+    def _parse_page(self, soup, url: str, category: str) -> List[Dict]:
+        """Extract products from an already fetched category page"""
+        products = []
+        descriptions = []
         if not soup:
             return products
         
         # MechanicalKeyboards.com uses a specific structure
-        product_containers = soup.find_all('div', class_='product_listing_container')
+        product_containers = soup.select('div.product_listing_container')
         
         if not product_containers:
             # Try alternative selectors
-            product_containers = soup.find_all('div', class_='product')
+            product_containers = soup.select('div.product')
             
         if not product_containers:
-            print(f"⚠️ No products found on {url} - trying alternative selectors")
+            logger.debug("⚠️ No products found on %s - trying alternative selectors", url)
             # Try more generic selectors
             product_containers = soup.select('.product-item, .item, [class*="product"]')
         
@@ -44,32 +73,32 @@ class MechanicalKeyboardsScraper(BaseScraper):
             self.debug_page_structure(soup, url)
             return products
         
-        print(f"📦 Found {len(product_containers)} product containers")
+        logger.debug("📦 Found %d product containers", len(product_containers))
         
         for container in product_containers:
             try:
                 # Extract title - try multiple selectors
-                title_elem = (container.find('a', class_='product_listing_name') or
-                             container.find('h3') or
-                             container.find('h4') or
-                             container.find('a'))
+                title_elem = (container.select_one('a.product_listing_name') or
+                             container.select_one('h3') or
+                             container.select_one('h4') or
+                             container.select_one('a'))
                 
                 if not title_elem:
                     continue
                     
-                title = title_elem.get_text(strip=True)
+                title = title_elem.text()
                 if not title:
                     continue
                 
                 # Extract price
-                price_elem = (container.find('span', class_='product_listing_price') or
-                             container.find('span', class_='price') or
-                             container.find('div', class_='price'))
+                price_elem = (container.select_one('span.product_listing_price') or
+                             container.select_one('span.price') or
+                             container.select_one('div.price'))
                 
                 if not price_elem:
                     continue
                 
-                price_text = price_elem.get_text(strip=True)
+                price_text = price_elem.text()
                 price = self.parse_price(price_text)
                 
                 if not self.is_valid_product(title, price):
@@ -77,23 +106,20 @@ class MechanicalKeyboardsScraper(BaseScraper):
                 
                 # Extract product URL
                 product_url = None
-                if title_elem and title_elem.get('href'):
-                    product_url = urljoin(self.base_url, title_elem['href'])
+                if title_elem and title_elem.attr('href'):
+                    product_url = urljoin(self.base_url, title_elem.attr('href'))
                 
                 # Extract image
-                img_elem = container.find('img')
+                img_elem = container.select_one('img')
                 image_url = None
                 if img_elem:
-                    img_src = img_elem.get('src') or img_elem.get('data-src')
+                    img_src = img_elem.attr('src') or img_elem.attr('data-src')
                     if img_src:
                         image_url = urljoin(self.base_url, img_src)
                 
                 # Get additional details from description if available
-                desc_elem = container.find('div', class_='product_listing_description')
-                description = desc_elem.get_text(strip=True) if desc_elem else ''
-                
-                # Extract specs
-                specs = self.extract_specs(title, description, product_url or '')
+                desc_elem = container.select_one('div.product_listing_description')
+                description = desc_elem.text() if desc_elem else ''
                 
                 # Auto-categorize to ensure accuracy
                 detected_category = self.categorize_product(title, [], product_url or '')
@@ -104,10 +130,9 @@ class MechanicalKeyboardsScraper(BaseScraper):
                 
                 # Check availability
                 availability = 1
-                availability_elem = container.find('span', class_='product_listing_stock')
+                availability_elem = container.select_one('span.product_listing_stock')
                 if availability_elem:
-                    stock_text = availability_elem.get_text(strip=True).lower()
-                    if any(phrase in stock_text for phrase in ['out of stock', 'sold out', 'unavailable']):
+                    if is_sold_out(availability_elem.text()):
                         availability = 0
                 
                 product = {
@@ -117,16 +142,18 @@ class MechanicalKeyboardsScraper(BaseScraper):
                     'retailer': self.retailer_name,
                     'product_url': product_url,
                     'image_url': image_url,
-                    'specs': specs,
+                    'specs': {},  # filled in for the whole page below
                     'availability': availability
                 }
                 
                 products.append(product)
-                print(f"✅ Found: {title} - ${price}")
+                descriptions.append(description)
+                logger.debug("✅ Found: %s - $%s", title, price)
                 
             except Exception as e:
-                print(f"❌ Error parsing MechanicalKeyboards product: {e}")
+                logger.warning("❌ Error parsing MechanicalKeyboards product: %s", e)
                 continue
         
-        print(f"📦 Found {len(products)} products in {category} from MechanicalKeyboards")
+        self.fill_specs(products, descriptions)
+        logger.debug("📦 Found %d products in %s from MechanicalKeyboards", len(products), category)
         return products
\ No newline at end of file
@@ -1,8 +1,43 @@
-from base_scraper import BaseScraper
+import logging
+from shopify_scraper import ShopifyScraper
+from utils.keywords import is_sold_out
 from urllib.parse import urljoin
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class NovelKeysScraper(ShopifyScraper):
+    # Product grid; anything else is skipped by a scoped parse
+    parse_scope = r'product|grid'
+
+    # NovelKeys selector strategies
+    selector_strategies = [
+        # Strategy 1: Modern NovelKeys product cards
+        {
+            'container': '.product-card, .grid-product, .product-item',
+            'title': '.product-card__title, .grid-product__title, h3, h4',
+            'price': '.price, .money, .product-card__price',
+            'link': 'a',
+            'image': 'img'
+        },
+        # Strategy 2: Alternative structure
+        {
+            'container': 'div[data-product-id], article, .product',
+            'title': '.product-title, .title, h2, h3',
+            'price': '.price, .cost, [class*="price"]',
+            'link': 'a',
+            'image': 'img'
+        },
+        # Strategy 3: Generic Shopify structure
+        {
+            'container': '.grid__item, .collection-product, li[class*="product"]',
+            'title': '.product-name, .grid-product__title, h3, h4',
+            'price': '.price, .money, [data-price]',
+            'link': 'a',
+            'image': 'img'
+        }
+    ]
 
-class NovelKeysScraper(BaseScraper):
     def __init__(self):
         super().__init__('https://novelkeys.com', 'NovelKeys')
         self.category_urls = {
@@ -20,104 +55,19 @@ class NovelKeysScraper(BaseScraper):
             'case': ['/collections/diy', '/collections/kits']
         }
     
-    def scrape_category(self, category: str) -> List[Dict]:
-        """Scrape NovelKeys category with improved error handling"""
-        if category not in self.category_urls:
-            print(f"⚠️ Category '{category}' not supported for NovelKeys")
-            return []
-        
-        # Try primary URL first
-        urls_to_try = [self.category_urls[category]]
-        
-        # Add alternative URLs
-        if category in self.alternative_urls:
-            urls_to_try.extend(self.alternative_urls[category])
-        
-        all_products = []
-        
-        for url in urls_to_try:
-            full_url = urljoin(self.base_url, url)
-            print(f"🔍 Trying NovelKeys {category} from {full_url}")
-            
-            products = self._scrape_url(full_url, category)
-            
-            # Filter products to match target category
-            filtered_products = []
-            for product in products:
-                detected_category = self.categorize_product(product['name'], [], product.get('product_url', ''))
-                
-                # Only include if it matches our target category or is close enough
-                if detected_category == category or (category == 'case' and detected_category in ['pcb']) or \
-                   (category == 'stabilizers' and 'stab' in product['name'].lower()):
-                    filtered_products.append(product)
-            
-            if filtered_products:
-                print(f"✅ Found {len(filtered_products)} {category} products from {full_url}")
-                all_products.extend(filtered_products)
-            
-        # Remove duplicates based on name and price
-        unique_products = []
-        seen = set()
-        for product in all_products:
-            key = (product['name'], product['price'])
-            if key not in seen:
-                seen.add(key)
-                unique_products.append(product)
-        
-        print(f"📦 Total unique {category} products from NovelKeys: {len(unique_products)}")
-        return unique_products
-    
-    def _scrape_url(self, url: str, category: str) -> List[Dict]:
-        """Scrape products from a specific URL"""
-        soup = self.get_page(url)
-        if not soup:
-            return []
-        
-        products = []
-        
-        # NovelKeys selector strategies
-        selector_strategies = [
-            # Strategy 1: Modern NovelKeys product cards
-            {
-                'container': '.product-card, .grid-product, .product-item',
-                'title': '.product-card__title, .grid-product__title, h3, h4',
-                'price': '.price, .money, .product-card__price',
-                'link': 'a',
-                'image': 'img'
-            },
-            # Strategy 2: Alternative structure
-            {
-                'container': 'div[data-product-id], article, .product',
-                'title': '.product-title, .title, h2, h3',
-                'price': '.price, .cost, [class*="price"]',
-                'link': 'a',
-                'image': 'img'
-            },
-            # Strategy 3: Generic Shopify structure
-            {
-                'container': '.grid__item, .collection-product, li[class*="product"]',
-                'title': '.product-name, .grid-product__title, h3, h4',
-                'price': '.price, .money, [data-price]',
-                'link': 'a',
-                'image': 'img'
-            }
-        ]
+    def route_product(self, product: Dict, url_categories: List[str], categories: List[str]) -> Optional[str]:
+        """Route by detected category, accepting close matches and dropping unknowns"""
+        detected_category = self.categorize_product(product['name'], product.get('tags', []),
+                                                    product.get('product_url') or '')
+        if detected_category in categories:
+            return detected_category
         
-        for strategy in selector_strategies:
-            print(f"🔍 Trying NovelKeys selector strategy: {strategy['container']}")
-            containers = soup.select(strategy['container'])
-            
-            if containers:
-                print(f"📦 Found {len(containers)} product containers")
-                products = self._extract_products(containers, strategy, category, url)
-                if products:
-                    return products
-            else:
-                print(f"⚠️ No containers found with selector: {strategy['container']}")
-        
-        # Debug if no products found
-        self.debug_page_structure(soup, url)
-        return []
+        # Close enough matches
+        if detected_category == 'pcb' and 'case' in categories:
+            return 'case'
+        if 'stabilizers' in categories and 'stab' in product['name'].lower():
+            return 'stabilizers'
+        return None
     
     def _extract_products(self, containers: list, strategy: dict, category: str, base_url: str) -> List[Dict]:
         """Extract product information using the given strategy"""
@@ -130,7 +80,7 @@ class NovelKeysScraper(BaseScraper):
                 if not title_elem:
                     continue
                 
-                title = title_elem.get_text(strip=True)
+                title = title_elem.text()
                 if not title:
                     continue
                 
@@ -139,7 +89,7 @@ class NovelKeysScraper(BaseScraper):
                 if not price_elem:
                     continue
                 
-                price_text = price_elem.get_text(strip=True)
+                price_text = price_elem.text()
                 price = self.parse_price(price_text)
                 
                 if not self.is_valid_product(title, price):
@@ -148,24 +98,21 @@ class NovelKeysScraper(BaseScraper):
                 # Extract link
                 link_elem = container.select_one(strategy['link'])
                 product_url = None
-                if link_elem and link_elem.get('href'):
-                    product_url = urljoin(base_url, link_elem['href'])
+                if link_elem and link_elem.attr('href'):
+                    product_url = urljoin(base_url, link_elem.attr('href'))
                 
                 # Extract image
                 img_elem = container.select_one(strategy['image'])
                 image_url = None
                 if img_elem:
-                    img_src = img_elem.get('src') or img_elem.get('data-src') or img_elem.get('data-original')
+                    img_src = img_elem.attr('src') or img_elem.attr('data-src') or img_elem.attr('data-original')
                     if img_src:
                         image_url = urljoin(base_url, img_src)
                 
-                # Extract specs
-                specs = self.extract_specs(title, '', product_url or '')
-                
                 # Check availability
                 availability = 1  # Default to available
                 sold_out_indicators = container.select('.sold-out, .unavailable, [class*="sold"]')
-                if sold_out_indicators or any(phrase in price_text.lower() for phrase in ['sold out', 'unavailable']):
+                if sold_out_indicators or is_sold_out(price_text):
                     availability = 0
                 
                 product = {
@@ -175,15 +122,16 @@ class NovelKeysScraper(BaseScraper):
                     'retailer': self.retailer_name,
                     'product_url': product_url,
                     'image_url': image_url,
-                    'specs': specs,
+                    'specs': {},  # filled in for the whole page below
                     'availability': availability
                 }
                 
                 products.append(product)
-                print(f"✅ Found: {title} - ${price}")
+                logger.debug("✅ Found: %s - $%s", title, price)
                 
             except Exception as e:
-                print(f"❌ Error parsing NovelKeys product: {e}")
+                logger.warning("❌ Error parsing NovelKeys product: %s", e)
                 continue
         
+        self.fill_specs(products)
         return products
\ No newline at end of file
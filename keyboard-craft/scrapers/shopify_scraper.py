@@ -0,0 +1,151 @@
+import logging
+from base_scraper import BaseScraper
+from utils.http_cache import HttpCache
+from utils.metrics import metrics
+from urllib.parse import urljoin, urlparse
+from typing import List, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# HttpCache result key for a products.json page: its raw product entries,
+# mapped again on every run like a fresh response
+PRODUCTS_JSON_KEY = 'products.json'
+
+class ShopifyScraper(BaseScraper):
+    """Base for Shopify stores.
+
+    Collections are read from the storefront `/collections/<handle>/products.json`
+    endpoint, which returns variants, prices, availability, tags and images as
+    JSON. The themed HTML is only parsed when that endpoint is not available.
+    """
+
+    # Shopify caps products.json at 250 products per page
+    products_json_limit = 250
+    use_products_json = True
+
+    def _collection_handle(self, url: str) -> Optional[str]:
+        parts = [part for part in urlparse(url).path.split('/') if part]
+        if len(parts) >= 2 and parts[0] == 'collections':
+            return parts[1]
+        return None
+
+    def _iter_url(self, url: str, category: str):
+        """Yield a collection's products page by page, preferring products.json over HTML"""
+        handle = self._collection_handle(url)
+        if self.use_products_json and handle:
+            items = self._fetch_products_json(handle, 1)
+            if items is not None:
+                yield from self._iter_products_json(handle, category, items)
+                return
+            logger.info("⚠️ No products.json for %s, falling back to HTML", url)
+
+        yield from super()._iter_url(url, category)
+
+    def _fetch_products_json(self, handle: str, page: int) -> Optional[List[Dict]]:
+        """Fetch one page of products.json, or None if the endpoint isn't there"""
+        json_url = urljoin(self.base_url, f"/collections/{handle}/products.json"
+                                          f"?limit={self.products_json_limit}&page={page}")
+        # Conditional like the HTML pages: on a 304 the entries stored last time are reused
+        entry = None
+        if self.http_cache:
+            entry = self.http_cache.lookup(json_url, PRODUCTS_JSON_KEY, self.cache_version)
+        response = self.fetch(json_url, headers={'Accept': 'application/json', **HttpCache.conditional_headers(entry)})
+        if response is None:
+            return None
+        if response.status_code == 304 and entry:
+            metrics.inc('cache_hits', retailer=self.retailer_name)
+            return entry['results'][PRODUCTS_JSON_KEY]
+
+        try:
+            items = response.json().get('products')
+        except (ValueError, AttributeError):
+            # Not JSON (e.g. a themed 404 page), so the endpoint isn't there
+            return None
+
+        if self.http_cache and response.status_code == 200 and items is not None:
+            self.http_cache.store(json_url, PRODUCTS_JSON_KEY, response.headers, items, self.cache_version)
+        return items
+
+    def _iter_products_json(self, handle: str, category: str, items: List[Dict]):
+        """Map products.json pages to product dicts, starting from the already fetched first page"""
+        total = 0
+        page = 1
+        while items:
+            with metrics.timer('extract', retailer=self.retailer_name):
+                products = self._map_products_page(items, category)
+            metrics.inc('products_extracted', len(products), retailer=self.retailer_name)
+            total += len(products)
+            if products:
+                yield products
+
+            if len(items) < self.products_json_limit or page >= self.max_pages:
+                break
+            page += 1
+            items = self._fetch_products_json(handle, page)
+
+        logger.debug("📦 Found %d valid products in %s from %s products.json", total, category, self.retailer_name)
+
+    def _map_products_page(self, items: List[Dict], category: str) -> List[Dict]:
+        """Map one page of products.json entries, skipping the ones that aren't valid products"""
+        products = []
+        descriptions = []
+        for item in items:
+            try:
+                product = self._map_shopify_product(item, category)
+                if product:
+                    products.append(product)
+                    descriptions.append(' '.join(product['tags']))
+            except Exception as e:
+                logger.warning("❌ Error parsing %s product JSON: %s", self.retailer_name, e)
+
+        self.fill_specs(products, descriptions)
+        return products
+
+    def _map_shopify_product(self, item: Dict, category: str) -> Optional[Dict]:
+        """Map one products.json entry onto our product dict"""
+        title = (item.get('title') or '').strip()
+        variants = item.get('variants') or []
+
+        tags = item.get('tags') or []
+        if isinstance(tags, str):
+            tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+        # product_type is kept with the tags so route_product sees it too
+        product_type = (item.get('product_type') or '').strip()
+        if product_type:
+            tags = [product_type] + tags
+
+        available_variants = [v for v in variants if v.get('available', True)]
+        prices = []
+        for variant in available_variants or variants:
+            try:
+                prices.append(float(variant.get('price')))
+            except (TypeError, ValueError):
+                continue
+        price = min(prices) if prices else 0.0
+
+        if not self.is_valid_product(title, price):
+            return None
+
+        product_url = urljoin(self.base_url, f"/products/{item['handle']}") if item.get('handle') else None
+
+        image_url = None
+        images = item.get('images') or []
+        if images and images[0].get('src'):
+            image_url = images[0]['src']
+            if image_url.startswith('//'):
+                image_url = 'https:' + image_url
+
+        # Tags and product_type are far more reliable than the title alone
+        detected_category = self.categorize_product(title, tags, product_url or '')
+
+        return {
+            'name': title,
+            'category': detected_category if detected_category != 'unknown' else category,
+            'price': price,
+            'retailer': self.retailer_name,
+            'product_url': product_url,
+            'image_url': image_url,
+            'specs': {},  # filled in for the whole page by _iter_products_json
+            'availability': 1 if available_variants else 0,
+            'tags': tags,
+        }
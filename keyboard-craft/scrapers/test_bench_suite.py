@@ -0,0 +1,29 @@
+"""
+Tests for the benchmark suite itself: python -m pytest test_bench_suite.py
+"""
+
+import os
+import sys
+
+# Add the project root and the benchmarks to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from bench_suite import Suite, clear_caches
+
+
+def test_measure_after_run_repeats_each_pages_own_workload():
+    """main() re-measures suspected regressions after run(); each must still run its own page"""
+    suite = Suite(cards=40, repeat=1, only='extract')
+    try:
+        suite.run()
+        for name, (scraper, url, category, page, scaled) in suite.pages.items():
+            for label, content in ((name, page), (f"{name}-x{suite.cards}", scaled)):
+                clear_caches()
+                expected = len(scraper._parse_page(scraper.parser.parse(content.encode('utf-8')), url, category))
+                func, _ = suite.benchmarks[f"extract/{label}"]
+                clear_caches()
+                assert len(func()) == expected, label
+                suite.measure(f"extract/{label}", 1)
+    finally:
+        suite.close()
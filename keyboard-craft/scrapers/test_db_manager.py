@@ -0,0 +1,189 @@
+"""
+Tests for DatabaseManager, run against a throwaway database: python -m pytest test_db_manager.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database.db_manager
+from database.db_manager import DatabaseManager, canonical_url
+
+
+def mk_product(number: int) -> dict:
+    return {
+        'name': f'Switch {number}',
+        'category': 'switches',
+        'price': 5.0,
+        'retailer': 'MechanicalKeyboards',
+        'product_url': f'https://mechanicalkeyboards.com/shop/index.php?l=product_detail&p={number}',
+        'specs': {},
+    }
+
+
+def test_query_identified_products_keep_their_own_rows(tmp_path):
+    """MechanicalKeyboards products differ only by ?p=, each must get its own row"""
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        assert db.save_products([mk_product(5200), mk_product(5201)]) == 2
+        assert db.conn.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 2
+        assert DatabaseManager.product_id(mk_product(5200)) == 'mechanicalkeyboards-index-product_detail-5200'
+
+
+def test_canonical_url_drops_tracking_but_keeps_identifying_query():
+    assert canonical_url('https://www.MechanicalKeyboards.com/shop/index.php?p=5200&utm_source=x&l=product_detail') \
+        == 'mechanicalkeyboards.com/shop/index.php?l=product_detail&p=5200'
+    assert canonical_url('https://kbdfans.com/collections/switches/products/gateron-yellow?variant=42') \
+        == 'kbdfans.com/products/gateron-yellow'
+
+
+def test_unchanged_price_extends_the_latest_interval(tmp_path):
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        product_id = DatabaseManager.product_id(mk_product(1))
+        db.save_products([mk_product(1)])
+        db.conn.execute("UPDATE price_history SET last_seen = '2024-01-01 00:00:00'")
+        db.save_products([mk_product(1)])
+
+        history = db.get_price_history(product_id)
+        assert len(history) == 1
+        assert history[0]['last_seen'] > '2024-01-01 00:00:00'
+
+
+def test_price_change_opens_a_new_interval(tmp_path):
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        product_id = DatabaseManager.product_id(mk_product(1))
+        db.save_products([mk_product(1)])
+        db.save_products([{**mk_product(1), 'price': 4.0}])
+        db.save_products([{**mk_product(1), 'price': 4.0, 'availability': 0}])
+
+        assert [(row['price'], row['availability']) for row in db.get_price_history(product_id)] \
+            == [(5.0, 1), (4.0, 1), (4.0, 0)]
+
+
+def test_compaction_merges_repeated_rows(tmp_path):
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        product_id = DatabaseManager.product_id(mk_product(1))
+        db.save_products([mk_product(1)])
+        db.conn.execute('DELETE FROM price_history')
+        # One row per scrape, as history was written before intervals
+        db.conn.executemany('''
+            INSERT INTO price_history (product_id, price, availability, first_seen, last_seen) VALUES (?, ?, 1, ?, ?)
+        ''', [(product_id, price, day, day) for price, day in
+              [(5.0, '2024-01-01'), (5.0, '2024-01-02'), (5.0, '2024-01-03'), (4.0, '2024-01-04'),
+               (4.0, '2024-01-05'), (5.0, '2024-01-06')]])
+
+        assert db.compact_price_history() == 3
+        assert [(row['price'], row['first_seen'], row['last_seen']) for row in db.get_price_history(product_id)] \
+            == [(5.0, '2024-01-01', '2024-01-03'), (4.0, '2024-01-04', '2024-01-05'),
+                (5.0, '2024-01-06', '2024-01-06')]
+
+
+def change_seq(db: DatabaseManager, number: int) -> int:
+    return db.conn.execute('SELECT change_seq FROM products WHERE id = ?',
+                           (DatabaseManager.product_id(mk_product(number)),)).fetchone()[0]
+
+
+def test_change_seq_only_moves_on_real_changes(tmp_path):
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        db.save_products([mk_product(1)])
+        inserted = change_seq(db, 1)
+        assert inserted == db.catalog_version() > 0
+
+        db.save_products([mk_product(1)])
+        assert change_seq(db, 1) == inserted
+        assert db.catalog_version() == inserted
+
+        db.save_products([{**mk_product(1), 'price': 4.0}])
+        assert change_seq(db, 1) > inserted
+        assert db.catalog_version() == change_seq(db, 1)
+
+
+def test_pruned_products_leave_tombstones(tmp_path):
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        db.save_products([mk_product(1), mk_product(2)])
+        stale = DatabaseManager.product_id(mk_product(1))
+        db.conn.execute("UPDATE price_history SET last_seen = '2024-01-01 00:00:00' WHERE product_id = ?", (stale,))
+
+        assert db.prune_products(30) == 1
+        assert db.conn.execute('SELECT id, change_seq FROM deleted_products').fetchall() \
+            == [(stale, db.catalog_version())]
+        assert db.conn.execute('SELECT COUNT(*) FROM products').fetchone()[0] == 1
+
+
+def test_export_delta_holds_only_what_changed_since(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.db_manager, 'default_products_dir', lambda: str(tmp_path))
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        db.save_products([mk_product(1), mk_product(2), mk_product(3)])
+        since = db.catalog_version()
+        db.save_products([{**mk_product(1), 'price': 4.0}, mk_product(2), mk_product(4)])
+        db.delete_products([DatabaseManager.product_id(mk_product(3))])
+
+        with open(db.export_delta(since, compress=False), encoding='utf-8') as f:
+            delta = json.load(f)
+        assert (delta['from_version'], delta['to_version']) == (since, db.catalog_version())
+        assert sorted(product['id'] for product in delta['changed']) \
+            == sorted(DatabaseManager.product_id(mk_product(number)) for number in (1, 4))
+        assert delta['removed'] == [DatabaseManager.product_id(mk_product(3))]
+
+
+def test_export_delta_keeps_only_the_newest(tmp_path, monkeypatch):
+    monkeypatch.setattr(database.db_manager, 'default_products_dir', lambda: str(tmp_path))
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        paths = []
+        for price in (1.0, 2.0, 3.0, 4.0):
+            since = db.catalog_version()
+            db.save_products([{**mk_product(1), 'price': price}])
+            paths.append(db.export_delta(since, compress=False, keep=2))
+
+        assert sorted(os.listdir(tmp_path / 'deltas')) == sorted(os.path.basename(path) for path in paths[-2:])
+
+
+def names(products: list) -> list:
+    return [product['name'] for product in products]
+
+
+def test_search_index_follows_upserts_and_deletes(tmp_path):
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        db.save_products([{**mk_product(1), 'name': 'Gateron Yellow'}])
+        db.save_products([{**mk_product(1), 'name': 'Gateron Yellow'}])
+        assert names(db.search('yellow')) == ['Gateron Yellow']
+
+        db.save_products([{**mk_product(1), 'name': 'Gateron Red'}])
+        assert db.search('yellow') == []
+        assert names(db.search('gateron re')) == ['Gateron Red']
+
+        db.delete_products([DatabaseManager.product_id(mk_product(1))])
+        assert db.search('gateron') == []
+
+
+def test_search_ranks_name_matches_above_spec_matches(tmp_path):
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        db.save_products([
+            {**mk_product(1), 'name': 'Gateron Milky Yellow', 'specs': {'switch_type': 'linear'}},
+            {**mk_product(2), 'name': 'Linear Switch Tester', 'specs': {}},
+            {**mk_product(3), 'name': 'Kailh Box White', 'specs': {'switch_type': 'clicky'}},
+        ])
+        assert names(db.search('linear')) == ['Linear Switch Tester', 'Gateron Milky Yellow']
+        assert names(db.search('linear', category='keycaps')) == []
+
+
+def test_find_products_filters_on_spec_columns(tmp_path):
+    with DatabaseManager(str(tmp_path / 'keyboards.db')) as db:
+        db.save_products([
+            {**mk_product(1), 'name': 'Tofu65', 'category': 'case', 'price': 120.0, 'specs': {'layout': '65%'}},
+            {**mk_product(2), 'name': 'Bakeneko65', 'category': 'case', 'price': 90.0, 'specs': {'layout': '65%'}},
+            {**mk_product(3), 'name': 'Mode Eighty', 'category': 'case', 'price': 180.0, 'specs': {'layout': 'TKL'}},
+            {**mk_product(4), 'name': 'DZ65 PCB', 'category': 'pcb', 'price': 50.0, 'specs': {'layout': '65%'}},
+            {**mk_product(5), 'name': 'Gateron Yellow', 'price': 0.3, 'specs': {'pins': 5}},
+        ])
+        assert names(db.find_products('case', layout='65%')) == ['Bakeneko65', 'Tofu65']
+        assert names(db.find_products('case', layout='65%', max_price=100)) == ['Bakeneko65']
+        assert names(db.find_products('case', layout=['65%', 'TKL'], min_price=100)) == ['Tofu65', 'Mode Eighty']
+        assert names(db.find_products(layout='65%', limit=1, offset=1)) == ['Bakeneko65']
+        assert names(db.find_products(pins=5)) == ['Gateron Yellow']
+        with pytest.raises(ValueError):
+            db.find_products(color='red')
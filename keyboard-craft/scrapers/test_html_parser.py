@@ -0,0 +1,36 @@
+"""
+Tests for the scoped BeautifulSoup parse, over the recorded benchmark pages: python -m pytest test_html_parser.py
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+# Add the project root and the benchmarks to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from bench_suite import FIXTURES, load_fixture
+from utils.html_parser import get_backend
+
+
+@pytest.mark.parametrize('name', FIXTURES)
+def test_scoped_parse_extracts_what_the_full_parse_does(name):
+    scraper_class, filename, url, category, _ = FIXTURES[name]
+    scraper = scraper_class()
+    scraper.parser = get_backend('bs4')
+    content = load_fixture(filename).encode('utf-8')
+
+    full = scraper.parser.parse(content, links=scraper.pager_links)
+    scoped = scraper.parser.parse(content, scope=scraper.parse_scope, links=scraper.pager_links)
+
+    assert scoped.scoped
+    products = scraper._parse_page(full, url, category)
+    assert products
+    assert scraper._parse_page(scoped, url, category) == products
+    # Pager links sit outside the product grid and must survive the strainer
+    pager = re.compile(scraper.pager_links)
+    assert [link.attr('href') for link in scoped.select('a[href]') if pager.search(link.attr('href'))] \
+        == [link.attr('href') for link in full.select('a[href]') if pager.search(link.attr('href'))]
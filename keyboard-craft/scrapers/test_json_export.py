@@ -0,0 +1,44 @@
+"""
+Tests for the streaming catalog export: python -m pytest test_json_export.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.json_export import EXTENSIONS, FORMATS, write_catalog
+
+
+def mk_product(number: int, category: str) -> dict:
+    return {'id': f'p{number}', 'name': f'Product {number}', 'category': category,
+            'price': 10.0 + number, 'retailer': 'KBDfans', 'specs': {}}
+
+
+def parse_slice(data: bytes, fmt: str) -> list:
+    """Parse a category's byte range with the framing documented for `fmt`"""
+    text = data.decode('utf-8')
+    if fmt == 'ndjson':
+        return [json.loads(line) for line in text.splitlines()]
+    return json.loads('[' + text + ']')
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_category_byte_ranges_parse_in_every_format(tmp_path, fmt):
+    products = [mk_product(1, 'case'), mk_product(2, 'case'), mk_product(3, 'pcb'), mk_product(4, 'switches'),
+                mk_product(5, 'keycaps'), mk_product(6, 'switches')]
+    export_path = str(tmp_path / f'latest-export{EXTENSIONS[fmt]}')
+    manifest = write_catalog(export_path, products, fmt, version=1)
+
+    with open(export_path, 'rb') as f:
+        data = f.read()
+    for category in ('case', 'pcb', 'keycaps'):
+        entry = manifest['categories'][category]
+        chunk = data[entry['offset']:entry['offset'] + entry['length']]
+        assert parse_slice(chunk, fmt) == [p for p in products if p['category'] == category]
+    # Not contiguous in the export
+    assert manifest['categories']['switches']['offset'] is None
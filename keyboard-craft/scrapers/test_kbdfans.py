@@ -4,11 +4,13 @@ Specific test for KBDfans scraper to debug the issue
 
 import sys
 import os
+import logging
 
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from kbdfans_scraper import KBDfansScraper
+from utils.log import setup_logging
 
 def test_kbdfans_detailed():
     """Detailed test of KBDfans scraper"""
@@ -31,7 +33,7 @@ def test_kbdfans_detailed():
         return
     
     print(f"✅ Got page successfully")
-    print(f"📄 Page title: {soup.title.string if soup.title else 'None'}")
+    print(f"📄 Page title: {soup.title() or 'None'}")
     
     # Check for product blocks specifically
     product_blocks = soup.select('.product-block')
@@ -42,7 +44,7 @@ def test_kbdfans_detailed():
         first_block = product_blocks[0]
         print(f"\n🔍 Examining first product block:")
         print(f"📝 HTML structure (first 500 chars):")
-        print(str(first_block)[:500] + "...")
+        print(first_block.html()[:500] + "...")
         
         # Try to find title
         title_selectors = [
@@ -56,7 +58,7 @@ def test_kbdfans_detailed():
         for selector in title_selectors:
             title_elem = first_block.select_one(selector)
             if title_elem:
-                title = title_elem.get_text(strip=True)
+                title = title_elem.text()
                 print(f"✅ Found title with '{selector}': {title}")
                 break
         else:
@@ -73,16 +75,16 @@ def test_kbdfans_detailed():
         for selector in price_selectors:
             price_elem = first_block.select_one(selector)
             if price_elem:
-                price_text = price_elem.get_text(strip=True)
+                price_text = price_elem.text()
                 print(f"✅ Found price with '{selector}': {price_text}")
                 break
         else:
             print("❌ No price found with any selector")
             
         # Try to find link
-        link_elem = first_block.find('a', href=True)
+        link_elem = first_block.select_one('a[href]')
         if link_elem:
-            href = link_elem['href']
+            href = link_elem.attr('href')
             print(f"✅ Found link: {href}")
         else:
             print("❌ No link found")
@@ -91,7 +93,7 @@ def test_kbdfans_detailed():
     print(f"\n🚀 Testing actual scraping...")
     print("-" * 40)
     
-    products = scraper.scrape_category(category)
+    products = [product for page in scraper.scrape_category(category) for product in page]
     
     if products:
         print(f"🎉 SUCCESS! Found {len(products)} products")
@@ -103,4 +105,6 @@ def test_kbdfans_detailed():
         print(f"❌ FAILED: No products extracted")
 
 if __name__ == "__main__":
+    # Show every selector attempt and product while debugging
+    setup_logging(logging.DEBUG)
     test_kbdfans_detailed()
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Tests for the price text parser: python -m pytest test_price_parser.py
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.price_parser import ParsedPrice, parse_price
+
+
+@pytest.mark.parametrize('text, amount, compare_at', [
+    # A compare-at label on its own is the price of an item that isn't on sale
+    ('Regular price $99.00', 99.0, None),
+    ('MSRP $120', 120.0, None),
+    ('Retail price $45.00', 45.0, None),
+    ('Compare at $60.00', 60.0, None),
+    # Next to a sale price it's the struck-through price, in either order
+    ('Regular price $99.00 Sale price $79.00', 79.0, 99.0),
+    ('Sale price $79 Regular price $99', 79.0, 99.0),
+    ('Was $99 Now $79', 79.0, 99.0),
+    # Multi-buys give the price shown, not the count
+    ('2 for $10', 10.0, None),
+    ('3/$25', 25.0, None),
+    # Savings are not prices; the price before the saving is the compare-at
+    ('Save $20 $79.99', 79.99, 99.99),
+    ('You save: $20.00 Sale price $79.99 Regular price $99.99', 79.99, 99.99),
+    ('You save 20% $79.99', 79.99, None),
+    ('Sale 20% off $79.99', 79.99, None),
+])
+def test_labelled_prices(text, amount, compare_at):
+    parsed = parse_price(text)
+    assert parsed.amount == amount
+    assert parsed.compare_at == compare_at
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('$19.99', ParsedPrice(19.99, 'USD')),
+    ('From $19.99', ParsedPrice(19.99, 'USD', is_range=True)),
+    ('$10.00 - $25.00', ParsedPrice(10.0, 'USD', is_range=True)),
+    ('1.234,50 €', ParsedPrice(1234.5, 'EUR')),
+    ('Sold out', ParsedPrice(None, None, out_of_stock=True)),
+    ('', ParsedPrice(None, None)),
+])
+def test_plain_prices(text, expected):
+    assert parse_price(text) == expected
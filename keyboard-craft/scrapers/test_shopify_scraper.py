@@ -0,0 +1,34 @@
+"""
+Tests for mapping and routing products.json entries: python -m pytest test_shopify_scraper.py
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kbdfans_scraper import KBDfansScraper
+from novelkeys_scraper import NovelKeysScraper
+
+# Only product_type says what this is; the title and handle don't
+CERAKEY = {
+    'title': 'Cerakey V2 Set',
+    'handle': 'cerakey-v2-set',
+    'product_type': 'Keycaps',
+    'tags': [],
+    'variants': [{'price': '120.00', 'available': True}],
+}
+
+
+@pytest.mark.parametrize('scraper_class', [KBDfansScraper, NovelKeysScraper])
+def test_product_type_category_survives_routing(scraper_class):
+    scraper = scraper_class()
+    product = scraper._map_shopify_product(CERAKEY, 'case')
+    assert product['category'] == 'keycaps'
+    # Listed on a shared collection, the product still goes where its product_type says
+    assert scraper.route_product(product, ['case', 'keycaps'], ['case', 'keycaps']) == 'keycaps'
+    # and isn't filed under another category when keycaps weren't asked for
+    assert scraper.route_product(product, ['case'], ['case']) is None
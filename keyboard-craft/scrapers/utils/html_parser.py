@@ -0,0 +1,259 @@
+"""
+Pluggable HTML parser backends for the scrapers.
+
+Extractors talk to a small node API (select / select_one / text / attr /
+find_text / html) so the same selector strategies run on any backend:
+
+    bs4         BeautifulSoup + lxml (default). With a scope, one strained
+                pass only materializes elements whose class matches it, plus
+                the links whose href matches the pager pattern.
+    lxml        lxml.html with compiled cssselect selectors (needs cssselect)
+    selectolax  selectolax's Lexbor parser (needs selectolax)
+
+lxml and selectolax build the whole tree in C, which is already cheaper than
+a scoped BeautifulSoup parse, so they ignore the scope.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+BACKENDS = ('bs4', 'lxml', 'selectolax')
+
+
+class Node:
+    """A parsed element, wrapping the backend's native node"""
+
+    def select(self, css: str) -> List['Node']:
+        raise NotImplementedError
+
+    def select_one(self, css: str) -> Optional['Node']:
+        found = self.select(css)
+        return found[0] if found else None
+
+    def text(self, separator: str = '') -> str:
+        """Stripped text pieces joined by `separator`, like get_text(strip=True)"""
+        raise NotImplementedError
+
+    def attr(self, name: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def find_text(self, pattern) -> Optional[str]:
+        """First text piece matching the regex `pattern`"""
+        raise NotImplementedError
+
+    def html(self) -> str:
+        raise NotImplementedError
+
+
+class Document(Node):
+    # True when only part of the page was materialized
+    scoped = False
+
+    def title(self) -> Optional[str]:
+        title = self.select_one('title')
+        return title.text() if title else None
+
+    def has_body(self) -> bool:
+        return self.select_one('body') is not None
+
+
+# --- BeautifulSoup -------------------------------------------------------
+
+class SoupNode(Node):
+    def __init__(self, tag):
+        self.tag = tag
+
+    def select(self, css):
+        return [SoupNode(tag) for tag in self.tag.select(css)]
+
+    def select_one(self, css):
+        tag = self.tag.select_one(css)
+        return SoupNode(tag) if tag is not None else None
+
+    def text(self, separator=''):
+        return self.tag.get_text(separator, strip=True)
+
+    def attr(self, name):
+        value = self.tag.get(name)
+        # bs4 returns multi-valued attributes such as class as lists
+        return ' '.join(value) if isinstance(value, list) else value
+
+    def find_text(self, pattern):
+        found = self.tag.find(string=pattern)
+        return str(found).strip() if found else None
+
+    def html(self):
+        return str(self.tag)
+
+
+class SoupDocument(SoupNode, Document):
+    def __init__(self, soup, scoped: bool = False):
+        super().__init__(soup)
+        self.scoped = scoped
+
+    def title(self):
+        return self.tag.title.string if self.tag.title else None
+
+    def has_body(self):
+        return self.tag.find('body') is not None
+
+
+@lru_cache(maxsize=32)
+def _scope_strainer(scope: str, links: Optional[str]):
+    from bs4 import SoupStrainer
+
+    class ScopeStrainer(SoupStrainer):
+        """Keeps top-level elements whose class matches `scope` or whose href matches `links`"""
+
+        # SoupStrainer's own keyword rules are ANDed; pager links usually live
+        # outside the product grid, so either attribute has to do, in one pass
+
+        def __init__(self):
+            super().__init__()
+            self.scope = re.compile(scope)
+            self.links = re.compile(links) if links else None
+
+        @property
+        def includes_everything(self):
+            return False
+
+        def keep(self, attrs) -> bool:
+            if not attrs:
+                return False
+            classes = attrs.get('class')
+            if classes and self.scope.search(classes if isinstance(classes, str) else ' '.join(classes)):
+                return True
+            href = attrs.get('href')
+            return bool(self.links and href and self.links.search(href))
+
+        def allow_tag_creation(self, nsprefix, name, attrs):  # bs4 >= 4.13
+            return self.keep(attrs)
+
+        def search_tag(self, markup_name=None, markup_attrs={}):  # bs4 < 4.13
+            return markup_name if self.keep(markup_attrs) else None
+
+    return ScopeStrainer()
+
+
+class Bs4Backend:
+    name = 'bs4'
+
+    def parse(self, content: bytes, scope: str = None, links: str = None) -> Document:
+        from bs4 import BeautifulSoup
+
+        if not scope:
+            return SoupDocument(BeautifulSoup(content, 'lxml'))
+        return SoupDocument(BeautifulSoup(content, 'lxml', parse_only=_scope_strainer(scope, links)), scoped=True)
+
+
+# --- lxml ----------------------------------------------------------------
+
+@lru_cache(maxsize=256)
+def _css_selector(css: str):
+    from lxml.cssselect import CSSSelector
+    return CSSSelector(css)
+
+
+class LxmlNode(Node):
+    def __init__(self, element):
+        self.element = element
+
+    def select(self, css):
+        return [LxmlNode(element) for element in _css_selector(css)(self.element)]
+
+    def text(self, separator=''):
+        return separator.join(piece.strip() for piece in self.element.itertext() if piece.strip())
+
+    def attr(self, name):
+        return self.element.get(name)
+
+    def find_text(self, pattern):
+        for piece in self.element.itertext():
+            if pattern.search(piece):
+                return piece.strip()
+        return None
+
+    def html(self):
+        from lxml import html
+        return html.tostring(self.element, encoding='unicode')
+
+
+class LxmlDocument(LxmlNode, Document):
+    pass
+
+
+class LxmlBackend:
+    name = 'lxml'
+
+    def __init__(self):
+        # Fail early with a clear message instead of on the first select
+        import lxml.cssselect  # noqa: F401 - requires the cssselect package
+
+    def parse(self, content: bytes, scope: str = None, links: str = None) -> Document:
+        from lxml import html
+        return LxmlDocument(html.document_fromstring(content))
+
+
+# --- selectolax ----------------------------------------------------------
+
+class LexborNode(Node):
+    def __init__(self, node):
+        self.node = node
+
+    def select(self, css):
+        return [LexborNode(node) for node in self.node.css(css)]
+
+    def select_one(self, css):
+        node = self.node.css_first(css)
+        return LexborNode(node) if node is not None else None
+
+    def text(self, separator=''):
+        return self.node.text(deep=True, separator=separator, strip=True)
+
+    def attr(self, name):
+        return self.node.attributes.get(name)
+
+    def find_text(self, pattern):
+        for node in self.node.traverse(include_text=True):
+            if node.tag == '-text' and pattern.search(node.text_content or ''):
+                return node.text_content.strip()
+        return None
+
+    def html(self):
+        return self.node.html
+
+
+class LexborDocument(LexborNode, Document):
+    def __init__(self, tree):
+        super().__init__(tree.root)
+        self.tree = tree
+
+    def has_body(self):
+        return self.tree.body is not None
+
+
+class SelectolaxBackend:
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self.parser_class = LexborHTMLParser
+
+    def parse(self, content: bytes, scope: str = None, links: str = None) -> Document:
+        return LexborDocument(self.parser_class(content))
+
+
+def get_backend(name: str = 'bs4'):
+    """Create a parser backend by name"""
+    if name == 'bs4':
+        return Bs4Backend()
+    try:
+        if name == 'lxml':
+            return LxmlBackend()
+        if name == 'selectolax':
+            return SelectolaxBackend()
+    except ImportError as e:
+        package = 'cssselect' if name == 'lxml' else 'selectolax'
+        raise ImportError(f"The '{name}' parser backend needs {package}: pip install {package}") from e
+    raise ValueError(f"Unknown parser backend '{name}'. Available: {', '.join(BACKENDS)}")
@@ -0,0 +1,87 @@
+"""
+On-disk conditional-GET cache for collection pages.
+
+For every URL we keep the ETag / Last-Modified validators the server sent,
+together with what was extracted from that response (products and the next
+page link). The next run sends If-None-Match / If-Modified-Since, and on a
+304 the stored result is reused without downloading or parsing the page again.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, Optional
+
+
+def default_cache_dir() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, 'data', 'http_cache')
+
+
+class HttpCache:
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _load(self, url: str) -> Optional[Dict]:
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get('url') == url else None
+
+    def lookup(self, url: str, key: str, version: int = 0) -> Optional[Dict]:
+        """Return the cached entry for `url` if it holds a result for `key`"""
+        entry = self._load(url)
+        if not entry or entry.get('version') != version:
+            return None
+        if key not in entry.get('results', {}):
+            return None
+        if not entry.get('etag') and not entry.get('last_modified'):
+            return None
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, key: str, response_headers, result, version: int = 0):
+        """Remember the validators of a 200 response and what was parsed from it"""
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        entry = self._load(url)
+        if (not entry or entry.get('version') != version or
+                entry.get('etag') != etag or entry.get('last_modified') != last_modified):
+            # The page changed, so results parsed for other keys are stale
+            entry = {'url': url, 'version': version, 'results': {}}
+
+        entry['etag'] = etag
+        entry['last_modified'] = last_modified
+        entry['stored_at'] = datetime.now().isoformat()
+        entry['results'][key] = result
+
+        # Write atomically so concurrent scrapers never read a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(url))
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,180 @@
+"""
+Compiled keyword tables for product classification.
+
+Every keyword list the scrapers check (categories, titles to skip, stock
+phrases) is compiled once into a single matcher. One scan over a text returns
+every table it hits, instead of one `word in text` scan per keyword.
+
+Keywords match as plain substrings, exactly like the `in` checks they
+replace, overlaps included (e.g. 'cherry' inside 'cherry profile'). With
+pyahocorasick installed the scan is an Aho-Corasick automaton. Otherwise it
+is a regex lookahead tried at every position, with the keywords factored into
+a trie: the longest keyword starting at a position wins, and it reports the
+labels of every keyword that is a prefix of it as well.
+"""
+
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # optional, falls back to the regex scan
+    ahocorasick = None
+
+# Checked in this order, the first category hit wins
+CATEGORY_KEYWORDS = {
+    'switches': ['switch', 'switches', 'mx', 'gateron', 'cherry', 'kailh', 'linear', 'tactile', 'clicky', 'holy panda'],
+    'keycaps': ['keycap', 'keycaps', 'pbt', 'abs', 'gmk', 'cherry profile', 'sa profile', 'oem profile', 'xda', 'dsa'],
+    'case': ['case', 'housing', 'aluminum', 'tofu', 'frame', 'chassis', 'keyboard kit', 'plate'],
+    'pcb': ['pcb', 'circuit', 'board', 'hotswap', 'hot-swap', 'soldered'],
+    'stabilizers': ['stabilizer', 'stabilizers', 'stab', 'stabs', 'durock', 'cherry stab'],
+}
+
+# Obvious non-products
+SKIP_KEYWORDS = [
+    'gift card', 'shipping', 'tax', 'warranty', 'service',
+    'insurance', 'assembly', 'repair', 'consultation',
+    'subscription', 'membership', 'tutorial', 'course'
+]
+
+# Not keyboard components, unless the title also says keyboard (e.g. a keyboard cable)
+NON_COMPONENT_KEYWORDS = [
+    'mouse', 'mousepad', 'monitor', 'headset', 'speaker',
+    'webcam', 'microphone', 'chair', 'desk', 'cable'
+]
+
+# Stock labels next to a product
+SOLD_OUT_KEYWORDS = ['out of stock', 'sold out', 'unavailable']
+
+# Price texts that mean there is no price to buy at right now
+PRICE_UNAVAILABLE_KEYWORDS = [
+    'out of stock', 'sold out', 'unavailable', 'not available',
+    'discontinued', 'pre-order', 'coming soon', 'notify me',
+    'email when available', 'back in stock', 'temporarily unavailable'
+]
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Regex source matching the longest of `keywords` at a position, factored as a trie"""
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Greedy, so a longer keyword is preferred over one ending here
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Match many labelled keyword lists against a text in one regex scan"""
+
+    def __init__(self, tables: Dict[str, Iterable[str]]):
+        labels_by_keyword: Dict[str, set] = {}
+        for label, keywords in tables.items():
+            for keyword in keywords:
+                labels_by_keyword.setdefault(keyword.lower(), set()).add(label)
+
+        # A match also implies every keyword that is a prefix of it
+        self.labels_by_keyword: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset().union(*(labels for other, labels in labels_by_keyword.items()
+                                         if keyword.startswith(other)))
+            for keyword in labels_by_keyword
+        }
+
+        self.automaton = None
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for keyword, labels in self.labels_by_keyword.items():
+                self.automaton.add_word(keyword, labels)
+            self.automaton.make_automaton()
+        else:
+            self.pattern = re.compile(f"(?=({_trie_pattern(self.labels_by_keyword)}))")
+
+        # Products are classified more than once (extraction, routing, validation)
+        self.labels = lru_cache(maxsize=8192)(self._labels)
+
+    def _matches(self, text: str) -> Iterator[Tuple[int, FrozenSet[str]]]:
+        """(position, labels) of every keyword occurrence in a lowercased text"""
+        if self.automaton is not None:
+            yield from self.automaton.iter(text)
+        else:
+            for match in self.pattern.finditer(text):
+                yield match.start(), self.labels_by_keyword[match.group(1)]
+
+    def _labels(self, text: str) -> FrozenSet[str]:
+        """Every label with at least one keyword in `text`"""
+        found = set()
+        for _, labels in self._matches(text.lower()):
+            found |= labels
+        return frozenset(found)
+
+    def labels_many(self, texts: List[str]) -> List[FrozenSet[str]]:
+        """`labels` for a batch of texts, in one scan over all of them"""
+        # Keywords never contain a newline, so no match can span two texts
+        starts, offset = [], 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+
+        found = [set() for _ in texts]
+        for position, labels in self._matches('\n'.join(texts).lower()):
+            found[bisect_right(starts, position) - 1] |= labels
+        return [frozenset(labels) for labels in found]
+
+
+matcher = KeywordMatcher({
+    **CATEGORY_KEYWORDS,
+    'skip': SKIP_KEYWORDS,
+    'non_component': NON_COMPONENT_KEYWORDS,
+    'keyboard': ['keyboard'],
+    'sold_out': SOLD_OUT_KEYWORDS,
+    'price_unavailable': PRICE_UNAVAILABLE_KEYWORDS,
+})
+
+
+def category_from_labels(labels: FrozenSet[str]) -> str:
+    for category in CATEGORY_KEYWORDS:
+        if category in labels:
+            return category
+    return 'unknown'
+
+
+def title_is_skipped(labels: FrozenSet[str]) -> bool:
+    """Whether a title's labels mark it as something other than a keyboard component"""
+    return 'skip' in labels or ('non_component' in labels and 'keyboard' not in labels)
+
+
+def categorize(text: str) -> str:
+    return category_from_labels(matcher.labels(text))
+
+
+def is_sold_out(text: Optional[str]) -> bool:
+    return bool(text) and 'sold_out' in matcher.labels(text)
+
+
+def is_price_unavailable(text: Optional[str]) -> bool:
+    return bool(text) and 'price_unavailable' in matcher.labels(text)
+
+
+def classify_titles(titles: List[str]) -> List[Dict]:
+    """Classify a batch of product titles in a single scan.
+
+    Returns one dict per title with its category, whether it should be skipped
+    and whether it mentions being sold out.
+    """
+    return [{
+        'category': category_from_labels(labels),
+        'skip': title_is_skipped(labels),
+        'sold_out': 'sold_out' in labels,
+    } for labels in matcher.labels_many(titles)]
@@ -0,0 +1,49 @@
+"""
+Logging setup for the scrapers.
+
+Modules log through `logging.getLogger(__name__)` and main.py configures the
+output once with setup_logging(). Text output keeps the familiar one-line
+messages; JSON output writes one object per record, including any fields
+passed with `extra=` (retailer, category, counts...), for the log shipper.
+"""
+
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+LOG_FORMATS = ('text', 'json')
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: int = logging.INFO, log_format: str = 'text'):
+    """Send every scraper log record to stdout at `level` and above"""
+    handler = logging.StreamHandler(sys.stdout)
+    if log_format == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(message)s'))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+    # Keep third-party chatter out of debug runs
+    for name in ('urllib3', 'charset_normalizer', 'fake_useragent'):
+        logging.getLogger(name).setLevel(max(level, logging.WARNING))
@@ -0,0 +1,190 @@
+"""
+Run metrics for the scrapers: counters and timers, labelled by retailer,
+category, strategy...
+
+Everything records into the shared `metrics` registry (thread-safe, so the
+per-retailer workers can share it). At the end of a run the registry is
+written as a Prometheus textfile (for node_exporter's textfile collector) and
+as a JSON summary:
+
+    data/metrics/keyboardcraft.prom
+    data/metrics/run-<started>.json
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Tuple
+
+PREFIX = 'keyboardcraft'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def default_metrics_dir() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, 'data', 'metrics')
+
+
+def _labels(labels: Dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _series(name: str, labels: Labels) -> str:
+    if not labels:
+        return name
+    pairs = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return f"{name}{{{pairs}}}"
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters: Dict[Tuple[str, Labels], float] = {}
+            # name, labels -> [count, total seconds, max seconds]
+            self.timers: Dict[Tuple[str, Labels], list] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            timer = self.timers.setdefault(key, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time the body of a with-block into `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def total(self, name: str, **labels) -> float:
+        """Sum of a counter over every series matching `labels`"""
+        wanted = set(_labels(labels))
+        with self.lock:
+            return sum(value for (n, l), value in self.counters.items() if n == name and wanted <= set(l))
+
+    def seconds(self, name: str, **labels) -> float:
+        """Total time recorded by a timer over every series matching `labels`"""
+        wanted = set(_labels(labels))
+        with self.lock:
+            return sum(t[1] for (n, l), t in self.timers.items() if n == name and wanted <= set(l))
+
+    def retailers(self):
+        with self.lock:
+            keys = list(self.counters) + list(self.timers)
+        return sorted({value for _, labels in keys for key, value in labels if key == 'retailer'})
+
+    def retailer_summary(self, retailer: str) -> Dict:
+        """Headline numbers for one retailer"""
+        products = self.total('products_scraped', retailer=retailer)
+        seconds = self.seconds('scrape', retailer=retailer)
+        return {
+            'products': int(products),
+            'scrape_seconds': round(seconds, 3),
+            'products_per_second': round(products / seconds, 2) if seconds else 0.0,
+            'requests': int(self.total('responses', retailer=retailer)),
+            'bytes_downloaded': int(self.total('bytes_downloaded', retailer=retailer)),
+            'retries': int(self.total('fetch_retries', retailer=retailer)),
+            'fetch_seconds': round(self.seconds('fetch', retailer=retailer), 3),
+            'parse_seconds': round(self.seconds('parse', retailer=retailer), 3),
+            'extract_seconds': round(self.seconds('extract', retailer=retailer), 3),
+        }
+
+    def summary(self) -> Dict:
+        """Everything recorded so far, plus per-retailer throughput"""
+        elapsed = time.time() - self.started
+        with self.lock:
+            counters = {_series(name, labels): value for (name, labels), value in sorted(self.counters.items())}
+            timers = {_series(name, labels): {'count': t[0], 'seconds': round(t[1], 6), 'max_seconds': round(t[2], 6)}
+                      for (name, labels), t in sorted(self.timers.items())}
+
+        products = self.total('products_scraped')
+        return {
+            'started_at': datetime.fromtimestamp(self.started).isoformat(),
+            'elapsed_seconds': round(elapsed, 3),
+            'products': int(products),
+            'products_per_second': round(products / elapsed, 2) if elapsed else 0.0,
+            'retailers': {retailer: self.retailer_summary(retailer) for retailer in self.retailers()},
+            'counters': counters,
+            'timers': timers,
+        }
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            timers = sorted(self.timers.items())
+
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{PREFIX}_{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{_series(metric, labels)} {value:g}")
+
+        for (name, labels), (count, total, _) in timers:
+            metric = f"{PREFIX}_{name}_seconds"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{_series(metric + '_sum', labels)} {total:.6f}")
+            lines.append(f"{_series(metric + '_count', labels)} {count}")
+
+        # Slowest single call, as its own family since a summary can't carry it
+        for (name, labels), (_, _, longest) in timers:
+            metric = f"{PREFIX}_{name}_max_seconds"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{_series(metric, labels)} {longest:.6f}")
+
+        elapsed = time.time() - self.started
+        lines.append(f"# TYPE {PREFIX}_run_duration_seconds gauge")
+        lines.append(f"{PREFIX}_run_duration_seconds {elapsed:.3f}")
+        lines.append(f"# TYPE {PREFIX}_run_finished_timestamp_seconds gauge")
+        lines.append(f"{PREFIX}_run_finished_timestamp_seconds {time.time():.0f}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, metrics_dir: str = None) -> Tuple[str, str]:
+        """Write the Prometheus textfile and the JSON run summary, return both paths"""
+        metrics_dir = metrics_dir or default_metrics_dir()
+        os.makedirs(metrics_dir, exist_ok=True)
+
+        prom_path = os.path.join(metrics_dir, f"{PREFIX}.prom")
+        json_path = os.path.join(metrics_dir, f"run-{datetime.fromtimestamp(self.started):%Y%m%d_%H%M%S}.json")
+
+        # The textfile collector may read at any moment, so never leave a partial file
+        for path, content in ((prom_path, self.to_prometheus()),
+                              (json_path, json.dumps(self.summary(), indent=2))):
+            fd, tmp_path = tempfile.mkstemp(dir=metrics_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return prom_path, json_path
+
+
+# Shared by every scraper and the database manager
+metrics = Metrics()
@@ -0,0 +1,145 @@
+"""
+Price parsing for scraped price texts.
+
+parse_price() turns texts like "$19.99", "From $19.99", "$10.00 - $25.00",
+"Sale price $79 Regular price $99", "1.234,50 €" or "Sold out" into a
+ParsedPrice instead of a bare float, so "no price" is never confused with
+"free". Patterns are compiled once and results are memoized, since the same
+strings ("From $19.99", "Sold out") come back on every page.
+
+Numbers that aren't prices are left out: percentages ("20% off"), the count
+of a multi-buy ("2 for $10" is 10.0, the price shown, not a unit price) and
+the amount after "save" ("Save $20 $79.99" is 79.99, with compare_at 99.99).
+A compare-at label with no other price next to it is the price itself:
+Shopify themes show "Regular price $99.00" on every item that isn't on sale.
+"""
+
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional
+
+from utils.keywords import is_price_unavailable
+
+MIN_PRICE = 0.01
+MAX_PRICE = 10000.0
+
+# Longest markers first so "CA$" wins over "$"
+CURRENCY_MARKERS = {
+    'ca$': 'CAD', 'c$': 'CAD', 'au$': 'AUD', 'a$': 'AUD', 'us$': 'USD',
+    'usd': 'USD', 'cad': 'CAD', 'aud': 'AUD', 'eur': 'EUR', 'gbp': 'GBP', 'jpy': 'JPY',
+    '$': 'USD', '€': 'EUR', '£': 'GBP', '¥': 'JPY',
+}
+CURRENCY_PATTERN = re.compile('|'.join(re.escape(m) for m in sorted(CURRENCY_MARKERS, key=len, reverse=True)))
+
+# Most price texts are just an amount with an optional currency; they skip the full parse
+SIMPLE_PATTERN = re.compile(r'(\$|€|£|usd)?\s*(\d{1,5}(?:\.\d{1,2})?)\s*(usd|eur|gbp)?')
+# 1,234.56 / 1.234,56 / 19.99 / 19; separators are sorted out by _to_float
+NUMBER_PATTERN = re.compile(r'\d[\d.,]*\d|\d')
+RANGE_PATTERN = re.compile(r'\d\s*(?:-|–|—|to)\s*\D{0,4}\d')
+FROM_PATTERN = re.compile(r'\bfrom\b')
+# Labels that mark the struck-through price next to a sale price
+COMPARE_AT_PATTERN = re.compile(r'regular\s*price|compare\s*at|original\s*price|was\b|msrp|retail')
+PERCENT_PATTERN = re.compile(r'\d[\d.,]*\s*%')
+# The count in "2 for $10" / "3/$25"
+MULTI_BUY_PATTERN = re.compile(r'\b\d+\s*(?:for\b|/)(?=\D{0,5}\d)')
+# "Save $20", "You save 20.00"
+SAVING_PATTERN = re.compile(r'\bsave\b\s*(?:[^\w\s]\s*){0,3}(\d[\d.,]*\d|\d)(?![\d.,]*\s*%)')
+
+
+class ParsedPrice(NamedTuple):
+    amount: Optional[float]          # None when no usable price was found
+    currency: Optional[str] = None   # ISO code when the text names one
+    is_range: bool = False           # "From $X" or "$X - $Y"; amount is the lowest
+    out_of_stock: bool = False
+    compare_at: Optional[float] = None  # regular price when the text shows a sale
+
+    @property
+    def ok(self) -> bool:
+        return self.amount is not None
+
+
+def _to_float(number: str) -> Optional[float]:
+    """Parse a number token, working out which separator is the decimal one"""
+    last_dot, last_comma = number.rfind('.'), number.rfind(',')
+
+    if last_dot >= 0 and last_comma >= 0:
+        decimal = '.' if last_dot > last_comma else ','
+    elif last_comma >= 0:
+        # "1,234" groups thousands, "12,50" has decimals
+        decimal = ',' if len(number) - last_comma - 1 != 3 else None
+    elif number.count('.') > 1:
+        decimal = None
+    else:
+        decimal = '.'
+
+    thousands = {'.': ',', ',': '.', None: None}[decimal]
+    if thousands:
+        number = number.replace(thousands, '')
+    if decimal == ',':
+        number = number.replace(',', '.')
+    elif decimal is None:
+        number = number.replace('.', '').replace(',', '')
+
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def parse_price(text: Optional[str]) -> ParsedPrice:
+    """Parse a price text into a ParsedPrice"""
+    if not text:
+        return ParsedPrice(None)
+
+    lowered = ' '.join(text.lower().split())
+    simple = SIMPLE_PATTERN.fullmatch(lowered)
+    if simple:
+        amount = float(simple.group(2))
+        marker = simple.group(1) or simple.group(3)
+        currency = CURRENCY_MARKERS[marker] if marker else None
+        return ParsedPrice(amount if MIN_PRICE <= amount <= MAX_PRICE else None, currency)
+
+    if is_price_unavailable(lowered):
+        return ParsedPrice(None, out_of_stock=True)
+
+    currency_match = CURRENCY_PATTERN.search(lowered)
+    currency = CURRENCY_MARKERS[currency_match.group()] if currency_match else None
+
+    saved = None
+    saving = SAVING_PATTERN.search(lowered)
+    if saving:
+        saved = _to_float(saving.group(1))
+        lowered = lowered[:saving.start(1)] + lowered[saving.end(1):]
+    lowered = MULTI_BUY_PATTERN.sub(' ', PERCENT_PATTERN.sub(' ', lowered))
+
+    compare_at = None
+    compare_label = COMPARE_AT_PATTERN.search(lowered)
+    if compare_label:
+        # The first number after the label is the regular price, the rest are sale prices
+        after = NUMBER_PATTERN.search(lowered, compare_label.end())
+        if after:
+            compare_at = _to_float(after.group())
+            lowered = lowered[:after.start()] + lowered[after.end():]
+
+    amounts = [amount for amount in map(_to_float, NUMBER_PATTERN.findall(lowered))
+               if amount is not None and MIN_PRICE <= amount <= MAX_PRICE]
+    if not amounts:
+        if compare_at is not None and MIN_PRICE <= compare_at <= MAX_PRICE:
+            # Only the labelled price: "Regular price $99.00" on an item that isn't on sale
+            return ParsedPrice(compare_at, currency)
+        return ParsedPrice(None, currency)
+
+    is_range = bool(FROM_PATTERN.search(lowered) or RANGE_PATTERN.search(lowered))
+    amount = min(amounts) if is_range else amounts[0]
+    if compare_at is None and saved and not is_range:
+        compare_at = round(amount + saved, 2)
+    if compare_at is not None and compare_at <= amount:
+        compare_at = None
+
+    return ParsedPrice(amount, currency, is_range, False, compare_at)
+
+
+def parse_prices(texts: List[Optional[str]]) -> List[ParsedPrice]:
+    """Parse a batch of price texts; repeated strings are only parsed once"""
+    return [parse_price(text) for text in texts]
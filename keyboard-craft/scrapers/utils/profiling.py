@@ -0,0 +1,179 @@
+"""
+Profiling mode for main.py and clean_data.py (--profile).
+
+A Profiler captures, for the duration of a run:
+
+- a cProfile CPU profile of the main thread and of every thread started
+  while it runs (worker threads, asyncio.to_thread), merged into one
+- a py-spy sampling profile of the whole process, when py-spy is installed
+- tracemalloc memory statistics: the peak, and a snapshot taken at the
+  highest checkpoint() seen (the scrape saves call it after every batch)
+
+Everything goes to a run directory, data/profiles/<name>-<started>/:
+
+    cpu.prof                  pstats dump (snakeviz, pstats, gprof2dot...)
+    summary.txt               top-N hotspots by own and cumulative time,
+                              and the top-N allocation sites
+    py-spy.speedscope.json    the sampling profile, if py-spy ran
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import tracemalloc
+from datetime import datetime
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# The Profiler currently running, for checkpoint()
+_active = None
+
+
+def default_profile_dir() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, 'data', 'profiles')
+
+
+def checkpoint():
+    """Let the running profiler consider a memory snapshot here; free when not profiling"""
+    if _active:
+        _active.checkpoint()
+
+
+class Profiler:
+    # Stack depth kept per allocation; deeper is more useful and slower
+    memory_frames = 10
+    # Samples per second for py-spy
+    sampling_rate = 100
+
+    def __init__(self, name: str, top: int = 25, profile_dir: str = None):
+        self.name = name
+        self.top = top
+        self.started = datetime.now()
+        self.run_dir = os.path.join(profile_dir or default_profile_dir(),
+                                    f"{name}-{self.started:%Y%m%d_%H%M%S}")
+        self.cpu = cProfile.Profile()
+        self.thread_profiles: List[cProfile.Profile] = []
+        self.sampler: Optional[subprocess.Popen] = None
+        self.snapshot = None
+        self.snapshot_size = 0
+        self.snapshot_lock = threading.Lock()
+
+    def _profile_thread(self, frame, event, arg):
+        # Installed by threading.setprofile, runs once at the start of each new thread
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from the main profiler already
+            return
+        self.thread_profiles.append(profile)
+
+    def _start_sampler(self):
+        py_spy = shutil.which('py-spy')
+        if not py_spy:
+            logger.info("⏱️ py-spy not installed, CPU profile is cProfile only")
+            return
+        output = os.path.join(self.run_dir, 'py-spy.speedscope.json')
+        try:
+            self.sampler = subprocess.Popen(
+                [py_spy, 'record', '--pid', str(os.getpid()), '--rate', str(self.sampling_rate),
+                 '--format', 'speedscope', '--output', output, '--threads', '--nonblocking'],
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            logger.warning("⚠️ Could not start py-spy: %s", e)
+
+    def _stop_sampler(self):
+        if not self.sampler:
+            return
+        # py-spy writes its output when interrupted
+        self.sampler.send_signal(signal.SIGINT)
+        try:
+            _, errors = self.sampler.communicate(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.sampler.kill()
+            _, errors = self.sampler.communicate()
+        if self.sampler.returncode not in (0, -signal.SIGINT):
+            # Usually missing ptrace permission (try sudo, or --cap-add SYS_PTRACE in Docker)
+            logger.warning("⚠️ py-spy failed: %s", errors.decode(errors='replace').strip()[-500:])
+
+    def start(self):
+        global _active
+        os.makedirs(self.run_dir, exist_ok=True)
+        self._start_sampler()
+        tracemalloc.start(self.memory_frames)
+        threading.setprofile(self._profile_thread)
+        self.cpu.enable()
+        _active = self
+        logger.info("⏱️ Profiling %s into %s", self.name, self.run_dir)
+        return self
+
+    def checkpoint(self):
+        """Keep a memory snapshot if this is the most memory the run has used so far"""
+        with self.snapshot_lock:
+            current, _ = tracemalloc.get_traced_memory()
+            # Snapshots are expensive, only retake one for a clearly higher peak
+            if current > self.snapshot_size * 1.1:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.snapshot_size = current
+
+    def stop(self) -> str:
+        """Stop profiling, write the results and return the run directory"""
+        global _active
+        self.cpu.disable()
+        threading.setprofile(None)
+        _active = None
+        self.checkpoint()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self._stop_sampler()
+
+        stats = pstats.Stats(self.cpu)
+        for profile in self.thread_profiles:
+            stats.add(profile)
+        stats.dump_stats(os.path.join(self.run_dir, 'cpu.prof'))
+
+        summary = self._summary(stats, peak)
+        with open(os.path.join(self.run_dir, 'summary.txt'), 'w', encoding='utf-8') as f:
+            f.write(summary)
+
+        logger.info("⏱️ Peak traced memory: %.1f MB", peak / 1e6, extra={'peak_memory_bytes': peak})
+        logger.info("⏱️ Profile written to %s (%d threads)", self.run_dir, 1 + len(self.thread_profiles))
+        logger.debug(summary)
+        return self.run_dir
+
+    def _summary(self, stats: pstats.Stats, peak: int) -> str:
+        out = io.StringIO()
+        out.write(f"Profile of {self.name} started {self.started.isoformat()}\n")
+        out.write(f"Threads profiled: {1 + len(self.thread_profiles)}\n\n")
+
+        for sort, title in (('tottime', 'own time'), ('cumulative', 'cumulative time')):
+            out.write(f"=== Top {self.top} functions by {title} ===\n")
+            stats.stream = out
+            stats.sort_stats(sort).print_stats(self.top)
+
+        out.write(f"=== Memory: peak {peak / 1e6:.1f} MB traced, "
+                  f"snapshot at {self.snapshot_size / 1e6:.1f} MB ===\n")
+        if self.snapshot:
+            snapshot = self.snapshot.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            ])
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                out.write(f"{stat}\n")
+        return out.getvalue()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
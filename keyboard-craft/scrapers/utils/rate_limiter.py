@@ -0,0 +1,145 @@
+"""
+Per-host rate limiting for the scrapers.
+
+Each host gets a token bucket (rate = requests per second, burst = how many
+requests may go out back to back). When a host answers 429/503 the bucket is
+paused for the Retry-After period (or an exponential backoff when the header
+is missing) and its rate is halved; successful responses slowly bring the
+rate back up to the configured ceiling.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds"""
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float):
+        """Hold every request to this host for at least `seconds`"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = min(self.tokens, 0.0)
+
+    def throttled(self, min_rate: float):
+        with self.lock:
+            self.failures += 1
+            self.rate = max(min_rate, self.rate / 2)
+
+    def succeeded(self, recovery: float):
+        with self.lock:
+            self.failures = 0
+            self.rate = min(self.max_rate, self.rate + recovery)
+
+
+class RateLimiter:
+    def __init__(self, rate: float = 1.0, burst: int = 2, min_rate: float = 0.05,
+                 base_backoff: float = 2.0, max_backoff: float = 300.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.host_limits: Dict[str, tuple] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def configure(self, rate: float = None, burst: int = None, host: str = None):
+        """Change the default limits, or the limits of a single host"""
+        with self.lock:
+            if host:
+                current = self.host_limits.get(host, (self.rate, self.burst))
+                self.host_limits[host] = (rate or current[0], burst or current[1])
+                self.buckets.pop(host, None)
+            else:
+                self.rate = rate or self.rate
+                self.burst = burst or self.burst
+                self.buckets = {h: b for h, b in self.buckets.items() if h in self.host_limits}
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self.lock:
+            if host not in self.buckets:
+                rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+                self.buckets[host] = TokenBucket(rate, burst)
+            return self.buckets[host]
+
+    def acquire(self, host: str) -> float:
+        """Block until a request to `host` is allowed, return the time waited"""
+        wait = self.bucket(host).reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def backoff(self, host: str, retry_after: Optional[float] = None) -> float:
+        """Register a throttled or failed request and pause the host accordingly"""
+        bucket = self.bucket(host)
+        bucket.throttled(self.min_rate)
+        if retry_after is None:
+            retry_after = self.base_backoff * (2 ** (bucket.failures - 1))
+        retry_after = min(retry_after, self.max_backoff)
+        bucket.pause(retry_after)
+        return retry_after
+
+    def record_response(self, host: str, status_code: int, headers=None) -> Optional[float]:
+        """Feed a response back into the limiter.
+
+        Returns the backoff in seconds if the host is throttling us, else None.
+        """
+        if status_code in THROTTLE_STATUSES:
+            retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+            return self.backoff(host, retry_after)
+
+        bucket = self.bucket(host)
+        bucket.succeeded(bucket.max_rate / 10)
+        return None
+
+
+# Shared by every scraper so that limits are per host, not per scraper instance
+shared_limiter = RateLimiter()
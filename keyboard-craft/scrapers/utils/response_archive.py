@@ -0,0 +1,133 @@
+"""
+Record/replay archive of raw HTTP responses.
+
+Bodies are stored once per content hash as gzip blobs, and every run gets an
+index (one JSON line per fetched URL with its timestamp, status, headers and
+blob hash). Replaying a run serves those bodies back to the scrapers, so the
+whole pipeline can be re-run offline after changing selectors or spec rules.
+
+    data/archive/blobs/ab/ab12...ef.gz
+    data/archive/runs/<run-id>.jsonl
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Only headers the scrapers may look at are worth keeping
+ARCHIVED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Link')
+
+
+def default_archive_dir() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, 'data', 'archive')
+
+
+class ArchivedResponse:
+    """The subset of requests.Response the scrapers use, backed by an archived body"""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = 'utf-8'
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} (archived) for url: {self.url}")
+
+
+class ResponseArchive:
+    def __init__(self, root: str = None, run_id: str = None, replay: bool = False):
+        self.root = root or default_archive_dir()
+        self.blob_dir = os.path.join(self.root, 'blobs')
+        self.run_dir = os.path.join(self.root, 'runs')
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.run_dir, exist_ok=True)
+
+        self.replaying = replay
+        self.lock = threading.Lock()
+        self.index: Dict[str, Dict] = {}
+
+        if replay:
+            self.run_id = self.resolve_run(run_id)
+            self._load_index()
+        else:
+            self.run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    def list_runs(self) -> List[str]:
+        return sorted(name[:-len('.jsonl')] for name in os.listdir(self.run_dir) if name.endswith('.jsonl'))
+
+    def resolve_run(self, run_id: Optional[str]) -> str:
+        runs = self.list_runs()
+        if not runs:
+            raise FileNotFoundError(f"No recorded runs in {self.run_dir}")
+        if run_id in (None, 'latest'):
+            return runs[-1]
+        if run_id not in runs:
+            raise FileNotFoundError(f"Run '{run_id}' not found. Available: {', '.join(runs)}")
+        return run_id
+
+    def _index_path(self) -> str:
+        return os.path.join(self.run_dir, f"{self.run_id}.jsonl")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], f"{digest}.gz")
+
+    def _load_index(self):
+        with open(self._index_path(), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    # The last response recorded for a URL wins
+                    self.index[record['url']] = record
+
+    def record(self, url: str, response):
+        """Store a response body (once per content hash) and index it for this run"""
+        content = response.content or b''
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self._blob_path(digest)
+
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, blob_path)
+
+        record = {
+            'url': url,
+            'fetched_at': datetime.now().isoformat(),
+            'status': response.status_code,
+            'headers': {k: response.headers[k] for k in ARCHIVED_HEADERS if k in response.headers},
+            'sha256': digest,
+            'size': len(content),
+        }
+        with self.lock:
+            with open(self._index_path(), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def response_for(self, url: str) -> Optional[ArchivedResponse]:
+        """Return the archived response for `url`, or None if this run never fetched it"""
+        record = self.index.get(url)
+        if not record:
+            return None
+
+        with gzip.open(self._blob_path(record['sha256']), 'rb') as f:
+            content = f.read()
+        return ArchivedResponse(url, record['status'], record['headers'], content)
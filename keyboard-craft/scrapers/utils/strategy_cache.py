@@ -0,0 +1,111 @@
+"""
+Persisted selector-strategy order per retailer and collection URL.
+
+The scrapers try a list of selector strategies until one yields products. The
+strategy that worked last for a URL is remembered on disk and tried first on
+the next page or run; one that keeps coming up empty is moved to the back.
+
+    data/selector_cache/<retailer>.json
+    {"/collections/switches": {"order": [".product-block", ...], "misses": {...}}}
+
+Strategies are identified by their container selector, so reordering or
+editing the strategy lists in code never mixes them up.
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, List
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+# Query parameters that only select a page of the same listing
+PAGE_PARAMS = ('page', 's')
+
+
+def default_cache_dir() -> str:
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, 'data', 'selector_cache')
+
+
+def url_key(url: str) -> str:
+    """Key a URL by its listing, so every page of a collection shares one entry"""
+    parsed = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query) if k not in PAGE_PARAMS]
+    return parsed.path + (f"?{urlencode(query)}" if query else '')
+
+
+class StrategyCache:
+    # Consecutive empty results before a strategy is moved to the back
+    demote_after = 2
+
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.entries: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def _path(self, retailer: str) -> str:
+        return os.path.join(self.cache_dir, re.sub(r'[^a-z0-9]+', '_', retailer.lower()) + '.json')
+
+    def _retailer(self, retailer: str) -> Dict:
+        if retailer not in self.entries:
+            try:
+                with open(self._path(retailer), 'r', encoding='utf-8') as f:
+                    self.entries[retailer] = json.load(f)
+            except (OSError, ValueError):
+                self.entries[retailer] = {}
+        return self.entries[retailer]
+
+    def order(self, retailer: str, url: str, strategies: List[Dict]) -> List[Dict]:
+        """Return `strategies` with the ones that worked for this URL first"""
+        with self.lock:
+            entry = self._retailer(retailer).get(url_key(url))
+        if not entry:
+            return list(strategies)
+
+        by_container = {strategy['container']: strategy for strategy in strategies}
+        ordered = [by_container[c] for c in entry['order'] if c in by_container]
+        return ordered + [strategy for strategy in strategies if strategy not in ordered]
+
+    def record(self, retailer: str, url: str, container: str, hit: bool):
+        """Promote a strategy that produced products, demote one that keeps missing"""
+        with self.lock:
+            entries = self._retailer(retailer)
+            entry = entries.setdefault(url_key(url), {'order': [], 'misses': {}})
+            order, misses = entry['order'], entry['misses']
+            changed = False
+
+            if hit:
+                if order[:1] != [container]:
+                    if container in order:
+                        order.remove(container)
+                    order.insert(0, container)
+                    changed = True
+                if misses.pop(container, None):
+                    changed = True
+            elif container in order:
+                misses[container] = misses.get(container, 0) + 1
+                changed = True
+                if misses[container] >= self.demote_after:
+                    order.remove(container)
+                    order.append(container)
+                    del misses[container]
+
+            if changed:
+                self._save(retailer, entries)
+
+    def _save(self, retailer: str, entries: Dict):
+        # Write atomically so a crashed run never leaves a partial file behind
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self._path(retailer))
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.cache_dir, name))